@@ -1,7 +1,12 @@
 import streamlit as st
 import sys
 import os
+import io
+import tempfile
+import zipfile
+from pathlib import Path
 import altair as alt
+import numpy as np
 import pandas as pd
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -9,15 +14,26 @@ project_root = os.path.abspath(os.path.join(current_dir, ".."))
 sys.path.append(project_root)
 
 from model.cp_sat_model import run_model_and_get_results, run_with_one_extra_doctor
+from model.data_loader import load_instance, load_candidates, InstanceValidationError
+from model.export import EXPORT_FORMATS, export_schedules, schedule_week
+from model.run_store import RunStore, next_monday, week_period
+from model.heuristic import construct_greedy
 
 
 st.title("HARMONOGRAM DYŻURÓW")
 
 # === READ DATA FILES ===
-doctors = pd.read_csv(os.path.join(project_root, "data/doctors2.csv"))
-shifts = pd.read_csv(os.path.join(project_root, "data/shifts_1.csv"))
-unavail_day = pd.read_csv(os.path.join(project_root, "data/unavailabilities_day_4.csv"))
-unavail_shift = pd.read_csv(os.path.join(project_root, "data/unavailabilities_shift.csv"))
+# Te same (zwalidowane) dane trafiają do wykresów i do modelu
+try:
+    instance = load_instance()
+except InstanceValidationError as e:
+    st.error(str(e))
+    st.stop()
+
+doctors = instance.doctors
+shifts = instance.shifts
+unavail_day = instance.unavail_day
+unavail_shift = instance.unavail_shift
 
 
 # === DAYS OF WEEK ===
@@ -32,7 +48,7 @@ POLISH_DAYS = {
 }
 
 # === FUNCTION TO SHOW RESULTS AND STATISTICS ===
-def render_all_charts(stats_df, solver_stats_df, doctors, shifts, unavail_day, unavail_shift, title_prefix=""):
+def render_all_charts(stats_df, solver_stats_df, availability, title_prefix=""):
     # === Godziny pracy na osobę ===
     st.subheader("Liczba godzin pracy na lekarza")
 
@@ -284,41 +300,75 @@ def render_all_charts(stats_df, solver_stats_df, doctors, shifts, unavail_day, u
     )
 
 
-    st.header("Nieobecności lekarzy")
+    render_availability_charts(availability)
 
-    id_to_name = {row["id"]: row["name"] for _, row in doctors.iterrows()}
-    code_to_id = {row["code"]: row["id"] for _, row in shifts.iterrows()}
 
-    st.subheader("Grafik nieobecności lekarzy")
+# === AVAILABILITY DATA ===
+# Kolejność dni na osiach wykresów
+DAY_ORDER = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
 
-    # ===== Przygotowanie danych =====
+@st.cache_data
+def build_availability_data(doctors, shifts, unavail_day, unavail_shift):
+    """
+    Dane wykresów nieobecności liczone raz (złączenia zamiast pętli po lekarzach):
+    lista nieobecności, siatka lekarz x dzień i siatka lekarz x zmiana ze statusem.
+    """
+    docs = doctors[["id", "name"]].rename(columns={"id": "DoctorID", "name": "Doctor"})
 
-    # Mapowanie day → kolejność dni
-    day_order = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+    day_off = unavail_day[["doctor_id", "day"]].drop_duplicates().rename(
+        columns={"doctor_id": "DoctorID", "day": "Day"}
+    )
+    day_off["Day"] = day_off["Day"].astype(str)
+    day_off["DayAbsent"] = True
 
-    # 1. Nieobecności całodniowe
-    un_day_vis = unavail_day.copy()
-    un_day_vis["Type"] = "DAY"
-    un_day_vis["Shift"] = un_day_vis["day"]
-    un_day_vis["Doctor"] = un_day_vis["doctor_id"].map(id_to_name)
+    shift_off = unavail_shift[["doctor_id", "code"]].drop_duplicates().rename(
+        columns={"doctor_id": "DoctorID", "code": "ShiftLabel"}
+    )
+    shift_off["ShiftAbsent"] = True
+
+    # 1. Lista nieobecności (całodniowe + na konkretne zmiany)
+    un_all = pd.concat([
+        day_off.assign(Shift=day_off["Day"], Type="DAY"),
+        shift_off.assign(Shift=shift_off["ShiftLabel"], Type="SHIFT"),
+    ], ignore_index=True).merge(docs, on="DoctorID", how="left")[["Doctor", "Shift", "Type"]]
+
+    # 2. Siatka dzienna
+    day_df = (
+        docs.merge(pd.DataFrame({"Day": DAY_ORDER}), how="cross")
+        .merge(day_off, on=["DoctorID", "Day"], how="left")
+    )
+    day_df["Absent"] = day_df["DayAbsent"].fillna(False).astype(int)
+    day_df = day_df[["Doctor", "DoctorID", "Day", "Absent"]]
+
+    # 3. Siatka zmian - nieobecność na zmianę ma pierwszeństwo przed całodniową
+    shift_cols = shifts[["id", "code", "day"]].rename(columns={"id": "ShiftID", "code": "ShiftLabel", "day": "Day"})
+    shift_cols["Day"] = shift_cols["Day"].astype(str)
+    shift_df = (
+        docs.merge(shift_cols, how="cross")
+        .merge(day_off, on=["DoctorID", "Day"], how="left")
+        .merge(shift_off, on=["DoctorID", "ShiftLabel"], how="left")
+    )
+    shift_df["Status"] = np.select(
+        [shift_df["ShiftAbsent"].fillna(False).astype(bool), shift_df["DayAbsent"].fillna(False).astype(bool)],
+        ["ShiftAbsent", "DayAbsent"],
+        default="Available",
+    )
+    shift_df = shift_df[["Doctor", "DoctorID", "ShiftID", "ShiftLabel", "Day", "Status"]]
 
-    # 2. Nieobecności na konkretne zmiany
-    un_shift_vis = unavail_shift.copy()
-    un_shift_vis["Type"] = "SHIFT"
-    un_shift_vis["Shift"] = un_shift_vis["code"]
-    un_shift_vis["Doctor"] = un_shift_vis["doctor_id"].map(id_to_name)
+    return {"un_all": un_all, "day_df": day_df, "shift_df": shift_df}
 
-    # Połączenie
-    un_all = pd.concat([un_day_vis[["Doctor", "Shift", "Type"]],
-                        un_shift_vis[["Doctor", "Shift", "Type"]]],
-                       ignore_index=True)
+
+def render_availability_charts(availability):
+    st.header("Nieobecności lekarzy")
+
+    st.subheader("Grafik nieobecności lekarzy")
 
     heatmap_un = (
-        alt.Chart(un_all)
+        alt.Chart(availability["un_all"])
         .mark_rect()
         .encode(
             y=alt.Y("Doctor:N", sort=None, title="Lekarz"),
-            x=alt.X("Shift:N", sort=day_order, title="Dzień / Zmiana"),
+            x=alt.X("Shift:N", sort=DAY_ORDER, title="Dzień / Zmiana"),
             color=alt.Color("Type:N",
                             scale=alt.Scale(
                                 domain=["DAY", "SHIFT"],
@@ -334,38 +384,13 @@ def render_all_charts(stats_df, solver_stats_df, doctors, shifts, unavail_day, u
 
     st.header("Nieobecności — poziom dzienny")
 
-    id_to_name = {row["id"]: row["name"] for _, row in doctors.iterrows()}
-
-    # Przygotowanie danych dziennych
-    days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-
-    day_grid = []
-    for _, doc in doctors.iterrows():
-        for day in days:
-            day_grid.append({
-                "Doctor": doc["name"],
-                "DoctorID": doc["id"],
-                "Day": day,
-                "Absent": 0
-            })
-
-    day_df = pd.DataFrame(day_grid)
-
-    # Nieobecności całodniowe
-    for _, row in unavail_day.iterrows():
-        doc = row["doctor_id"]
-        day = row["day"]
-        day_df.loc[(day_df["DoctorID"] == doc) & (day_df["Day"] == day), "Absent"] = 1
-
     # Heatmapa — dni
-    days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-
     heatmap_days = (
-        alt.Chart(day_df)
+        alt.Chart(availability["day_df"])
         .mark_rect()
         .encode(
             y=alt.Y("Doctor:N", title="Lekarz"),
-            x=alt.X("Day:N", title="Dzień tygodnia", sort=days),
+            x=alt.X("Day:N", title="Dzień tygodnia", sort=DAY_ORDER),
             color=alt.Color(
                 "Absent:N",
                 scale=alt.Scale(
@@ -384,49 +409,13 @@ def render_all_charts(stats_df, solver_stats_df, doctors, shifts, unavail_day, u
 
     st.header("Nieobecności na poziomie zmian")
 
-    id_to_name = {row["id"]: row["name"] for _, row in doctors.iterrows()}
-    code_to_shift_id = {row["code"]: row["id"] for _, row in shifts.iterrows()}
-
-    shifts_by_day = {day: [] for day in days}
-    for _, sh in shifts.iterrows():
-        shifts_by_day[sh["day"]].append(sh)
-
-    un_shift = unavail_shift.copy()
-    un_shift["ShiftID"] = un_shift["code"].map(code_to_shift_id)
-    un_shift["Doctor"] = un_shift["doctor_id"].map(id_to_name)
-
-    for day in days:
+    shift_df = availability["shift_df"]
+    for day in DAY_ORDER:
         st.subheader(f"{day} — dostępność na zmiany")
 
-        shifts_today = shifts_by_day[day]
-        shift_labels = [f"{sh['code']}" for sh in shifts_today]
-
-        grid = []
-        for _, doc in doctors.iterrows():
-            for sh in shifts_today:
-                grid.append({
-                    "Doctor": doc["name"],
-                    "DoctorID": doc["id"],
-                    "ShiftID": sh["id"],
-                    "ShiftLabel": sh["code"],
-                    "Status": "Available"
-                })
-
-        df_day = pd.DataFrame(grid)
-
-        day_unavailable_docs = unavail_day[unavail_day["day"] == day]["doctor_id"].tolist()
-        df_day.loc[df_day["DoctorID"].isin(day_unavailable_docs), "Status"] = "DayAbsent"
-
-        for _, row in un_shift[un_shift["ShiftID"].isin(df_day["ShiftID"])].iterrows():
-            df_day.loc[
-                (df_day["DoctorID"] == row["doctor_id"]) &
-                (df_day["ShiftID"] == row["ShiftID"]),
-                "Status"
-            ] = "ShiftAbsent"
-
         # Heatmapa dla zmian dla każdego dnia
         heatmap_shifts = (
-            alt.Chart(df_day)
+            alt.Chart(shift_df[shift_df["Day"] == day])
             .mark_rect()
             .encode(
                 y=alt.Y("Doctor:N", title="Lekarz"),
@@ -448,29 +437,76 @@ def render_all_charts(stats_df, solver_stats_df, doctors, shifts, unavail_day, u
 
 
 # === RUN MODEL ===
-result = run_with_one_extra_doctor()
+# Wynik dla tych samych danych wczytujemy z magazynu zamiast liczyć od nowa
+week = st.sidebar.date_input("Tydzień grafiku (poniedziałek)", value=next_monday())
+period_start, period_end = week_period(week, len(instance.days))
+params = {"mode": "one_extra_doctor", "week": period_start}
+input_hash = instance.input_hash(load_candidates())
+force_solve = st.sidebar.button("Przelicz harmonogram ponownie")
+
+with RunStore() as store:
+    run_id = None if force_solve else store.find_run(input_hash, params)
+    if run_id is not None:
+        result = store.load_run(run_id)
+        st.caption(f"Wynik wczytany z magazynu (run_id={run_id})")
+    else:
+        # Natychmiastowy podgląd z heurystyki, zanim solver skończy
+        preview = st.empty()
+        with preview.container():
+            greedy = construct_greedy(instance)
+            st.info(
+                f"Podgląd heurystyczny ({greedy['wall_time'] * 1000:.0f} ms, "
+                f"braki: {sum(greedy['missing'].values())}) - trwa optymalizacja..."
+            )
+            st.dataframe(greedy["schedule_df"])
+
+        result = run_with_one_extra_doctor(instance=instance)
+        run_id = store.save_run(input_hash, result, params, period_start, period_end)
+        preview.empty()
 status = result["status"]
-st.write("Status:", status)
+st.write("Status:", getattr(status, "name", status))
+
+# Dane nieobecności są wspólne dla widoku przed i po - liczone raz
+availability = build_availability_data(doctors, shifts, unavail_day, unavail_shift)
 schedule_before = result["schedule_before"]
 stats_before = result["stats_before"]
 solver_stats_before = result["solver_stats_before"]
 
+# Bez rozwiązania (np. limit czasu) nie ma grafiku ani statystyk do pokazania
+if stats_before.empty:
+    st.error("Solver nie znalazł rozwiązania - spróbuj przeliczyć z dłuższym limitem czasu.")
+    st.dataframe(solver_stats_before)
+    st.stop()
+
 # === IT WAS NECESSARY TO HIRE A NEW DOCTOR ===
 if result["added"]:
     schedule_after = result["schedule_after"]
     stats_after = result["stats_after"]
     solver_stats_after = result["solver_stats_after"]
-    tab1, tab2 = st.tabs(["PRZED dodaniem lekarza", "PO dodaniu lekarza"])
+    # Zamiast st.tabs (renderuje oba widoki naraz) - budujemy tylko wybrany widok
+    views = ["PRZED dodaniem lekarza", "PO dodaniu lekarza"]
+    view = st.radio("Widok", views, horizontal=True, label_visibility="collapsed")
+
+    diagnosis = result.get("diagnosis")
+    if diagnosis is not None and not diagnosis["feasible"]:
+        with st.expander("Diagnoza braków obsady - wykluczające się zmiany i reguły"):
+            st.write(
+                f"Konflikt wyznaczony w {diagnosis['solves']} rozwiązaniach "
+                f"({diagnosis['wall_time']:.2f} s)."
+            )
+            st.subheader("Zmiany, których nie da się jednocześnie obsadzić")
+            st.dataframe(diagnosis["shifts"])
+            st.subheader("Reguły i lekarze biorący udział w konflikcie")
+            st.dataframe(diagnosis["rules"])
 
-    with tab1:
+    if view == views[0]:
         st.header("Harmonogram PRZED")
         st.dataframe(schedule_before)
 
         st.header("Wykresy i statystyki PRZED")
-        render_all_charts(stats_before, solver_stats_before, doctors, shifts, unavail_day, unavail_shift)
-
+        render_all_charts(stats_before, solver_stats_before, availability)
 
-    with tab2:
+    else:
         new_doc = result["new_doctor"]
         with st.container(border=True):
             st.subheader("Dodano nowego lekarza do rozwiązania")
@@ -488,10 +524,41 @@ if result["added"]:
         st.dataframe(schedule_after)
 
         st.header("Wykresy i statystyki PO")
-        render_all_charts(stats_after, solver_stats_after, doctors, shifts, unavail_day, unavail_shift, "PO")
+        render_all_charts(stats_after, solver_stats_after, availability, "PO")
 
 # === SOLVER FOUND A SOLUTION WITHOUT HIRING A NEW DOCTOR ===
 else:
     st.dataframe(schedule_before)
     st.header("Wykresy i statystyki")
-    render_all_charts(stats_before, solver_stats_before, doctors, shifts, unavail_day, unavail_shift, "Wykresy i statystyki")
\ No newline at end of file
+    render_all_charts(stats_before, solver_stats_before, availability, "Wykresy i statystyki")
+
+
+# === EXPORT ===
+def export_archive(schedule_df, instance, week, formats):
+    """Eksport grafiku (model/export.py) spakowany do ZIP do pobrania"""
+    buffer = io.BytesIO()
+    with tempfile.TemporaryDirectory() as tmp:
+        export_schedules([schedule_week(week, schedule_df, instance)], instance, tmp, formats=formats)
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for path in sorted(Path(tmp).rglob("*")):
+                if path.is_file():
+                    archive.write(path, path.relative_to(tmp))
+    return buffer.getvalue()
+
+
+final_schedule = result["schedule_after"] if result["added"] else schedule_before
+if len(final_schedule):
+    exported_instance = instance
+    if result["added"]:
+        exported_instance = instance.with_doctors(
+            pd.concat([instance.doctors, pd.DataFrame([result["new_doctor"]])], ignore_index=True)
+        )
+    st.header("Eksport grafiku")
+    formats = st.multiselect("Formaty", EXPORT_FORMATS, default=list(EXPORT_FORMATS))
+    if formats:
+        st.download_button(
+            "Pobierz eksport (ZIP)",
+            data=export_archive(final_schedule, exported_instance, period_start, tuple(formats)),
+            file_name=f"grafik_{period_start}.zip",
+            mime="application/zip",
+        )
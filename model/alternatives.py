@@ -0,0 +1,166 @@
+from time import perf_counter
+import math
+
+from ortools.sat.python import cp_model
+import numpy as np
+import pandas as pd
+
+from model.data_loader import load_instance
+from model.cp_sat_model import apply_solver_profile, build_roster_model, compute_sum_slack, weighted_objective
+from model.export import assignment_matrix
+from model.heuristic import construct_greedy
+
+
+class IncumbentRecorder(cp_model.CpSolverSolutionCallback):
+    """
+    Zapamiętuje ostatnie (najlepsze) rozwiązanie jako macierz przydziałów
+    i przerywa szukanie, gdy osiągnie wartość celu `target` - alternatywa nie może
+    być lepsza od najlepszego grafiku, więc dowód optymalności jest zbędny.
+    """
+
+    def __init__(self, x, D, S, target=None):
+        super().__init__()
+        self.index = np.array([x[(d, s)].Index() for d in D for s in S])
+        self.shape = (len(D), len(S))
+        self.target = target
+        self.matrix = None
+        self.objective = None
+        self.solutions = 0
+
+    def OnSolutionCallback(self):
+        values = np.asarray(self.Response().solution)[self.index]
+        self.matrix = values.astype(np.int8).reshape(self.shape)
+        self.objective = self.ObjectiveValue()
+        self.solutions += 1
+        if self.target is not None and self.objective <= self.target:
+            self.StopSearch()
+
+
+def assignment_stats(assignment, instance):
+    """Statystyki per lekarz policzone z macierzy przydziałów (godziny, noce, 24h, zmiany per oddział)"""
+    matrix = assignment.to_numpy()
+    shifts = instance.shifts.set_index("id").loc[assignment.columns]
+    hours = shifts["hours"].to_numpy()
+    night = assignment.columns.isin(instance.night_shifts)
+    twentyfour = assignment.columns.isin(instance.twentyfour_shifts)
+
+    stats = pd.DataFrame({
+        "doctor_id": assignment.index,
+        "Doctor": [instance.id_to_name[d] for d in assignment.index],
+        "TotalHours": matrix @ hours,
+        "Shifts": matrix.sum(axis=1),
+        "NightShifts": matrix[:, night].sum(axis=1),
+        "TwentyFourCount": matrix[:, twentyfour].sum(axis=1),
+    })
+    per_dept = pd.DataFrame(matrix, columns=shifts["dept"].astype(str).to_numpy()).T.groupby(level=0).sum().T
+    per_dept.columns = [f"{dept}Count" for dept in per_dept.columns]
+    return pd.concat([stats, per_dept], axis=1)
+
+
+def assignment_diff(assignment, reference, instance):
+    """Różnice względem grafiku odniesienia: +1 nowy przydział, -1 usunięty"""
+    delta = assignment.to_numpy().astype(np.int8) - reference.to_numpy().astype(np.int8)
+    rows, cols = np.nonzero(delta)
+    shift_ids = assignment.columns.to_numpy()[cols]
+    shifts = instance.shifts.set_index("id")
+    doctor_ids = assignment.index.to_numpy()[rows]
+    return pd.DataFrame({
+        "doctor_id": doctor_ids,
+        "Doctor": [instance.id_to_name[d] for d in doctor_ids],
+        "shift_id": shift_ids,
+        "ShiftCode": shifts.loc[shift_ids, "code"].to_numpy(),
+        "Day": shifts.loc[shift_ids, "day"].astype(str).to_numpy(),
+        "Change": delta[rows, cols],
+    })
+
+
+def add_distance_constraint(model, x, previous, min_distance):
+    """Odległość Hamminga od poprzedniego grafiku >= min_distance (1 = zwykły no-good)"""
+    ones = [var for (d, s), var in x.items() if previous.at[d, s] == 1]
+    zeros = [var for (d, s), var in x.items() if previous.at[d, s] == 0]
+    # sum(1 - x dla jedynek) + sum(x dla zer) >= min_distance
+    model.Add(
+        cp_model.LinearExpr.Sum(zeros) - cp_model.LinearExpr.Sum(ones) >= min_distance - len(ones)
+    )
+
+
+def diverse_schedules(instance=None, k=5, tolerance=0.05, min_distance=4, time_limit=30, weights=None,
+                      profile=None):
+    """
+    Do k różnych grafików z tymi samymi brakami obsady (suma slacków jak w najlepszym), których
+    pozostała część celu (preferencje, fairness, niedopracowanie, nadmiar obsady) mieści się
+    w najlepszej + |najlepsza| * tolerance - waga braków (10000) nie poszerza pasma.
+    Każdy kolejny musi różnić się od wszystkich poprzednich o co najmniej min_distance
+    przydziałów (odległość Hamminga); najlepszy grafik jest podpowiedzią (hint) dla kolejnych.
+    profile - profil solvera (apply_solver_profile), time_limit - łączny budżet czasu na wszystkie
+    k rozwiązań (None - limit z profilu); każde rozwiązanie dostaje równą część pozostałego
+    budżetu, więc czas niewykorzystany przez wcześniejsze przechodzi na kolejne.
+    Zwraca listę słowników: rank, objective, distance (od najlepszego), assignment,
+    stats (per lekarz) i diff (zmiany względem najlepszego).
+    """
+    if instance is None:
+        instance = load_instance()
+
+    built = build_roster_model(instance, hint=construct_greedy(instance)["assignment"], weights=weights)
+    model, x = built["model"], built["x"]
+
+    solver = cp_model.CpSolver()
+    apply_solver_profile(solver, profile)
+    budget = time_limit if time_limit is not None else solver.parameters.max_time_in_seconds
+    started = perf_counter()
+
+    def share(solves_left):
+        """Limit czasu kolejnego rozwiązania: pozostały budżet / liczba rozwiązań do wykonania"""
+        if math.isfinite(budget):
+            remaining = max(budget - (perf_counter() - started), 0.0)
+            solver.parameters.max_time_in_seconds = remaining / solves_left
+
+    share(k)
+    status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return []
+
+    best_objective = solver.ObjectiveValue()
+    best = assignment_matrix(x, solver, instance.D, instance.S)
+    found = [(best_objective, best)]
+
+    # braki obsady jak w najlepszym, pasmo tolerancji tylko na pozostałych składnikach celu
+    slacks = list(built["slacks"].values())
+    best_slack = compute_sum_slack(built["slacks"], solver)
+    model.Add(cp_model.LinearExpr.Sum(slacks) == best_slack)
+    rest = {name: part for name, part in built["objective_parts"].items() if name != "slack"}
+    best_rest = best_objective - built["weights"]["slack"] * best_slack
+    model.Add(weighted_objective(rest, built["weights"]) <= int(best_rest + abs(best_rest) * tolerance))
+    model.ClearHints()
+    for (d, s), var in x.items():
+        model.AddHint(var, int(best.at[d, s]))
+
+    while len(found) < k:
+        add_distance_constraint(model, x, found[-1][1], min_distance)
+        share(k - len(found))
+        recorder = IncumbentRecorder(x, instance.D, instance.S, target=best_objective)
+        status = solver.Solve(model, recorder)
+        if recorder.matrix is None:
+            break
+        found.append((
+            recorder.objective,
+            pd.DataFrame(recorder.matrix, index=best.index, columns=best.columns),
+        ))
+
+    alternatives = []
+    for rank, (objective, assignment) in enumerate(found):
+        alternatives.append({
+            "rank": rank,
+            "objective": objective,
+            "distance": int(np.abs(assignment.to_numpy() - best.to_numpy()).sum()),
+            "assignment": assignment,
+            "stats": assignment_stats(assignment, instance),
+            "diff": assignment_diff(assignment, best, instance),
+        })
+    return alternatives
+
+
+if __name__ == "__main__":
+    for alt in diverse_schedules():
+        print(f"#{alt['rank']}: cel={alt['objective']}, różnica={alt['distance']}")
+        print(alt["diff"].to_string(index=False))
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+HOURS_PER_DAY = 24
+HOURS_PER_WEEK = 7 * HOURS_PER_DAY
+
+
+def merge_intervals(doctor_ids, starts, ends):
+    """
+    Scala nakładające się lub stykające przedziały [start, end) każdego lekarza.
+    Jedno sortowanie (lekarz, start) i jeden przebieg z narastającym maksimum końca.
+    Zwraca (lekarze, starty, końce) posortowane po lekarzu i starcie.
+    """
+    frame = pd.DataFrame({"doctor_id": doctor_ids, "start": starts, "end": ends})
+    frame = frame[frame["end"] > frame["start"]].sort_values(["doctor_id", "start"], kind="stable")
+    if frame.empty:
+        return (np.array([], dtype=np.int64),) * 3
+
+    # koniec najdalszy z dotychczasowych przedziałów tego samego lekarza
+    reach = frame.groupby("doctor_id", sort=False)["end"].cummax()
+    prev_reach = reach.groupby(frame["doctor_id"], sort=False).shift()
+    new_block = prev_reach.isna() | (frame["start"] > prev_reach)
+    block = new_block.cumsum()
+
+    merged = frame.groupby(block, sort=False).agg(doctor_id=("doctor_id", "first"), start=("start", "min"),
+                                                  end=("end", "max"))
+    return merged["doctor_id"].to_numpy(), merged["start"].to_numpy(), merged["end"].to_numpy()
+
+
+class AvailabilityIndex:
+    """
+    Kalendarz nieobecności lekarzy z rozdzielczością godzinową (czas w godzinach od początku
+    horyzontu planowania - tydzień, miesiąc, ...). Przedziały każdego lekarza są scalone
+    i posortowane, a przechowywane płasko (offsets jak w macierzy CSR), więc zapytanie
+    o przedział to jedno wyszukiwanie binarne, a macierz dostępności dla wszystkich zmian
+    powstaje w jednym przebiegu po posortowanych przedziałach.
+    """
+
+    def __init__(self, doctors, intervals=None):
+        """doctors - lista id lekarzy (kolejność wierszy macierzy), intervals - DataFrame doctor_id/start/end"""
+        self.doctors = list(doctors)
+        self.doctor_idx = {d: i for i, d in enumerate(self.doctors)}
+        self._pending = [] if intervals is None else [intervals[["doctor_id", "start", "end"]]]
+        self._build()
+
+    # === BUDOWA ===
+    def add(self, doctor_id, start, end):
+        """Pojedyncza nieobecność [start, end) w godzinach od początku horyzontu"""
+        self.add_frame(pd.DataFrame({"doctor_id": [doctor_id], "start": [start], "end": [end]}))
+
+    def add_weekly(self, doctor_id, day, start_hour, end_hour, weeks=1):
+        """Nieobecność powtarzana co tydzień (np. stała poradnia) - day jako numer dnia tygodnia 0-6"""
+        offsets = np.arange(weeks) * HOURS_PER_WEEK + day * HOURS_PER_DAY
+        self.add_frame(pd.DataFrame({
+            "doctor_id": doctor_id, "start": offsets + start_hour, "end": offsets + end_hour,
+        }))
+
+    def add_frame(self, intervals):
+        """Wiele nieobecności naraz (DataFrame z kolumnami doctor_id, start, end)"""
+        unknown = set(intervals["doctor_id"]) - set(self.doctor_idx)
+        if unknown:
+            raise ValueError(f"nieznani lekarze w kalendarzu: {sorted(unknown)}")
+        self._pending.append(intervals[["doctor_id", "start", "end"]])
+        self._build()
+
+    def _build(self):
+        frames = [f for f in self._pending if len(f)]
+        if frames:
+            raw = pd.concat(frames, ignore_index=True)
+            rows = raw["doctor_id"].map(self.doctor_idx).to_numpy(dtype=np.int64)
+            doc, self.starts, self.ends = merge_intervals(rows, raw["start"].to_numpy(), raw["end"].to_numpy())
+        else:
+            doc = np.array([], dtype=np.int64)
+            self.starts = self.ends = np.array([], dtype=np.int64)
+        # przedziały lekarza i: starts[offsets[i]:offsets[i + 1]]
+        self.offsets = np.searchsorted(doc, np.arange(len(self.doctors) + 1))
+        self._pending = [pd.DataFrame({"doctor_id": np.asarray(self.doctors, dtype=object)[doc],
+                                       "start": self.starts, "end": self.ends})] if len(doc) else []
+
+    # === ZAPYTANIA ===
+    def intervals(self, doctor_id):
+        """Scalone nieobecności lekarza jako lista (start, end)"""
+        i = self.doctor_idx[doctor_id]
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        return list(zip(self.starts[lo:hi].tolist(), self.ends[lo:hi].tolist()))
+
+    def overlapping(self, doctor_id, start, end):
+        """Nieobecności lekarza nachodzące na [start, end)"""
+        i = self.doctor_idx[doctor_id]
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        first = lo + np.searchsorted(self.ends[lo:hi], start, side="right")
+        last = lo + np.searchsorted(self.starts[lo:hi], end, side="left")
+        return list(zip(self.starts[first:last].tolist(), self.ends[first:last].tolist()))
+
+    def is_available(self, doctor_id, start, end):
+        return not self.overlapping(doctor_id, start, end)
+
+    def available_matrix(self, starts, ends):
+        """
+        Macierz lekarz x zmiana (numpy bool): czy zmiana [starts[j], ends[j]) nie nachodzi na
+        żadną nieobecność lekarza. Scalone przedziały są rozłączne i posortowane, więc wystarczy
+        pierwszy przedział kończący się po starcie zmiany - jedno searchsorted na lekarza.
+        """
+        starts = np.asarray(starts)
+        ends = np.asarray(ends)
+        available = np.ones((len(self.doctors), len(starts)), dtype=bool)
+        for i in np.flatnonzero(np.diff(self.offsets)):
+            lo, hi = self.offsets[i], self.offsets[i + 1]
+            first = np.searchsorted(self.ends[lo:hi], starts, side="right")
+            inside = first < hi - lo
+            available[i, inside] = self.starts[lo:hi][first[inside]] >= ends[inside]
+        return available
+
+
+def day_intervals(unavail_day, day_index):
+    """Nieobecności całodniowe jako przedziały godzinowe tygodnia"""
+    day = unavail_day["day"].astype(str).map(day_index).to_numpy(dtype=np.int64)
+    return pd.DataFrame({
+        "doctor_id": unavail_day["doctor_id"].to_numpy(),
+        "start": day * HOURS_PER_DAY,
+        "end": (day + 1) * HOURS_PER_DAY,
+    })
+
+
+def hour_intervals(unavail_hours, day_index):
+    """Nieobecności częściowe (dzień + godziny od-do) jako przedziały godzinowe tygodnia"""
+    offset = unavail_hours["day"].astype(str).map(day_index).to_numpy(dtype=np.int64) * HOURS_PER_DAY
+    return pd.DataFrame({
+        "doctor_id": unavail_hours["doctor_id"].to_numpy(),
+        "start": offset + unavail_hours["start_hour"].to_numpy(),
+        "end": offset + unavail_hours["end_hour"].to_numpy(),
+    })
@@ -0,0 +1,459 @@
+from time import perf_counter
+import multiprocessing
+
+from ortools.linear_solver import pywraplp
+from ortools.sat.python import cp_model
+import numpy as np
+import pandas as pd
+
+from model.capacity import MAX_WORKING_DAYS, staffing_lower_bound
+from model.constraints import rest_conflicts
+from model.data_loader import load_instance
+from model.export import SCHEDULE_COLUMNS, assignment_matrix, build_schedule_df
+
+# Backendy: CP-SAT oraz MIP przez pywraplp (solvery open source dołączone do OR-Tools)
+BACKENDS = ("cp_sat", "scip", "cbc")
+MIP_ENGINES = {"scip": "SCIP", "cbc": "CBC"}
+
+# statusy pywraplp -> statusy CP-SAT (wspólny format solver_stats)
+MIP_STATUS = {
+    pywraplp.Solver.OPTIMAL: cp_model.OPTIMAL,
+    pywraplp.Solver.FEASIBLE: cp_model.FEASIBLE,
+    pywraplp.Solver.INFEASIBLE: cp_model.INFEASIBLE,
+    pywraplp.Solver.UNBOUNDED: cp_model.MODEL_INVALID,
+    pywraplp.Solver.ABNORMAL: cp_model.MODEL_INVALID,
+    pywraplp.Solver.MODEL_INVALID: cp_model.MODEL_INVALID,
+    pywraplp.Solver.NOT_SOLVED: cp_model.UNKNOWN,
+}
+# CBC liczy limit czasem procesora i nie da się go przerwać - rozwiązuje w procesie potomnym,
+# zamykanym po limicie (plus zapas na przesłanie wyniku)
+DEADLINE_ENGINES = {"CBC"}
+DEADLINE_GRACE = 2.0
+
+
+# === OPIS MODELU ===
+class RosterSpec:
+    """
+    Model obsady niezależny od solvera: zmienne całkowite z przedziałami, ograniczenia
+    liniowe lb <= sum(coef * var) <= ub (None - bez ograniczenia) i minimalizowana suma ważona.
+    Zmienne to indeksy na listach, grupy (x, slacks, ...) trzymają indeksy zmiennych modelu.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.lower = []
+        self.upper = []
+        self.rows = []
+        self.objective = ([], [])
+        self.groups = {}
+
+    @property
+    def num_vars(self):
+        return len(self.names)
+
+    def var(self, lb, ub, name):
+        self.names.append(name)
+        self.lower.append(int(lb))
+        self.upper.append(int(ub))
+        return len(self.names) - 1
+
+    def add(self, variables, coeffs, lb=None, ub=None):
+        self.rows.append((list(variables), [int(c) for c in coeffs], lb, ub))
+
+    def minimize(self, variables, coeffs):
+        self.objective = (list(variables), [int(c) for c in coeffs])
+
+
+def describe_roster(instance, weights=None):
+    """
+    Opis modelu obsady w RosterSpec - te same reguły twarde, braki / nadmiary obsady, fairness
+    i funkcja celu co build_roster_model (sformułowanie "classic", bez gate_doctors i historii).
+    Różnice tylko w zapisie, nie w optimum: niedozwolone pary lekarz x zmiana mają górną
+    granicę 0 zamiast ograniczeń x == 0, a maksima / minima nocy i proporcji godzin są
+    nierównościami (minimalizacja rozrzutu dociąga je do prawdziwych wartości, ale przy wadze 0
+    mogą zostać luźne - solve_roster raportuje je policzone z rozwiązania, exact_spreads).
+    """
+    from model.cp_sat_model import DEFAULT_WEIGHTS
+
+    spec = RosterSpec()
+    D, S = instance.D, instance.S
+    hours = instance.hours
+    adjusted_max_hours = instance.adjusted_max_hours
+    eligible = instance.eligibility()
+
+    x = {}
+    for i, d in enumerate(D):
+        for j, s in enumerate(S):
+            x[(d, s)] = spec.var(0, int(eligible[i, j]), f"x_{d}_{s}")
+
+    def row(shifts, d):
+        return [x[(d, s)] for s in shifts]
+
+    """ HARD CONSTRAINTS (1, 9, 10 - granice zmiennych x) """
+    conflicts = rest_conflicts(instance)
+    mentors = {s: [x[(spec_d, s)] for spec_d in instance.specialists] for s in S}
+    needs_mentor = set(instance.needs_mentor)
+    for i, d in enumerate(D):
+        # 2. Maksymalnie 1 zmiana w ciągu doby
+        for day in instance.days:
+            shifts = row(instance.day_24h[day], d) + row(instance.day_shifts[day], d)
+            spec.add(shifts, [1] * len(shifts), ub=1)
+
+        # 3. 11 godzin odpoczynku - tylko pary, które lekarz w ogóle może objąć
+        for s1, s2 in conflicts:
+            if eligible[i, instance.shift_idx[s1]] and eligible[i, instance.shift_idx[s2]]:
+                spec.add([x[(d, s1)], x[(d, s2)]], [1, 1], ub=1)
+
+        # 4. Tygodniowy limit godzin (pomniejszony o urlopy)
+        spec.add(row(S, d), [hours[s] for s in S], ub=adjusted_max_hours[d])
+
+        # 5. Opiekun dla stażysty
+        if d in needs_mentor:
+            for s in S:
+                if eligible[i, instance.shift_idx[s]]:
+                    spec.add([x[(d, s)]] + mentors[s], [1] + [-1] * len(mentors[s]), ub=0)
+
+        # 6. Maksymalnie 2 dyżury nocne w oknie 3 dni
+        for k in range(len(instance.days) - 2):
+            nights = [s for day in instance.days[k:k + 3] for s in instance.night_shifts_by_day[day]]
+            if nights:
+                spec.add(row(nights, d), [1] * len(nights), ub=2)
+
+        # 7. Dzień wolny po zmianie nocnej
+        for k in range(len(instance.days) - 1):
+            nights = instance.night_shifts_by_day[instance.days[k]]
+            next_day = instance.days_to_shifts[instance.days[k + 1]]
+            if nights and next_day:
+                spec.add(row(nights, d) + row(next_day, d), [1] * (len(nights) + len(next_day)), ub=1)
+
+        # 8. 35h odpoczynku - najwyżej 6 dni pracy (works = 1, gdy lekarz pracuje danego dnia)
+        works = []
+        for day in instance.days:
+            shifts = row(instance.days_to_shifts[day], d)
+            w = spec.var(0, 1, f"works_{d}_{day}")
+            works.append(w)
+            spec.add(shifts + [w], [1] * len(shifts) + [-1], lb=0)
+            spec.add(shifts + [w], [1] * len(shifts) + [-len(shifts)], ub=0)
+        spec.add(works, [1] * len(works), ub=MAX_WORKING_DAYS)
+
+    """ SLACK """
+    slacks, slacks_o = {}, {}
+    shifts_df = instance.shifts
+    for s, min_staff, regular_staff in zip(shifts_df["id"], shifts_df["min_staff"], shifts_df["regular_staff"]):
+        col = [x[(d, s)] for d in D]
+        slacks[s] = spec.var(0, min_staff, f"slack_{s}")
+        slacks_o[s] = spec.var(0, regular_staff, f"slack_o_{s}")
+        spec.add(col + [slacks[s]], [1] * (len(col) + 1), lb=int(min_staff))
+        spec.add(col + [slacks_o[s]], [1] * (len(col) + 1), ub=int(regular_staff))
+
+    capacity = staffing_lower_bound(instance)
+    if capacity["lower_bound"] > 0:
+        spec.add(list(slacks.values()), [1] * len(slacks), lb=capacity["lower_bound"])
+
+    """ SOFT CONSTRAINTS """
+    worked_hours = {}
+    for d in D:
+        worked_hours[d] = spec.var(0, adjusted_max_hours[d], f"worked_hours_{d}")
+        spec.add(row(S, d) + [worked_hours[d]], [hours[s] for s in S] + [-1], lb=0, ub=0)
+
+    pref_vars, pref_signs = [], []
+    for d, code, preference in zip(instance.pref["doctor_id"], instance.pref["code"], instance.pref["preference"]):
+        if preference in ("like", "dislike"):
+            pref_vars.append(x[(d, instance.code_to_id[code])])
+            pref_signs.append(-1 if preference == "like" else 1)
+
+    # Fairness nocy
+    night_count = {}
+    max_nights = spec.var(0, 100, "max_nights")
+    min_nights = spec.var(0, 100, "min_nights")
+    for d in D:
+        night_count[d] = spec.var(0, 100, f"night_count_{d}")
+        spec.add(row(instance.night_shifts, d) + [night_count[d]], [1] * len(instance.night_shifts) + [-1],
+                 lb=0, ub=0)
+        spec.add([max_nights, night_count[d]], [1, -1], lb=0)
+        spec.add([min_nights, night_count[d]], [1, -1], ub=0)
+    spread = spec.var(0, 100, "night_spread")
+    spec.add([spread, max_nights, min_nights], [1, -1, 1], lb=0, ub=0)
+
+    # Proporcja godzin do limitu (promile, pasmo +-50 jak w "classic")
+    max_ratio = spec.var(0, 2000, "max_ratio")
+    min_ratio = spec.var(0, 2000, "min_ratio")
+    ratio_spread = spec.var(0, 2000, "ratio_spread")
+    workload_ratio = {}
+    for d in instance.opt_out_doctors:
+        ratio = spec.var(0, 2000, f"workload_ratio_{d}")
+        spec.add([ratio, worked_hours[d]], [adjusted_max_hours[d], -1000], lb=-50, ub=50)
+        spec.add([max_ratio, ratio], [1, -1], lb=0)
+        spec.add([min_ratio, ratio], [1, -1], ub=0)
+        workload_ratio[d] = ratio
+    if workload_ratio:
+        spec.add([ratio_spread, max_ratio, min_ratio], [1, -1, 1], lb=0, ub=0)
+    else:
+        for var in (max_ratio, min_ratio, ratio_spread):
+            spec.add([var], [1], lb=0, ub=0)
+
+    # Niedopracowanie regularnych lekarzy
+    underwork = {}
+    for d in instance.regular_doctors:
+        underwork[d] = spec.var(0, adjusted_max_hours[d], f"underwork_{d}")
+        spec.add([underwork[d], worked_hours[d]], [1, 1], lb=int(0.95 * adjusted_max_hours[d]))
+
+    """ OBJECTIVE FUNCTION """
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    parts = {
+        "pref": (pref_vars, pref_signs),
+        "night": ([spread], [1]),
+        "ratio": ([ratio_spread], [1]),
+        "underwork": (list(underwork.values()), [1] * len(underwork)),
+        "slack": (list(slacks.values()), [1] * len(slacks)),
+        "overstaff": (list(slacks_o.values()), [1] * len(slacks_o)),
+    }
+    variables, coeffs = [], []
+    for name, (part_vars, part_coeffs) in parts.items():
+        variables += part_vars
+        coeffs += [weights[name] * c for c in part_coeffs]
+    spec.minimize(variables, coeffs)
+
+    spec.groups = {
+        "x": x,
+        "slacks": slacks,
+        "slacks_o": slacks_o,
+        "worked_hours": worked_hours,
+        "night_count": night_count,
+        "max_nights": max_nights,
+        "min_nights": min_nights,
+        "spread": spread,
+        "workload_ratio": workload_ratio,
+        "max_ratio": max_ratio,
+        "min_ratio": min_ratio,
+        "ratio_spread": ratio_spread,
+        "underwork": underwork,
+        "capacity": capacity,
+        "weights": weights,
+    }
+    return spec
+
+
+# === KOMPILACJA ===
+def compile_cp_sat(spec):
+    """RosterSpec -> (CpModel, lista zmiennych w kolejności indeksów)"""
+    model = cp_model.CpModel()
+    variables = [model.NewIntVar(lb, ub, name) for name, lb, ub in zip(spec.names, spec.lower, spec.upper)]
+    for row_vars, coeffs, lb, ub in spec.rows:
+        expr = cp_model.LinearExpr.WeightedSum([variables[v] for v in row_vars], coeffs)
+        if lb is not None and ub is not None:
+            model.AddLinearConstraint(expr, lb, ub)
+        elif lb is not None:
+            model.Add(expr >= lb)
+        else:
+            model.Add(expr <= ub)
+    obj_vars, obj_coeffs = spec.objective
+    model.Minimize(cp_model.LinearExpr.WeightedSum([variables[v] for v in obj_vars], obj_coeffs))
+    return model, variables
+
+
+def compile_mip(spec, engine="SCIP", time_limit=None, workers=None):
+    """
+    RosterSpec -> (pywraplp.Solver, lista zmiennych); wiersze przez SetCoefficient (bez wyrażeń Pythona).
+    time_limit (s) ustawiany w silniku - SCIP dostaje go też we własnych parametrach, liczony
+    zegarem ściennym; workers - liczba wątków (tylko SCIP, CBC w pywraplp jej nie przyjmuje).
+    """
+    solver = pywraplp.Solver.CreateSolver(engine)
+    if solver is None:
+        raise ValueError(f"solver MIP '{engine}' nie jest dostępny w tej instalacji OR-Tools")
+    if time_limit is not None:
+        solver.SetTimeLimit(int(time_limit * 1000))
+        if engine == "SCIP":
+            solver.SetSolverSpecificParametersAsString(f"limits/time = {time_limit}\ntiming/clocktype = 2\n")
+    if workers is not None and engine == "SCIP":
+        solver.SetNumThreads(workers)
+    inf = solver.infinity()
+    variables = [solver.IntVar(lb, ub, name) for name, lb, ub in zip(spec.names, spec.lower, spec.upper)]
+    for row_vars, coeffs, lb, ub in spec.rows:
+        constraint = solver.Constraint(-inf if lb is None else lb, inf if ub is None else ub)
+        for v, c in zip(row_vars, coeffs):
+            constraint.SetCoefficient(variables[v], c)
+    objective = solver.Objective()
+    for v, c in zip(*spec.objective):
+        # ten sam indeks może wystąpić w kilku składnikach celu
+        objective.SetCoefficient(variables[v], objective.GetCoefficient(variables[v]) + c)
+    objective.SetMinimization()
+    return solver, variables
+
+
+# === ROZWIĄZANIE ===
+class SolvedSpec:
+    """
+    Wynik dowolnego backendu z interfejsem odczytu jak CpSolver (Value, BooleanValues,
+    ObjectiveValue, StatusName, ...) - dzięki temu schedule_df / stats_df / solver_stats_df
+    powstają tymi samymi funkcjami co w run_model_and_get_results.
+    """
+
+    def __init__(self, values, objective, bound, wall_time, branches=None, conflicts=None):
+        self.values = values
+        self.objective = objective
+        self.bound = bound
+        self.wall_time = wall_time
+        self.branches = branches
+        self.conflicts = conflicts
+
+    def Value(self, var):
+        return int(self.values[var]) if self.values is not None else 0
+
+    def BooleanValues(self, variables):
+        return [bool(self.values[v]) for v in variables]
+
+    def ObjectiveValue(self):
+        return self.objective
+
+    def BestObjectiveBound(self):
+        return self.bound
+
+    def StatusName(self, status):
+        return cp_model.CpSolver().StatusName(status)
+
+    def NumConflicts(self):
+        return self.conflicts
+
+    def NumBranches(self):
+        return self.branches
+
+    def WallTime(self):
+        return self.wall_time
+
+
+def _solve_mip(spec, engine, time_limit, workers):
+    """Rozwiązanie MIP: (status pywraplp, wartości zmiennych albo None, cel, ograniczenie, węzły)"""
+    solver, variables = compile_mip(spec, engine, time_limit, workers)
+    status = solver.Solve()
+    solved = status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE)
+    return (
+        status,
+        np.rint([v.solution_value() for v in variables]).astype(np.int64) if solved else None,
+        solver.Objective().Value() if solved else None,
+        solver.Objective().BestBound(),
+        solver.nodes(),
+    )
+
+
+def _solve_mip_child(conn, spec, engine, time_limit, workers):
+    conn.send(_solve_mip(spec, engine, time_limit, workers))
+    conn.close()
+
+
+def _solve_mip_deadline(spec, engine, time_limit, workers):
+    """_solve_mip w procesie potomnym; po time_limit + DEADLINE_GRACE bez wyniku proces jest zamykany"""
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_solve_mip_child, args=(sender, spec, engine, time_limit, workers),
+                                      daemon=True)
+    process.start()
+    sender.close()
+    try:
+        if receiver.poll(time_limit + DEADLINE_GRACE):
+            return receiver.recv()
+        return pywraplp.Solver.NOT_SOLVED, None, None, None, None
+    except EOFError:
+        # proces potomny zakończył się bez wyniku
+        return pywraplp.Solver.ABNORMAL, None, None, None, None
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+
+
+def solve_spec(spec, backend="cp_sat", time_limit=60, workers=8):
+    """Rozwiązuje RosterSpec wybranym backendem; zwraca (status CP-SAT, SolvedSpec)"""
+    if backend not in BACKENDS:
+        raise ValueError(f"nieznany backend '{backend}' (dostępne: {', '.join(BACKENDS)})")
+
+    if backend == "cp_sat":
+        model, variables = compile_cp_sat(spec)
+        solver = cp_model.CpSolver()
+        solver.parameters.num_search_workers = workers
+        solver.parameters.max_time_in_seconds = time_limit
+        status = solver.Solve(model)
+        solved = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        return status, SolvedSpec(
+            np.asarray(solver.Values(variables), dtype=np.int64) if solved else None,
+            solver.ObjectiveValue() if solved else None,
+            solver.BestObjectiveBound(),
+            solver.WallTime(),
+            solver.NumBranches(),
+            solver.NumConflicts(),
+        )
+
+    started = perf_counter()
+    engine = MIP_ENGINES[backend]
+    solve = _solve_mip_deadline if engine in DEADLINE_ENGINES and time_limit is not None else _solve_mip
+    mip_status, values, objective, bound, nodes = solve(spec, engine, time_limit, workers)
+    return MIP_STATUS.get(mip_status, cp_model.UNKNOWN), SolvedSpec(
+        values, objective, bound, perf_counter() - started, nodes
+    )
+
+
+def exact_spreads(spec, solved):
+    """
+    Maksima, minima i rozrzuty nocy i proporcji godzin policzone z rozwiązania - w opisie
+    są tylko nierównościami, więc bez kary w celu (waga 0) solver może zostawić je luźne.
+    """
+    groups = spec.groups
+    solved.values = solved.values.copy()
+    for counts, top, bottom, spread in (
+        (groups["night_count"], groups["max_nights"], groups["min_nights"], groups["spread"]),
+        (groups["workload_ratio"], groups["max_ratio"], groups["min_ratio"], groups["ratio_spread"]),
+    ):
+        if not counts:
+            continue
+        values = [solved.values[v] for v in counts.values()]
+        solved.values[top], solved.values[bottom] = max(values), min(values)
+        solved.values[spread] = max(values) - min(values)
+
+
+def solve_roster(instance=None, backend="cp_sat", time_limit=60, workers=8, weights=None):
+    """
+    Buduje opis modelu, rozwiązuje wybranym backendem i zwraca słownik: status, schedule_df,
+    stats_df, solver_stats_df (kolumny jak w run_model_and_get_results, plus backend) i assignment.
+    """
+    from model.cp_sat_model import (
+        add_preference_stats,
+        build_doctor_stats,
+        build_solver_stats,
+        compute_missing_per_shift,
+    )
+    from model.early_stop import stop_reason
+
+    if instance is None:
+        instance = load_instance()
+    spec = describe_roster(instance, weights)
+    groups = spec.groups
+    status, solved = solve_spec(spec, backend, time_limit, workers)
+
+    # bez rozwiązania - puste ramki jak w run_model_and_get_results
+    assignment = None
+    schedule_df = pd.DataFrame(columns=SCHEDULE_COLUMNS)
+    stats_df = pd.DataFrame()
+    if solved.values is not None:
+        exact_spreads(spec, solved)
+        assignment = assignment_matrix(groups["x"], solved, instance.D, instance.S)
+        schedule_df = build_schedule_df(assignment, instance, compute_missing_per_shift(groups["slacks"], solved))
+
+        stats_df = build_doctor_stats(
+            instance.D, instance.S, instance.id_to_name, instance.id_to_role, groups["x"], instance.hours,
+            instance.night_shifts, instance.twentyfour_shifts, instance.shifts, instance.shift_idx,
+            instance.adjusted_max_hours, solved
+        )
+        stats_df = add_preference_stats(stats_df, instance.pref, groups["x"], solved, instance.id_to_name,
+                                        instance.code_to_id)
+
+    solver_stats_df = build_solver_stats(
+        solved, groups["max_nights"], groups["min_nights"], groups["spread"], status,
+        groups["capacity"]["lower_bound"], stop_reason(status)
+    )
+    solver_stats_df.insert(0, "backend", backend)
+    return {
+        "status": status,
+        "schedule_df": schedule_df,
+        "stats_df": stats_df,
+        "solver_stats_df": solver_stats_df,
+        "assignment": assignment,
+    }
@@ -0,0 +1,159 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stdout
+from time import perf_counter
+import io
+import os
+
+import pandas as pd
+
+from model.cp_sat_model import SOLVER_PROFILES, run_model_and_get_results
+from model.capacity import staffing_lower_bound
+from model.validation import validate_assignment
+
+# więcej wątków na jedno rozwiązanie rzadko pomaga przy modelach tej wielkości
+MAX_WORKERS_PER_SOLVE = 16
+DEFAULT_TIME_LIMIT = 120
+
+
+def unit_difficulty(instance):
+    """
+    Przybliżona trudność oddziału: liczba zmiennych przydziału, podwojona gdy przepływ
+    pokazuje nieuniknione braki (dowód optymalności przy brakach trwa zwykle dłużej).
+    """
+    size = len(instance.D) * len(instance.S)
+    if staffing_lower_bound(instance)["lower_bound"] > 0:
+        size *= 2
+    return size
+
+
+def allocate_workers(difficulty, total_cores, max_per_solve=MAX_WORKERS_PER_SOLVE):
+    """
+    Dzieli rdzenie proporcjonalnie do trudności: {oddział: liczba wątków}, każdy co najmniej 1.
+    Suma może przekroczyć total_cores tylko gdy oddziałów jest więcej niż rdzeni - wtedy
+    scheduler i tak uruchamia naraz tylko tyle, ile się mieści.
+    """
+    total = sum(difficulty.values()) or 1
+    return {
+        unit: max(1, min(max_per_solve, int(total_cores * value / total)))
+        for unit, value in difficulty.items()
+    }
+
+
+def solve_unit(instance, workers, time_limit, weights=None):
+    """Jedno rozwiązanie w procesie roboczym - zwraca tylko wyniki dające się przesłać (bez solvera)"""
+    profile = {**SOLVER_PROFILES["default"], "num_search_workers": workers}
+    # raport modelu jest drukowany na stdout - w trybie wsadowym zbędny
+    with redirect_stdout(io.StringIO()):
+        status, schedule_df, stats_df, solver_stats_df, *_, assignment = run_model_and_get_results(
+            instance=instance, time_limit=time_limit, weights=weights, profile=profile
+        )
+    return {
+        "schedule_df": schedule_df,
+        "stats_df": stats_df,
+        "solver_stats_df": solver_stats_df,
+        "assignment": assignment,
+        # kontrola po rozwiązaniu - reguły twarde sprawdzone niezależnie od modelu
+        "violations": validate_assignment(assignment, instance) if assignment is not None else None,
+    }
+
+
+def solve_units(instances, total_cores=None, time_limit=DEFAULT_TIME_LIMIT, deadline=None, weights=None):
+    """
+    Rozwiązuje wiele niezależnych oddziałów ({nazwa: instancja}) na wspólnym budżecie rdzeni.
+    Oddziały startują od najtrudniejszego, gdy jest dla nich dość wolnych rdzeni
+    (suma wątków uruchomionych rozwiązań nigdy nie przekracza total_cores).
+    time_limit - limit pojedynczego rozwiązania (liczba albo {nazwa: limit}),
+    deadline - limit całego przebiegu (s); późniejsze oddziały dostają tylko pozostały czas,
+    a te, dla których czasu zabrakło, są pomijane.
+    Błąd jednego oddziału (wyjątek w procesie roboczym, przerwana pula procesów) nie przerywa
+    pozostałych - oddział dostaje w summary status FAILED z opisem błędu i nie ma go w results.
+    Zwraca słownik: results {nazwa: wynik} oraz summary (DataFrame).
+    """
+    total_cores = total_cores or os.cpu_count() or 1
+    difficulty = {unit: unit_difficulty(instance) for unit, instance in instances.items()}
+    workers = allocate_workers(difficulty, total_cores)
+    limits = time_limit if isinstance(time_limit, dict) else {unit: time_limit for unit in instances}
+
+    def failed_row(unit, need, error):
+        return {
+            "unit": unit,
+            "doctors": len(instances[unit].D),
+            "shifts": len(instances[unit].S),
+            "difficulty": difficulty[unit],
+            "workers": need,
+            "status": "FAILED",
+            "error": f"{type(error).__name__}: {error}",
+            "finished_at": perf_counter() - started,
+        }
+
+    pending = sorted(instances, key=lambda unit: -difficulty[unit])
+    started = perf_counter()
+    running = {}
+    free = total_cores
+    results = {}
+    rows = []
+
+    with ProcessPoolExecutor(max_workers=min(total_cores, len(instances)) or 1) as pool:
+        while pending or running:
+            # uruchamiamy kolejne oddziały, dopóki mieszczą się w wolnych rdzeniach
+            for unit in list(pending):
+                need = min(workers[unit], total_cores)
+                if need > free:
+                    continue
+                limit = limits.get(unit, DEFAULT_TIME_LIMIT)
+                if deadline is not None:
+                    remaining = deadline - (perf_counter() - started)
+                    if remaining <= 0:
+                        pending.remove(unit)
+                        rows.append({"unit": unit, "workers": 0, "status": "SKIPPED_DEADLINE"})
+                        continue
+                    limit = remaining if limit is None else min(limit, remaining)
+                pending.remove(unit)
+                try:
+                    future = pool.submit(solve_unit, instances[unit], need, limit, weights)
+                except BrokenProcessPool as e:
+                    rows.append(failed_row(unit, need, e))
+                    continue
+                running[future] = (unit, need, perf_counter())
+                free -= need
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                unit, need, submitted = running.pop(future)
+                free += need
+                try:
+                    result = future.result()
+                except Exception as e:
+                    rows.append(failed_row(unit, need, e))
+                    continue
+                results[unit] = result
+                stats = result["solver_stats_df"].iloc[0]
+                rows.append({
+                    "unit": unit,
+                    "doctors": len(instances[unit].D),
+                    "shifts": len(instances[unit].S),
+                    "difficulty": difficulty[unit],
+                    "workers": need,
+                    "status": stats["status"],
+                    "objective": stats["objective_value"],
+                    "missing": int(result["schedule_df"]["Missing"].sum()),
+                    "violations": len(result["violations"]) if result["violations"] is not None else None,
+                    "wall_time": stats["wall_time"],
+                    "finished_at": perf_counter() - started,
+                })
+
+    return {"results": results, "summary": pd.DataFrame(rows)}
+
+
+if __name__ == "__main__":
+    import sys
+
+    from model.benchmark import benchmark_tiers
+
+    # przykład: oddziały z poziomów benchmarku
+    units = benchmark_tiers({"small": 1, "medium": 4})
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    print(solve_units(units, total_cores=total, time_limit=30)["summary"].to_string(index=False))
@@ -0,0 +1,168 @@
+from time import perf_counter
+import sys
+
+import pandas as pd
+
+from model.data_loader import read_tables, validate_tables, compile_instance
+
+# Poziomy benchmarku: ile kopii bazowego oddziału (lekarze + zmiany) łączymy w jedną instancję
+TIERS = {
+    "small": 1,
+    "medium": 4,
+    "large": 12,
+}
+
+ID_OFFSET = 1000
+
+
+def generate_instance(units, base_tables=None):
+    """
+    Instancja testowa złożona z `units` kopii danych bazowych (data/).
+    Lekarze każdej kopii mogą pracować na zmianach wszystkich kopii (te same umiejętności),
+    więc powstaje jeden duży, powiązany problem, a nie kilka niezależnych.
+    """
+    base = base_tables or read_tables()
+    tables = {name: [] for name in base}
+
+    for k in range(units):
+        offset = k * ID_OFFSET
+        suffix = "" if k == 0 else f"_{k}"
+
+        doctors = base["doctors"].copy()
+        doctors["id"] = doctors["id"] + offset
+        doctors["name"] = doctors["name"] + suffix
+        tables["doctors"].append(doctors)
+
+        shifts = base["shifts"].copy()
+        shifts["id"] = shifts["id"] + offset
+        shifts["code"] = shifts["code"] + suffix
+        tables["shifts"].append(shifts)
+
+        for name in ("unavail_day", "unavail_shift", "preferences", "unavail_hours"):
+            if name not in base:
+                continue
+            part = base[name].copy()
+            part["doctor_id"] = part["doctor_id"] + offset
+            if "code" in part.columns:
+                part["code"] = part["code"] + suffix
+            tables[name].append(part)
+
+    merged = {name: pd.concat(parts, ignore_index=True) for name, parts in tables.items()}
+    return compile_instance(validate_tables(merged))
+
+
+def benchmark_tiers(tiers=None):
+    """Zwraca słownik {poziom: instancja} dla podanych (domyślnie wszystkich) poziomów"""
+    base = read_tables()
+    return {tier: generate_instance(units, base) for tier, units in (tiers or TIERS).items()}
+
+
+def time_build(instance, builder, repeats=3, **kwargs):
+    """Najkrótszy z `repeats` czasów budowy modelu (s) oraz zbudowany model"""
+    best = None
+    parts = None
+    for _ in range(repeats):
+        started = perf_counter()
+        parts = builder(instance, **kwargs)
+        elapsed = perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, parts
+
+
+def run_benchmark(tiers=None, repeats=3):
+    """Czas budowy modelu CP-SAT na poziomach benchmarku"""
+    from model.cp_sat_model import build_roster_model
+
+    rows = []
+    for tier, instance in benchmark_tiers(tiers).items():
+        build_s, parts = time_build(instance, build_roster_model, repeats)
+        proto = parts["model"].Proto()
+        rows.append({
+            "tier": tier,
+            "doctors": len(instance.D),
+            "shifts": len(instance.S),
+            "variables": len(proto.variables),
+            "constraints": len(proto.constraints),
+            "build_s": round(build_s, 3),
+        })
+    return pd.DataFrame(rows)
+
+
+def compare_formulations(tiers=None, time_limit=60, workers=8, formulations=None):
+    """
+    Rozwiązuje każdy poziom w każdym sformułowaniu fairness (build_roster_model(formulation=...))
+    i porównuje rozmiar modelu, czas budowy, wynik, ograniczenie dolne i czas do najlepszego rozwiązania.
+    """
+    from ortools.sat.python import cp_model
+
+    from model.cp_sat_model import FORMULATIONS, build_roster_model
+    from model.replay import CurveRecorder
+
+    rows = []
+    for tier, instance in benchmark_tiers(tiers).items():
+        for formulation in formulations or FORMULATIONS:
+            build_s, parts = time_build(instance, build_roster_model, 1, formulation=formulation)
+            solver = cp_model.CpSolver()
+            solver.parameters.num_search_workers = workers
+            solver.parameters.max_time_in_seconds = time_limit
+            recorder = CurveRecorder()
+            status = solver.Solve(parts["model"], recorder)
+
+            solved = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+            objective = solver.ObjectiveValue() if solved else None
+            proto = parts["model"].Proto()
+            rows.append({
+                "tier": tier,
+                "formulation": formulation,
+                "variables": len(proto.variables),
+                "constraints": len(proto.constraints),
+                "build_s": round(build_s, 3),
+                "status": solver.StatusName(status),
+                "objective": objective,
+                "bound": solver.BestObjectiveBound() if solved else None,
+                "time_to_best": next((p["time"] for p in recorder.points if p["objective"] == objective), None),
+                "wall_time": round(solver.WallTime(), 3),
+            })
+    return pd.DataFrame(rows)
+
+
+def compare_backends(tiers=None, time_limit=60, workers=8, backends=None):
+    """
+    Rozwiązuje każdy poziom tym samym opisem modelu (model/backends.py) w każdym backendzie
+    (CP-SAT, MIP przez SCIP / CBC) i porównuje rozmiar, czas budowy opisu, wynik, ograniczenie dolne i czas.
+    """
+    from model.backends import BACKENDS, describe_roster, solve_spec
+
+    rows = []
+    for tier, instance in benchmark_tiers(tiers).items():
+        build_s, spec = time_build(instance, describe_roster, 1)
+        for backend in backends or BACKENDS:
+            status, solved = solve_spec(spec, backend, time_limit, workers)
+            rows.append({
+                "tier": tier,
+                "backend": backend,
+                "variables": spec.num_vars,
+                "constraints": len(spec.rows),
+                "build_s": round(build_s, 3),
+                "status": solved.StatusName(status),
+                "objective": solved.ObjectiveValue(),
+                "bound": solved.BestObjectiveBound(),
+                "wall_time": round(solved.WallTime(), 3),
+            })
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    # python -m model.benchmark [poziomy...]            - czas budowy
+    # python -m model.benchmark formulations [poziomy...] - porównanie sformułowań fairness
+    # python -m model.benchmark backends [poziomy...]   - porównanie CP-SAT i MIP (SCIP / CBC)
+    args = sys.argv[1:]
+    if args[:1] == ["formulations"]:
+        tiers = {t: TIERS[t] for t in args[1:]} or {"small": TIERS["small"]}
+        print(compare_formulations(tiers).to_string(index=False))
+    elif args[:1] == ["backends"]:
+        tiers = {t: TIERS[t] for t in args[1:]} or {"small": TIERS["small"]}
+        print(compare_backends(tiers).to_string(index=False))
+    else:
+        tiers = {t: TIERS[t] for t in args} or None
+        print(run_benchmark(tiers).to_string(index=False))
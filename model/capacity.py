@@ -0,0 +1,95 @@
+from ortools.graph.python import max_flow
+import numpy as np
+
+# maksymalna liczba dni pracy w tygodniu (35h nieprzerwanego odpoczynku)
+MAX_WORKING_DAYS = 6
+
+
+def doctor_shift_capacity(instance, eligible):
+    """
+    Górne ograniczenie liczby zmian, które lekarz może objąć w tygodniu:
+    najwyżej jedna zmiana dziennie, maks. 6 dni i limit godzin (najkrótsze dostępne zmiany).
+    """
+    hours = instance.shifts["hours"].to_numpy()
+    day_codes = instance.shifts["day"].cat.codes.to_numpy()
+
+    capacity = {}
+    for i, d in enumerate(instance.D):
+        # najkrótsza zmiana, jaką lekarz mógłby objąć w danym dniu
+        cheapest = {}
+        for j in np.flatnonzero(eligible[i]):
+            day = day_codes[j]
+            cheapest[day] = min(cheapest.get(day, hours[j]), hours[j])
+
+        count = 0
+        used = 0
+        for h in sorted(cheapest.values())[:MAX_WORKING_DAYS]:
+            if used + h > instance.adjusted_max_hours[d]:
+                break
+            used += h
+            count += 1
+        capacity[d] = count
+    return capacity
+
+
+def staffing_lower_bound(instance):
+    """
+    Dolne ograniczenie sumarycznych braków obsady z maksymalnego przepływu:
+    źródło -> lekarz (pojemność w zmianach) -> (lekarz, dzień) (1 zmiana na dobę)
+    -> zmiana (jeśli lekarz może ją objąć) -> ujście (min_staff).
+    To relaksacja modelu (pomija m.in. odpoczynek 11h, noce i opiekunów), więc
+    każdy dopuszczalny grafik ma co najmniej tyle braków.
+    Zwraca słownik z ograniczeniem, przepływem i brakami per zmiana.
+    """
+    eligible = instance.eligibility()
+    capacity = doctor_shift_capacity(instance, eligible)
+
+    n_doc = len(instance.D)
+    n_day = len(instance.days)
+    n_shift = len(instance.S)
+
+    # numeracja węzłów: źródło, lekarze, pary (lekarz, dzień), zmiany, ujście
+    source = 0
+    doc_node = 1 + np.arange(n_doc)
+    doc_day_node = 1 + n_doc + np.arange(n_doc * n_day).reshape(n_doc, n_day)
+    shift_node = 1 + n_doc + n_doc * n_day + np.arange(n_shift)
+    sink = 1 + n_doc + n_doc * n_day + n_shift
+
+    min_staff = instance.shifts["min_staff"].to_numpy()
+    day_codes = instance.shifts["day"].cat.codes.to_numpy()
+    rows, cols = np.nonzero(eligible)
+
+    tails = np.concatenate([
+        np.full(n_doc, source),
+        np.repeat(doc_node, n_day),
+        doc_day_node[rows, day_codes[cols]],
+        shift_node,
+    ])
+    heads = np.concatenate([
+        doc_node,
+        doc_day_node.ravel(),
+        shift_node[cols],
+        np.full(n_shift, sink),
+    ])
+    capacities = np.concatenate([
+        np.array([capacity[d] for d in instance.D]),
+        np.ones(n_doc * n_day, dtype=np.int64),
+        np.ones(len(rows), dtype=np.int64),
+        min_staff,
+    ])
+
+    flow = max_flow.SimpleMaxFlow()
+    flow.add_arcs_with_capacity(tails.astype(np.int32), heads.astype(np.int32), capacities.astype(np.int64))
+    flow.solve(source, sink)
+
+    total_flow = flow.optimal_flow()
+    # ostatnie n_shift łuków to zmiana -> ujście
+    covered = flow.flows(np.arange(len(tails) - n_shift, len(tails)))
+    deficit = {s: int(m - c) for s, m, c in zip(instance.S, min_staff, covered) if m > c}
+
+    return {
+        "lower_bound": int(min_staff.sum() - total_flow),
+        "max_flow": int(total_flow),
+        "required": int(min_staff.sum()),
+        "deficit": deficit,
+    }
@@ -0,0 +1,137 @@
+from ortools.sat.python import cp_model
+import numpy as np
+
+# === HARD CONSTRAINTS ===
+# Rodziny ograniczeń twardych - te same nazwy używane są w diagnozie braków
+HARD_CONSTRAINT_FAMILIES = [
+    "skill",
+    "one_shift_per_day",
+    "rest_11h",
+    "weekly_hours",
+    "mentor",
+    "max_2_nights",
+    "day_off_after_night",
+    "weekly_rest_35h",
+    "twentyfour_allowed",
+    "unavailability",
+]
+
+def rest_conflicts(instance, min_rest=11):
+    """
+    Pary zmian (s1, s2), między którymi jest mniej niż min_rest godzin odpoczynku.
+    Liczone raz dla wszystkich lekarzy (macierz odstępów start(s2) - koniec(s1)).
+    """
+    start = np.array([instance.abs_start[s] for s in instance.S])
+    end = np.array([instance.abs_end[s] for s in instance.S])
+    gap = start[None, :] - end[:, None]
+    conflict = (gap > 0) & (gap < min_rest)
+    np.fill_diagonal(conflict, False)
+    rows, cols = np.nonzero(conflict)
+    S = np.asarray(instance.S, dtype=object)
+    return list(zip(S[rows].tolist(), S[cols].tolist()))
+
+
+def add_hard_constraints(model, x, instance, gate=None):
+    """
+    Dodaje do modelu wszystkie ograniczenia twarde.
+    gate(rodzina, lekarz) może zwrócić literał - wtedy ograniczenie obowiązuje tylko,
+    gdy literał jest prawdziwy (używane przy diagnozie przez założenia / assumptions).
+    Sumy budowane są jednym wywołaniem LinearExpr.Sum / WeightedSum na gotowych listach
+    zmiennych zamiast przez sum() Pythona (mniej pośrednich wyrażeń przy dużych instancjach).
+    """
+    D = instance.D
+    S = instance.S
+    days = instance.days
+    hours = instance.hours
+    adjusted_max_hours = instance.adjusted_max_hours
+    night_shifts_by_day = instance.night_shifts_by_day
+    day_shifts = instance.day_shifts
+    day_24h = instance.day_24h
+    days_to_shifts = instance.days_to_shifts
+    code_to_id = instance.code_to_id
+
+    def enforce(constraint, family, d):
+        lit = gate(family, d) if gate is not None else None
+        if lit is not None:
+            constraint.OnlyEnforceIf(lit)
+        return constraint
+
+    Sum = cp_model.LinearExpr.Sum
+    WeightedSum = cp_model.LinearExpr.WeightedSum
+    shift_hours = [hours[s] for s in S]
+
+    """1. Lekarz musi posiadać odpowiednie uprawnienia, aby mógł być przypisany do danej zmiany (taska) """
+    for s, req in zip(instance.shifts["id"], instance.shifts["required_skill"]):
+        for d, skill_list in zip(instance.doctors["id"], instance.doctors["skill_list"]):
+            if req not in skill_list:
+                enforce(model.Add(x[(d, s)] == 0), "skill", d)
+
+    """2. Maksymalnie 1 zmiana w ciągu doby """
+    for d in D:
+        for day in days:
+            enforce(model.Add(
+                Sum([x[(d, s)] for s in day_24h[day]] + [x[(d, s)] for s in day_shifts[day]]) <= 1
+            ), "one_shift_per_day", d)
+
+    """3. Co najmniej 11 godzin nieprzerwanego odpoczynku po zmianie """
+    conflicts = rest_conflicts(instance)
+    for d in D:
+        for s1, s2 in conflicts:
+            # para literałów: AddAtMostOne zamiast x1 + x2 <= 1 (to samo po presolve, szybciej budowane)
+            enforce(model.AddAtMostOne([x[(d, s1)], x[(d, s2)]]), "rest_11h", d)
+
+    """4. Zachowanie limitu tygodniowego godzin pracy (w zależności od lekarza, pomniejszonego o urlopy) """
+    for d in D:
+        enforce(model.Add(
+            WeightedSum([x[(d, s)] for s in S], shift_hours) <= adjusted_max_hours[d]
+        ), "weekly_hours", d)
+
+    """5. Opiekun dla stażysty (i niekórych rezydentów) """
+    for s in S:
+        mentors_on_shift = Sum([x[(spec, s)] for spec in instance.specialists])
+        for d in instance.needs_mentor:
+            enforce(model.Add(x[(d, s)] <= mentors_on_shift), "mentor", d)
+
+    """6. Maksymalnie 2 dyżury nocne pod rząd """
+    for d in D:
+        for i in range(len(days)-2):
+            window_days = days[i:i+3]
+            shifts_in_window = [shift for day in window_days for shift in night_shifts_by_day[day]]
+            if shifts_in_window:
+                enforce(model.Add(Sum([x[(d, s)] for s in shifts_in_window]) <= 2), "max_2_nights", d)
+
+    """7. Dzień wolny po zmianie nocnej """
+    for d in D:
+        for i in range(len(days)-1):
+            current_night_shifts = night_shifts_by_day[days[i]]
+            next_day_shifts = days_to_shifts[days[i+1]]
+
+            if current_night_shifts and next_day_shifts:
+                enforce(model.Add(
+                    Sum([x[(d, s)] for s in current_night_shifts] + [x[(d, s)] for s in next_day_shifts]) <= 1
+                ), "day_off_after_night", d)
+
+    """8. Co najmniej 35 godzin nieprzerwanego odpoczynku w każdym tygodniu """
+    for d in D:
+        works_vars = []
+        for day in days:
+            works_var = model.NewBoolVar(f"works_{d}_{day}")
+            works_vars.append(works_var)
+
+            day_total = Sum([x[(d, s)] for s in days_to_shifts[day]])
+            model.Add(day_total >= works_var)
+            model.Add(day_total <= 1000 * works_var)
+        enforce(model.Add(Sum(works_vars) <= 6), "weekly_rest_35h", d)
+
+    '''9. Nie każdy może mieć 24-godzinny dyżur '''
+    for d in D:
+        if instance.twentyfour_allowed[d] == 0:
+            for s in instance.twentyfour_shifts:
+                enforce(model.Add(x[(d, s)] == 0), "twentyfour_allowed", d)
+
+    '''10. Uwzględnienie niedostępności (np: urlopy) '''
+    # Całe dni, przedziały godzin i konkretne zmiany - maska z kalendarza nieobecności (jeden przebieg)
+    rows, cols = np.nonzero(~instance.eligibility_masks()["unavailability"])
+    for i, j in zip(rows.tolist(), cols.tolist()):
+        d = D[i]
+        enforce(model.Add(x[d, S[j]] == 0), "unavailability", d)
@@ -1,10 +1,28 @@
 from ortools.sat.python import cp_model
 from pathlib import Path
+import json
+import sys
 import pandas as pd
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 
+# uruchomienie jako skrypt (python model/cp_sat_model.py) - dodajemy katalog projektu
+if __package__ in (None, ""):
+    sys.path.append(str(BASE_DIR))
+
+from model.data_loader import load_instance, load_candidates
+from model.run_store import RunStore, next_monday, week_period
+from model.export import SCHEDULE_COLUMNS, assignment_matrix, build_schedule_df
+from model.history import WEEKEND_DAYS
+from model.constraints import add_hard_constraints
+from model.diagnosis import diagnose_understaffing
+from model.capacity import MAX_WORKING_DAYS, staffing_lower_bound
+from model.heuristic import construct_greedy
+from model.replay import dump_solve_inputs
+from model.early_stop import EarlyStopController, stop_reason
+from model.lp_ranking import DUAL_EPS, rank_candidates_lp
+
 # === HELPERS ===
 
 def build_doctor_stats(
@@ -54,43 +72,137 @@ def add_preference_stats(stats_df, pref, x, solver, id_to_name, code_to_id):
     return stats_df
 
 
-def build_solver_stats(solver, max_nights, min_nights, spread, status):
-    """Zwraca DataFrame z globalnymi statystykami"""
+def build_solver_stats(solver, max_nights, min_nights, spread, status, staffing_lower_bound=None, stop_reason=None):
+    """Zwraca DataFrame z globalnymi statystykami (bez rozwiązania - bez wartości zmiennych)"""
+    solved = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
     solver_stats = {
-        "objective_value": solver.ObjectiveValue()
-        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) else None,
+        "objective_value": solver.ObjectiveValue() if solved else None,
         "status": solver.StatusName(status),
         "conflicts": solver.NumConflicts(),
         "branches": solver.NumBranches(),
         "wall_time": solver.WallTime(),
-        "max_nights": solver.Value(max_nights),
-        "min_nights": solver.Value(min_nights),
-        "spread": solver.Value(spread),
+        "max_nights": solver.Value(max_nights) if solved else None,
+        "min_nights": solver.Value(min_nights) if solved else None,
+        "spread": solver.Value(spread) if solved else None,
+        "staffing_lower_bound": staffing_lower_bound,
+        "stop_reason": stop_reason,
     }
     return pd.DataFrame([solver_stats])
 
-# === MAIN FUNCTION ===
-def run_model_and_get_results(doctors_df=None):
-    if doctors_df is None:
-        doctors = pd.read_csv(DATA_DIR / "doctors2.csv")
-    else:
-        doctors = doctors_df.copy()
-
-    shifts = pd.read_csv(DATA_DIR / "shifts_1.csv")
-    unavail_day = pd.read_csv(DATA_DIR / "unavailabilities_day_3.csv")
-    unavail_shift = pd.read_csv(DATA_DIR / "unavailabilities_shift.csv")
-    pref = pd.read_csv(DATA_DIR / "preferences.csv")
-
-    D = list(doctors["id"])
-    S = list(shifts["id"])
-
-    doctor_idx = {doc_id: idx for idx, doc_id in enumerate(D)}
-    shift_idx = {shift_id: idx for idx, shift_id in enumerate(S)}
-
-    id_to_name = {row["id"]: row["name"] for _, row in doctors.iterrows()}
-    id_to_role = {row["id"]: row["role"] for _, row in doctors.iterrows()}
-
-    doctors["skill_list"] = doctors["skills"].apply(lambda skill: skill.split(";") if isinstance(skill, str) else [])
+# === MODEL ===
+# Wagi funkcji celu
+DEFAULT_WEIGHTS = {
+    "slack": 10000,  # w przypadku braku personelu - tylko w najwyższej konieczności
+    "overstaff": 1,
+    "pref": 2,
+    "night": 1,
+    "ratio": 2,
+    "underwork": 1,
+    # rozrzut skumulowanych weekendów i dyżurów 24h - tylko z historią (build_roster_model(history=...))
+    "weekend": 1,
+    "twentyfour": 1,
+}
+
+
+def weighted_objective(parts, weights):
+    """Funkcja celu jako jedna suma ważona; parts = {nazwa wagi: (zmienne, współczynniki bez wagi)}"""
+    variables = []
+    coeffs = []
+    for name, (part_vars, part_coeffs) in parts.items():
+        variables += part_vars
+        coeffs += [weights[name] * c for c in part_coeffs]
+    return cp_model.LinearExpr.WeightedSum(variables, coeffs)
+
+
+# Sformułowania składników fairness / proporcji godzin (build_roster_model(formulation=...))
+FORMULATIONS = ("classic", "tight")
+
+
+def achievable_hours(instance, eligible=None):
+    """
+    Możliwe tygodniowe sumy godzin każdego lekarza: najwyżej jedna dopuszczalna zmiana
+    dziennie, maks. 6 dni pracy i nie więcej niż adjusted_max_hours.
+    Zwraca {lekarz: posortowana lista sum} (zawsze zawiera 0).
+    """
+    if eligible is None:
+        eligible = instance.eligibility()
+    hours = instance.shifts["hours"].to_numpy()
+    day_codes = instance.shifts["day"].cat.codes.to_numpy()
+
+    result = {}
+    for i, d in enumerate(instance.D):
+        limit = instance.adjusted_max_hours[d]
+        # stany (liczba dni pracy, suma godzin) po kolejnych dniach
+        states = {(0, 0)}
+        for day in range(len(instance.days)):
+            options = set(hours[eligible[i] & (day_codes == day)].tolist())
+            states |= {
+                (n + 1, total + h) for n, total in states for h in options
+                if n < MAX_WORKING_DAYS and total + h <= limit
+            }
+        result[d] = sorted({total for _, total in states})
+    return result
+
+
+def night_upper_bounds(instance, eligible=None):
+    """
+    Górne ograniczenie liczby nocy każdego lekarza: dni z dopuszczalną nocą, dzień wolny
+    po nocy (noce nie mogą być dzień po dniu) oraz limit godzin.
+    """
+    if eligible is None:
+        eligible = instance.eligibility()
+    is_night = instance.shifts["id"].isin(instance.night_shifts).to_numpy()
+    hours = instance.shifts["hours"].to_numpy()
+    day_codes = instance.shifts["day"].cat.codes.to_numpy()
+
+    bounds = {}
+    for i, d in enumerate(instance.D):
+        nights = eligible[i] & is_night
+        night_days = len(set(day_codes[nights].tolist()))
+        by_hours = instance.adjusted_max_hours[d] // hours[nights].min() if nights.any() else 0
+        bounds[d] = int(min(night_days, (len(instance.days) + 1) // 2, by_hours))
+    return bounds
+
+
+def build_roster_model(instance, hint=None, weights=None, gate_doctors=False, formulation="classic",
+                       history=None):
+    """
+    Buduje model CP-SAT dla instancji (bez rozwiązywania).
+    Sumy (obsada zmian, godziny, noce, funkcja celu) tworzone są przez
+    cp_model.LinearExpr.Sum / WeightedSum na listach zmiennych przygotowanych raz.
+    weights - słownik nadpisujący wybrane wagi z DEFAULT_WEIGHTS.
+    gate_doctors=True dodaje literał active_d dla każdego lekarza (x tylko gdy aktywny,
+    nieaktywni nie wpływają na fairness ani niedopracowanie), a ograniczenie przepływowe
+    jest zawsze obecne z prawą stroną 0 - do ustawienia z zewnątrz (RosterModel).
+    formulation="tight" zawęża domeny składników fairness do wartości możliwych w instancji
+    (godziny tylko z osiągalnych sum, noce do górnego ograniczenia lekarza) i zastępuje
+    pasmo +-50 dla proporcji godzin tabelą (godziny -> proporcja w promilach) liczoną z góry.
+    Proporcja z tabeli leży w paśmie modelu "classic", więc każde rozwiązanie "tight"
+    jest dopuszczalne w "classic" (optimum "tight" może być minimalnie wyższe przez zaokrąglenie).
+    Nie łączy się z gate_doctors (RosterModel zmienia domeny i współczynniki pasma).
+    history - agregaty z HistoryStore.aggregates (indeks doctor_id; nights, weekends, twentyfour,
+    hours, capacity): noce, weekendy, dyżury 24h i godziny z poprzednich tygodni wchodzą do
+    fairness jako stałe przesunięcia, więc rozrzut nocy i proporcji godzin liczony jest na sumach
+    skumulowanych, a z historią dochodzą rozrzuty weekendów i 24h (wagi weekend, twentyfour).
+    Nie łączy się z gate_doctors.
+    Zwraca słownik ze zmiennymi i ograniczeniami potrzebnymi do odczytu wyniku i zmian modelu.
+    """
+    if formulation not in FORMULATIONS:
+        raise ValueError(f"nieznane sformułowanie '{formulation}' (dostępne: {', '.join(FORMULATIONS)})")
+    tight = formulation == "tight"
+    if tight and gate_doctors:
+        raise ValueError("formulation='tight' nie obsługuje gate_doctors")
+    if history is not None and gate_doctors:
+        raise ValueError("history nie obsługuje gate_doctors")
+
+    Sum = cp_model.LinearExpr.Sum
+    WeightedSum = cp_model.LinearExpr.WeightedSum
+
+    shifts = instance.shifts
+    pref = instance.pref
+
+    D = instance.D
+    S = instance.S
 
     model = cp_model.CpModel()
 
@@ -100,158 +212,39 @@ def run_model_and_get_results(doctors_df=None):
         for s in S:
             x[(d, s)] = model.NewBoolVar(f"x_{d}_{s}")
 
-    """ LISTS AND DICTS """
-    shift_day = {shift["id"]: shift["day"] for _, shift in shifts.iterrows()}
-    days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-    day_index = {d: i for i, d in enumerate(days)}
-
-    shift_start = {shift["id"]: shift["start_hour"] for _, shift in shifts.iterrows()}
-    shift_end = {shift["id"]: shift["end_hour"] for _, shift in shifts.iterrows()}
-
-    # czas liczony jako czas od początku tygodnia
-    abs_start = {s: day_index[shift_day[s]] * 24 + shift_start[s] for s in S}
-    abs_end = {s: day_index[shift_day[s]] * 24 + shift_end[s] for s in S}
-
-    hours = {shift["id"]: shift["hours"] for _, shift in shifts.iterrows()}
-    max_hours = {doctor["id"]: doctor["max_hours"] for _, doctor in doctors.iterrows()}
+    active = None
+    if gate_doctors:
+        active = {d: model.NewBoolVar(f"active_{d}") for d in D}
+        for (d, s), var in x.items():
+            model.AddImplication(var, active[d])
 
-    specialists = doctors[doctors["role"].isin(["specialist", "icu_specialist"])]["id"]
-    needs_mentor = doctors[doctors["needs_mentor"]==1]["id"]
-    opt_out_doctors = doctors[doctors["opt_out"]==1]["id"]
-    regular_doctors = doctors[doctors["opt_out"]==0]["id"]
+    def gated_floor(var, d, inactive_value, name):
+        """Wartość do minimum: var dla aktywnego lekarza, inactive_value (górna granica) dla nieaktywnego"""
+        floor = model.NewIntVar(0, inactive_value, name)
+        model.Add(floor == var).OnlyEnforceIf(active[d])
+        model.Add(floor == inactive_value).OnlyEnforceIf(active[d].Not())
+        return floor
 
-    twentyfour_allowed = {doctor["id"]: doctor["twentyfour_allowed"] for _, doctor in doctors.iterrows()}
-    twentyfour_shifts = [s for s in S if shifts.loc[shift_idx[s], "hours"] == 24]
+    # wiersze (lekarz) i kolumny (zmiana) macierzy zmiennych - wspólne dla wszystkich sum
+    doctor_row = {d: [x[(d, s)] for s in S] for d in D}
+    shift_col = {s: [x[(d, s)] for d in D] for s in S}
 
-    night_shifts = [s for s in S if "_N_" in shifts.loc[shift_idx[s], "code"] or shifts.loc[shift_idx[s], "hours"] == 24]
-    night_shifts_by_day = {day: [s for s in night_shifts if shift_day[s] == day] for day in days }
+    """ LISTS AND DICTS """
+    hours = instance.hours
+    shift_hours = [hours[s] for s in S]
 
-    day_shifts = {day: [s for s in S if shift_day[s] == day and hours[s] < 24] for day in days}
-    day_24h = {day: [s for s in S if shift_day[s] == day and hours[s] == 24] for day in days}
+    opt_out_doctors = instance.opt_out_doctors
+    regular_doctors = instance.regular_doctors
 
-    days_to_shifts = {day: [s for s in S if shift_day[s] == day] for day in days}
-    code_to_id = {row["code"]: row["id"] for _, row in shifts.iterrows()}
+    night_shifts = instance.night_shifts
 
-    full_day_unavail = {
-        d: set(unavail_day[unavail_day["doctor_id"] == d]["day"].tolist()) for d in D
-    }
-    available_days = {d: len([day for day in days if day not in full_day_unavail[d]]) for d in D}
+    code_to_id = instance.code_to_id
 
     """ Limit godzin pracy lekarzy z uwzględnieniem urlopów - dla tygodnia """
-    adjusted_max_hours = {}
-    for d in D:
-        if available_days[d] == 0:
-            adjusted_max_hours[d] = 0
-        else:
-            adjusted_max_hours[d] = int(max_hours[d] * available_days[d] / 7)
-
-    """ FUNCTIONS """
-    def rest_violation(sh1, sh2, min_rest=11) -> bool:
-        if abs_start[sh2] <= abs_end[sh1]:
-            return False
-        return (abs_start[sh2] - abs_end[sh1]) < min_rest
+    adjusted_max_hours = instance.adjusted_max_hours
 
     """ HARD CONSTRAINTS """
-    """1. Lekarz musi posiadać odpowiednie uprawnienia, aby mógł być przypisany do danej zmiany (taska) """
-    for _, shift in shifts.iterrows():
-        s = shift["id"]
-        req = shift["required_skill"]
-
-        for _, doctor in doctors.iterrows():
-            d = doctor["id"]
-            if req not in doctor["skill_list"]:
-                model.Add(x[(d,s)] == 0)
-
-    """2. Maksymalnie 1 zmiana w ciągu doby """
-    for d in D:
-        for day in days:
-            shifts_per_day = [s for s in S if shift_day[s] == day]
-            model.Add(
-                # sum(x[(d, s)] for s in shifts_per_day) <= 1
-                sum(x[(d, s)] for s in day_24h[day]) +
-                sum(x[(d, s)] for s in day_shifts[day]) <= 1
-            )
-
-    """3. Co najmniej 11 godzin nieprzerwanego odpoczynku po zmianie """
-    for d in D:
-        for s1 in S:
-            for s2 in S:
-                if s1 == s2:
-                    continue
-                if rest_violation(s1, s2):
-                    model.Add(x[(d, s1)] + x[(d, s2)] <= 1)
-
-
-    """4. Zachowanie limitu tygodniowego godzin pracy (w zależności od lekarza) """
-    for _, doctor in doctors.iterrows():
-        d = doctor["id"]
-        model.Add(
-            sum(x[(d, s)] * hours[s] for s in S) <= max_hours[d]
-        )
-
-    """5. Opiekun dla stażysty (i niekórych rezydentów) """
-    for s in S:
-        for d in needs_mentor:
-            model.Add(
-                x[(d,s)] <= sum(x[(spec,s)] for spec in specialists)
-            )
-
-    """6. Maksymalnie 2 dyżury nocne pod rząd """
-    for d in D:
-        for i in range(len(days)-2):
-            window_days = days[i:i+3]
-            shifts_in_window = [shift for day in window_days for shift in night_shifts_by_day[day]]
-            if shifts_in_window:
-                model.Add(sum(x[(d, s)] for s in shifts_in_window) <= 2)
-
-    """7. Dzień wolny po zmianie nocnej """
-    for d in D:
-        for i in range(len(days)-1):
-            current_day = days[i]
-            next_day = days[i+1]
-            current_night_shifts = [s for s in night_shifts if shift_day[s] == current_day]
-            next_day_shifts = [s for s in S if shift_day[s] == next_day]
-
-            if current_night_shifts and next_day_shifts:
-                model.Add(
-                    sum(x[(d, s)] for s in current_night_shifts) + sum(x[(d, s)] for s in next_day_shifts) <= 1
-                )
-
-    """8. Co najmniej 35 godzin nieprzerwanego odpoczynku w każdym tygodniu """
-    for d in D:
-        shifts_per_day = {day: [s for s in S if shift_day[s] == day] for day in days}
-        works_vars = []
-        for day in days:
-            works_var = model.NewBoolVar(f"works_{d}_{day}")
-            works_vars.append(works_var)
-
-            model.Add(sum(x[(d, s)] for s in shifts_per_day[day]) >= works_var)
-            model.Add(sum(x[(d, s)] for s in shifts_per_day[day]) <= 1000 * works_var)
-        model.Add(sum(works_vars) <= 6)
-
-
-    '''9. Nie każdy może mieć 24-godzinny dyżur '''
-    for d in D:
-        if twentyfour_allowed[d] == 0:
-            for s in twentyfour_shifts:
-                model.Add(x[(d,s)] == 0)
-
-
-    '''10. Uwzględnienie niedostępności (np: urlopy) '''
-    # Cały dzień
-    for _, row in unavail_day.iterrows():
-        d = row["doctor_id"]
-        day = row["day"]
-
-        for s in days_to_shifts[day]:
-            model.Add(x[d,s] == 0)
-
-    # Konkretna zmiana
-    for _, row in unavail_shift.iterrows():
-        d = row["doctor_id"]
-        code = row["code"]
-        s = code_to_id[code]
-        model.Add(x[d,s] == 0)
+    add_hard_constraints(model, x, instance)
 
 
     """ SLACK """
@@ -259,89 +252,181 @@ def run_model_and_get_results(doctors_df=None):
     """ Dodatkowo niewielka (do uzgodnienia) kara za overstaff - aby nie dodawać nadmiarowo godzin """
     slacks = {}
     slacks_o = {}
+    cover = {}
 
-    for _, shift in shifts.iterrows():
-        s = shift["id"]
-        min_staff = shift["min_staff"]
-        regular_staff = shift["regular_staff"]
+    for s, min_staff, regular_staff in zip(shifts["id"], shifts["min_staff"], shifts["regular_staff"]):
+        staffed = Sum(shift_col[s])
 
         # === Understaff ===
         slack = model.NewIntVar(0, min_staff, f"slack_{s}")
         slacks[s] = slack
-        model.Add(sum(x[(d, s)] for d in D) + slack >= min_staff)
+        cover[s] = model.Add(staffed + slack >= min_staff)
 
         # === Overstaff ===
         slack_o = model.NewIntVar(0, regular_staff, f"slack_{s}")
         slacks_o[s] = slack_o
-        model.Add(sum(x[(d, s)] for d in D) + slack_o <= regular_staff)
+        model.Add(staffed + slack_o <= regular_staff)
+
+    """ Dolne ograniczenie braków z przepływu - znane z góry, skraca dowód optymalności """
+    capacity = staffing_lower_bound(instance)
+    flow_bound = None
+    if gate_doctors:
+        flow_bound = model.Add(Sum(list(slacks.values())) >= 0)
+    elif capacity["lower_bound"] > 0:
+        flow_bound = model.Add(Sum(list(slacks.values())) >= capacity["lower_bound"])
 
     """ SOFT CONSTRAINTS """
-    pref_terms = []
+    pref_vars = []
+    pref_signs = []
+
+    # przesunięcia z historii (lekarze spoza historii - zera)
+    past = None
+    if history is not None:
+        past = history.reindex(D, fill_value=0)
+
+    if tight:
+        eligible = instance.eligibility()
+        hours_values = achievable_hours(instance, eligible)
+        night_ub = night_upper_bounds(instance, eligible)
 
     # === WORKLOAD PER DOCTOR (HOURS) ===
     worked_hours = {}
     for d in D:
         # od 0 do limitu godzin danego lekarza
         # h_var = model.NewIntVar(0, max_hours[d], f"worked_hours_{d}")
-        h_var = model.NewIntVar(0, adjusted_max_hours[d], f"worked_hours_{d}")
-        model.Add(h_var == sum(x[(d, s)] * hours[s] for s in S))
+        if tight:
+            h_var = model.NewIntVarFromDomain(cp_model.Domain.FromValues(hours_values[d]), f"worked_hours_{d}")
+        else:
+            h_var = model.NewIntVar(0, adjusted_max_hours[d], f"worked_hours_{d}")
+        model.Add(h_var == WeightedSum(doctor_row[d], shift_hours))
         worked_hours[d] = h_var
 
 
     """1. Preferencje """
-    for _, row in pref.iterrows():
-        d = row["doctor_id"]
-        shift_code = row["code"]
-        preference = row["preference"]
-
+    for d, shift_code, preference in zip(pref["doctor_id"], pref["code"], pref["preference"]):
         s = code_to_id[shift_code]
 
         if preference == "like":
-            pref_terms.append(-1 * x[(d, s)])
+            pref_vars.append(x[(d, s)])
+            pref_signs.append(-1)
 
         if preference == "dislike":
-            pref_terms.append(1 * x[(d, s)])
+            pref_vars.append(x[(d, s)])
+            pref_signs.append(1)
 
 
     """2. Fairness - jak najbardziej równomierne obłożenie trudnymi dyżurami """
     """a. Zmiany nocne """
     night_count = {}
     for d in D:
-        count = model.NewIntVar(0, 100, f"night_count_{d}")
-        model.Add(count == sum(x[(d, s)] for s in night_shifts))
+        count = model.NewIntVar(0, night_ub[d] if tight else 100, f"night_count_{d}")
+        model.Add(count == Sum([x[(d, s)] for s in night_shifts]))
         night_count[d] = count
 
-    max_nights = model.NewIntVar(0, 100, "max_nights")
-    min_nights = model.NewIntVar(0, 100, "min_nights")
+    nights_top = max(night_ub.values(), default=0) if tight else 100
+
+    # noce do rozrzutu - z historią suma skumulowana (noce z poprzednich tygodni + bieżący)
+    night_fair = night_count
+    if past is not None:
+        night_fair = {}
+        for d in D:
+            offset = int(past.at[d, "nights"])
+            total = model.NewIntVar(offset, offset + (night_ub[d] if tight else 100), f"night_total_{d}")
+            model.Add(total == night_count[d] + offset)
+            night_fair[d] = total
+        nights_top += int(past["nights"].max()) if len(past) else 0
+
+    max_nights = model.NewIntVar(0, nights_top, "max_nights")
+    min_nights = model.NewIntVar(0, nights_top, "min_nights")
 
-    model.AddMaxEquality(max_nights, list(night_count.values()))
-    model.AddMinEquality(min_nights, list(night_count.values()))
+    night_floor = list(night_fair.values())
+    if active is not None:
+        night_floor = [gated_floor(night_count[d], d, 100, f"night_floor_{d}") for d in D]
 
-    spread = model.NewIntVar(0, 100, "night_spread")
+    model.AddMaxEquality(max_nights, list(night_fair.values()))
+    model.AddMinEquality(min_nights, night_floor)
+
+    spread = model.NewIntVar(0, nights_top, "night_spread")
     model.Add(spread == max_nights - min_nights)
 
 
-    """b. Zmiany weekendowe - TODO: w perspektywnie miesiąca (na razie patrzymy na pojedynczy tydzień) """
+    """b. Zmiany weekendowe i dyżury 24h - tylko z historią (w pojedynczym tygodniu to 1-2 zmiany na lekarza) """
+    # rozrzut sum skumulowanych jak dla nocy; 24h tylko wśród lekarzy z uprawnieniem
+    history_spreads = {}
+    if past is not None:
+        twentyfour_doctors = set(instance.doctors.loc[instance.doctors["twentyfour_allowed"] == 1, "id"])
+        history_groups = {
+            "weekend": (D, [s for s in S if instance.shift_day[s] in WEEKEND_DAYS], "weekends"),
+            "twentyfour": ([d for d in D if d in twentyfour_doctors], list(instance.twentyfour_shifts), "twentyfour"),
+        }
+        for name, (group_doctors, group_shifts, column) in history_groups.items():
+            if not group_doctors or not group_shifts:
+                continue
+            totals = []
+            for d in group_doctors:
+                offset = int(past.at[d, column])
+                total = model.NewIntVar(offset, offset + len(group_shifts), f"{name}_total_{d}")
+                model.Add(total == Sum([x[(d, s)] for s in group_shifts]) + offset)
+                totals.append(total)
+
+            top = int(past.loc[group_doctors, column].max()) + len(group_shifts)
+            group_max = model.NewIntVar(0, top, f"max_{name}")
+            group_min = model.NewIntVar(0, top, f"min_{name}")
+            model.AddMaxEquality(group_max, totals)
+            model.AddMinEquality(group_min, totals)
+            group_spread = model.NewIntVar(0, top, f"{name}_spread")
+            model.Add(group_spread == group_max - group_min)
+            history_spreads[name] = group_spread
 
     """3. Jak najbardziej równy procent wypracowanych godzin względem limitu """
     workload_ratio = {}
+    ratio_bounds = {}
+    ratio_top = 1000 if tight else 2000
     for d in opt_out_doctors:
-        ratio = model.NewIntVar(0, 2000, f"workload_ratio_{d}")
+        # z historią: (godziny z historii + bieżące) / (limity z historii + bieżący limit)
+        past_hours = int(past.at[d, "hours"]) if past is not None else 0
+        limit = adjusted_max_hours[d] + (int(past.at[d, "capacity"]) if past is not None else 0)
+
+        if tight:
+            # lekarz bez dostępnych godzin nie wpływa na rozrzut (w "classic" jego proporcja jest dowolna)
+            if limit == 0:
+                continue
+            table = [(h, round(1000 * (past_hours + h) / limit)) for h in hours_values[d]]
+            ratio = model.NewIntVarFromDomain(
+                cp_model.Domain.FromValues(sorted({r for _, r in table})), f"workload_ratio_{d}"
+            )
+            model.AddAllowedAssignments([worked_hours[d], ratio], table)
+            workload_ratio[d] = ratio
+            ratio_top = max(ratio_top, max(r for _, r in table))
+            continue
+
+        top = 2000
+        if past is not None:
+            # nadgodziny z historii mogą wyprowadzić proporcję ponad 200%
+            top = max(top, 1000 * (past_hours + instance.max_hours[d]) // max(limit, 1) + 1)
+            ratio_top = max(ratio_top, top)
+        ratio = model.NewIntVar(0, top, f"workload_ratio_{d}")
 
         # model.Add(ratio * max_hours[d] <= worked_hours[d] * 1000 + 50)
         # model.Add(ratio * max_hours[d] >= worked_hours[d] * 1000 - 50)
-        model.Add(ratio * adjusted_max_hours[d] <= worked_hours[d] * 1000 + 50)
-        model.Add(ratio * adjusted_max_hours[d] >= worked_hours[d] * 1000 - 50)
+        ratio_bounds[d] = (
+            model.Add(ratio * limit <= (worked_hours[d] + past_hours) * 1000 + 50),
+            model.Add(ratio * limit >= (worked_hours[d] + past_hours) * 1000 - 50),
+        )
 
         workload_ratio[d] = ratio
 
-    max_ratio = model.NewIntVar(0, 2000, "max_ratio")
-    min_ratio = model.NewIntVar(0, 2000, "min_ratio")
-    ratio_spread = model.NewIntVar(0, 2000, "ratio_spread")
+    max_ratio = model.NewIntVar(0, ratio_top, "max_ratio")
+    min_ratio = model.NewIntVar(0, ratio_top, "min_ratio")
+    ratio_spread = model.NewIntVar(0, ratio_top, "ratio_spread")
 
     if workload_ratio:
+        ratio_floor = list(workload_ratio.values())
+        if active is not None:
+            ratio_floor = [gated_floor(workload_ratio[d], d, 2000, f"ratio_floor_{d}") for d in workload_ratio]
+
         model.AddMaxEquality(max_ratio, list(workload_ratio.values()))
-        model.AddMinEquality(min_ratio, list(workload_ratio.values()))
+        model.AddMinEquality(min_ratio, ratio_floor)
         model.Add(ratio_spread == max_ratio - min_ratio)
 
     else:
@@ -352,95 +437,214 @@ def run_model_and_get_results(doctors_df=None):
 
     """4. Przepracowanie wystarczającej liczby godzin przez regularnych lekarzy (można zamienić na hard constraint lub pozostawić takie uproszczenie ze względu na to, iż w szpitalach często zdarzają się nieplanowane nadgodziny - np. w wyniku przedłużenia zabiegu """
     underwork = {}
+    underwork_target = {}
     for d in regular_doctors:
         # uw = model.NewIntVar(0, max_hours[d], f"underwork_{d}")
         # target = int(0.95 * max_hours[d])
-        uw = model.NewIntVar(0, adjusted_max_hours[d], f"underwork_{d}")
         target = int(0.95 * adjusted_max_hours[d])
+        # przy minimalizacji uw = max(0, target - godziny) <= target
+        uw = model.NewIntVar(0, target if tight else adjusted_max_hours[d], f"underwork_{d}")
 
-        model.Add(uw >= target - worked_hours[d])
+        underwork_target[d] = model.Add(uw >= target - worked_hours[d])
+        if active is not None:
+            underwork_target[d].OnlyEnforceIf(active[d])
         model.Add(uw >= 0)
 
         underwork[d] = uw
 
 
     """ OBJECTIVE FUNCTION """
-    W_SLACK = 10000 # w przypadku braku personelu - tylko w najwyższej konieczności
-    w_overstaff = 1
-    w_pref = 2
-    w_night = 1
-    w_ratio = 2
-    w_underwork = 1
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+
+    # składniki funkcji celu bez wag - wagi nakłada weighted_objective
+    objective_parts = {
+        "pref": (pref_vars, pref_signs),
+        "night": ([spread], [1]),
+        "ratio": ([ratio_spread], [1]),
+        "underwork": (list(underwork.values()), [1] * len(underwork)),
+        "slack": (list(slacks.values()), [1] * len(slacks)),
+        "overstaff": (list(slacks_o.values()), [1] * len(slacks_o)),
+    }
+    for name, group_spread in history_spreads.items():
+        objective_parts[name] = ([group_spread], [1])
+
+    objective = weighted_objective(objective_parts, weights)
+    model.Minimize(objective)
+
+    """ HINT """
+    # Pełna podpowiedź z gotowego grafiku (np. heurystyka albo poprzednie rozwiązanie);
+    # lekarze spoza podpowiedzi (np. nowy kandydat) dostają 0
+    if hint is not None:
+        for (d, s), var in x.items():
+            value = hint.at[d, s] if d in hint.index and s in hint.columns else 0
+            model.AddHint(var, int(value))
+
+    return {
+        "model": model,
+        "x": x,
+        "slacks": slacks,
+        "slacks_o": slacks_o,
+        "worked_hours": worked_hours,
+        "night_count": night_count,
+        "max_nights": max_nights,
+        "min_nights": min_nights,
+        "spread": spread,
+        "workload_ratio": workload_ratio,
+        "ratio_spread": ratio_spread,
+        "underwork": underwork,
+        # suma preferencji (-1 za spełnione like, +1 za naruszone dislike) - bez wagi
+        "pref_score": WeightedSum(pref_vars, pref_signs),
+        "weights": weights,
+        "objective": objective,
+        "objective_parts": objective_parts,
+        "capacity": capacity,
+        "active": active,
+        # ograniczenia, których stałe zależą od danych (zmieniane przez RosterModel)
+        "constraints": {
+            "cover": cover,
+            "flow_bound": flow_bound,
+            "underwork_target": underwork_target,
+            "ratio_bounds": ratio_bounds,
+        },
+    }
+
+
+# === SOLVER PROFILES ===
+# Nazwane zestawy parametrów CP-SAT (nazwy pól jak w solver.parameters)
+SOLVER_PROFILES = {
+    "default": {"num_search_workers": 8},
+    "fast": {"num_search_workers": 8, "max_time_in_seconds": 10},
+    "thorough": {"num_search_workers": 8, "max_time_in_seconds": 600},
+}
+
+# Profile zapisane przez strojenie parametrów (model/tuning.py)
+PROFILES_PATH = BASE_DIR / "solver_profiles.json"
+
+
+def load_solver_profiles(path=None):
+    """Profile wbudowane + zapisane w pliku JSON ({nazwa: parametry}); plik ma pierwszeństwo"""
+    profiles = dict(SOLVER_PROFILES)
+    path = Path(path or PROFILES_PATH)
+    if path.exists():
+        profiles.update(json.loads(path.read_text(encoding="utf-8")))
+    return profiles
+
+
+def save_solver_profile(name, params, path=None):
+    """Dopisuje (albo nadpisuje) profil w pliku JSON"""
+    path = Path(path or PROFILES_PATH)
+    stored = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    stored[name] = params
+    path.write_text(json.dumps(stored, indent=2, ensure_ascii=False), encoding="utf-8")
+    return path
 
-    objective_terms = []
 
-    objective_terms += [w_pref * term for term in pref_terms]
-    objective_terms.append(w_night * spread)
-    objective_terms.append(w_ratio * ratio_spread)
-    objective_terms.append(w_underwork * sum(underwork[d] for d in regular_doctors))
-    objective_terms.append(W_SLACK * sum(slacks[s] for s in slacks))
-    objective_terms.append(w_overstaff * sum(slacks_o[s] for s in slacks_o))
+def apply_solver_profile(solver, profile=None):
+    """Ustawia parametry solvera z profilu - nazwa (wbudowana albo z pliku) lub słownik parametrów"""
+    if profile is None:
+        profile = "default"
+    if isinstance(profile, str):
+        profiles = load_solver_profiles()
+        if profile not in profiles:
+            raise ValueError(f"nieznany profil solvera '{profile}' (dostępne: {', '.join(sorted(profiles))})")
+        profile = profiles[profile]
+    for name, value in profile.items():
+        setattr(solver.parameters, name, value)
+    return solver
 
-    model.Minimize(sum(objective_terms))
+
+# === MAIN FUNCTION ===
+def run_model_and_get_results(doctors_df=None, instance=None, time_limit=None, hint=None, weights=None,
+                              profile=None, dump_dir=None, formulation="classic", history=None, early_stop=None):
+    # Dane wejściowe - zwalidowana instancja (domyślnie pliki z katalogu data/)
+    if instance is None:
+        instance = load_instance()
+    if doctors_df is not None:
+        instance = instance.with_doctors(doctors_df)
+
+    doctors = instance.doctors
+    shifts = instance.shifts
+    unavail_day = instance.unavail_day
+    unavail_shift = instance.unavail_shift
+    pref = instance.pref
+
+    D = instance.D
+    S = instance.S
+
+    shift_idx = instance.shift_idx
+
+    id_to_name = instance.id_to_name
+    id_to_role = instance.id_to_role
+
+    days = instance.days
+    hours = instance.hours
+    max_hours = instance.max_hours
+    opt_out_doctors = instance.opt_out_doctors
+    twentyfour_shifts = instance.twentyfour_shifts
+    night_shifts = instance.night_shifts
+    code_to_id = instance.code_to_id
+    adjusted_max_hours = instance.adjusted_max_hours
+
+    """ MODEL """
+    built = build_roster_model(instance, hint=hint, weights=weights, formulation=formulation, history=history)
+    model = built["model"]
+    x = built["x"]
+    slacks = built["slacks"]
+    max_nights = built["max_nights"]
+    min_nights = built["min_nights"]
+    spread = built["spread"]
+    capacity = built["capacity"]
 
     """ SOLVER """
     solver = cp_model.CpSolver()
 
-    solver.parameters.num_search_workers = 8
-    status = solver.Solve(model)
+    apply_solver_profile(solver, profile)
+    if time_limit is not None:
+        solver.parameters.max_time_in_seconds = time_limit
 
+    # Zrzut modelu, parametrów i podpowiedzi do odtworzenia poza aplikacją (model/replay.py)
+    if dump_dir is not None:
+        dump_solve_inputs(dump_dir, model, solver, instance.input_hash(), {
+            "doctors": len(D),
+            "shifts": len(S),
+            "weights": built["weights"],
+        })
 
-    """ SCHEDULE DATAFRAME """
-    rows = []
-    shifts_sorted = shifts.sort_values(by=["day", "start_hour"])
-
-    for day in days:
-        for _, sh in shifts_sorted[shifts_sorted["day"] == day].iterrows():
-            s_id = sh["id"]
-            assigned = [d for d in D if solver.Value(x[(d, s_id)]) == 1]
-            missing = solver.Value(slacks[s_id])  # liczba brakujących lekarzy
-
-            for d in assigned:
-                rows.append({
-                    "Day": day,
-                    "ShiftCode": sh["code"],
-                    "Dept": sh["dept"],
-                    "StartHour": sh["start_hour"],
-                    "EndHour": sh["end_hour"],
-                    "Hours": sh["hours"],
-                    "Doctor": id_to_name[d],
-                    "Role": id_to_role[d],
-                    "Missing": 0
-                })
-
-            # potem NONE
-            for _ in range(missing):
-                rows.append({
-                    "Day": day,
-                    "ShiftCode": sh["code"],
-                    "Dept": sh["dept"],
-                    "StartHour": sh["start_hour"],
-                    "EndHour": sh["end_hour"],
-                    "Hours": sh["hours"],
-                    "Doctor": None,
-                    "Role": None,
-                    "Missing": 1
-                })
-    schedule_df = pd.DataFrame(rows)
-
-    """ STATISTICS """
-    # stats_df = build_doctor_stats(
-    #     D, S, id_to_name, id_to_role, x, hours,
-    #     night_shifts, twentyfour_shifts, shifts, shift_idx, max_hours, solver
-    # )
-    stats_df = build_doctor_stats(
-        D, S, id_to_name, id_to_role, x, hours,
-        night_shifts, twentyfour_shifts, shifts, shift_idx, adjusted_max_hours, solver
-    )
-
-    stats_df = add_preference_stats(stats_df, pref, x, solver, id_to_name, code_to_id)
+    # Wcześniejsze zakończenie (model/early_stop.py) - reguły zamiast czekania do limitu czasu
+    controller = None
+    if early_stop:
+        controller = EarlyStopController.from_rules(solver, slacks, capacity["lower_bound"], early_stop)
+        status = controller.solve(model)
+    else:
+        status = solver.Solve(model)
+
+
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        """ SCHEDULE DATAFRAME """
+        assignment = assignment_matrix(x, solver, D, S)
+        schedule_df = build_schedule_df(assignment, instance, compute_missing_per_shift(slacks, solver))
+
+        """ STATISTICS """
+        # stats_df = build_doctor_stats(
+        #     D, S, id_to_name, id_to_role, x, hours,
+        #     night_shifts, twentyfour_shifts, shifts, shift_idx, max_hours, solver
+        # )
+        stats_df = build_doctor_stats(
+            D, S, id_to_name, id_to_role, x, hours,
+            night_shifts, twentyfour_shifts, shifts, shift_idx, adjusted_max_hours, solver
+        )
 
-    solver_stats_df = build_solver_stats(solver, max_nights, min_nights, spread, status)
+        stats_df = add_preference_stats(stats_df, pref, x, solver, id_to_name, code_to_id)
+    else:
+        # bez rozwiązania (limit czasu, niedopuszczalność) solver nie ma wartości zmiennych -
+        # puste wyniki, sam status w solver_stats_df
+        assignment = None
+        schedule_df = pd.DataFrame(columns=SCHEDULE_COLUMNS)
+        stats_df = pd.DataFrame()
+
+    solver_stats_df = build_solver_stats(
+        solver, max_nights, min_nights, spread, status, capacity["lower_bound"], stop_reason(status, controller)
+    )
 
     """ FUNCTIONS """
     def print_schedule():
@@ -580,6 +784,7 @@ def run_model_and_get_results(doctors_df=None):
         print(f"Conflicts  : {solver.NumConflicts()}")
         print(f"Branches   : {solver.NumBranches()}")
         print(f"Wall time  : {solver.WallTime():.3f} s")
+        print(f"Stop       : {solver_stats_df['stop_reason'].iloc[0]}")
     else:
         print("Brak wykonalnego rozwiązania dla obecnych ograniczeń.")
 
@@ -594,24 +799,39 @@ def run_model_and_get_results(doctors_df=None):
         unavail_shift,
         slacks,
         solver,
-        shift_idx
+        shift_idx,
+        assignment
     )
 
 """ ADDITIONAL DOCTOR """
 # === Tworzenie nowego "idealnego" lekarza ===
-def generate_best_new_doctor(slacks, shifts, shift_idx, solver, index):
-    """Tworzy jednego lekarza pokrywającego wszystkie istniejące braki"""
+def generate_best_new_doctor(slacks, shifts, shift_idx, solver, index, diagnosis=None):
+    """
+    Tworzy jednego lekarza pokrywającego wszystkie istniejące braki (lub zmiany z diagnozy konfliktu).
+    Zmiany z diagnozy tylko przy udowodnionym konflikcie (INFEASIBLE z niepustą listą zmian) -
+    diagnoza przerwana limitem czasu nic nie mówi, wtedy liczą się braki z rozwiązania (slacki).
+    """
 
     missing_skills = []
     needs_24 = False
 
-    for s, sl in slacks.items():
-        miss = solver.Value(sl)
-        if miss > 0:
-            skill = shifts.loc[shift_idx[s], "required_skill"]
-            missing_skills.append(skill)
-            if shifts.loc[shift_idx[s], "hours"] == 24:
+    conflict_shifts = None
+    if diagnosis is not None and diagnosis["status"] == "INFEASIBLE" and len(diagnosis["shifts"]):
+        conflict_shifts = diagnosis["shifts"]
+
+    if conflict_shifts is not None:
+        for _, sh in conflict_shifts.iterrows():
+            missing_skills.append(sh["required_skill"])
+            if sh["hours"] == 24:
                 needs_24 = True
+    else:
+        for s, sl in slacks.items():
+            miss = solver.Value(sl)
+            if miss > 0:
+                skill = shifts.loc[shift_idx[s], "required_skill"]
+                missing_skills.append(skill)
+                if shifts.loc[shift_idx[s], "hours"] == 24:
+                    needs_24 = True
 
     if not missing_skills:
         return None
@@ -635,9 +855,97 @@ def generate_best_new_doctor(slacks, shifts, shift_idx, solver, index):
 def compute_sum_slack(slacks, solver):
     return sum(solver.Value(sl) for sl in slacks.values())
 
-def run_model_with_candidate(base_doctors_df, candidate_dict, shifts, unavail_day, unavail_shift):
+def compute_missing_per_shift(slacks, solver):
+    """Zwraca słownik {id zmiany: liczba brakujących lekarzy} tylko dla zmian z brakami"""
+    missing = {}
+    for s, sl in slacks.items():
+        miss = solver.Value(sl)
+        if miss > 0:
+            missing[s] = miss
+    return missing
+
+""" PRE-SCREENING KANDYDATÓW """
+# === Tanie oszacowanie przydatności kandydata bez uruchamiania solvera ===
+SPECIALIST_ROLES = ("specialist", "icu_specialist")
+
+def candidate_profile(candidate, unavail_day, unavail_shift, days_count=7):
+    """Zwraca uproszczony opis kandydata: umiejętności, limit godzin i niedostępności"""
+    d = candidate["id"]
+    skills = set(candidate["skills"].split(";")) if isinstance(candidate["skills"], str) else set()
+    off_days = set(unavail_day[unavail_day["doctor_id"] == d]["day"].tolist())
+    off_codes = set(unavail_shift[unavail_shift["doctor_id"] == d]["code"].tolist())
+
+    # ten sam limit co worked_hours w modelu (proporcjonalnie do dostępnych dni)
+    available_days = days_count - len(off_days)
+    hours_limit = int(candidate["max_hours"] * available_days / days_count) if available_days > 0 else 0
+
+    return {
+        "skills": skills,
+        "hours_limit": hours_limit,
+        "twentyfour_allowed": int(candidate.get("twentyfour_allowed", 0)),
+        "is_specialist": candidate.get("role") in SPECIALIST_ROLES,
+        "needs_mentor": int(candidate.get("needs_mentor", 0)),
+        "off_days": off_days,
+        "off_codes": off_codes,
+        "salary": candidate.get("salary", 0),
+    }
+
+def dominates(p1, p2):
+    """Czy kandydat p1 może wykonać każdy grafik kandydata p2 i nie jest droższy"""
+    return (
+        p1["skills"] >= p2["skills"]
+        and p1["hours_limit"] >= p2["hours_limit"]
+        and p1["twentyfour_allowed"] >= p2["twentyfour_allowed"]
+        and (p1["is_specialist"] or not p2["is_specialist"])
+        and p1["needs_mentor"] <= p2["needs_mentor"]
+        and p1["off_days"] <= p2["off_days"]
+        and p1["off_codes"] <= p2["off_codes"]
+        and p1["salary"] <= p2["salary"]
+    )
+
+def prescreen_candidates(candidates_df, missing, unavail_day, unavail_shift, instance=None):
+    """
+    Odrzuca kandydatów zdominowanych, a z instancją także tych, którzy nie mogą zmniejszyć
+    braków. Ograniczenie poprawy to obecne braki minus dolne ograniczenie braków z przepływu
+    dla zespołu z kandydatem - relaksacja, więc żaden grafik (także z efektami pośrednimi)
+    nie zejdzie poniżej niej. Zwraca listę (kandydat, ograniczenie) posortowaną malejąco
+    po ograniczeniu, a przy remisie rosnąco po stawce (bez instancji ograniczenie to None).
+    """
+    slack_before = sum(missing.values())
+    screened = []
+    for _, row in candidates_df.iterrows():
+        candidate = row.to_dict()
+        profile = candidate_profile(candidate, unavail_day, unavail_shift)
+        bound = None
+        if instance is not None:
+            extended = instance.with_doctors(
+                pd.concat([instance.doctors, pd.DataFrame([candidate])], ignore_index=True)
+            )
+            bound = slack_before - staffing_lower_bound(extended)["lower_bound"]
+            if bound <= 0:
+                continue
+        screened.append((candidate, profile, bound))
+
+    kept = []
+    for i, (candidate, profile, bound) in enumerate(screened):
+        dominated = False
+        for j, (_, other, other_bound) in enumerate(screened):
+            if i == j or not dominates(other, profile):
+                continue
+            # przy identycznych kandydatach zostawiamy pierwszego z listy
+            if not dominates(profile, other) or j < i:
+                dominated = True
+                break
+        if not dominated:
+            kept.append((candidate, bound))
+
+    kept.sort(key=lambda item: (-(item[1] or 0), item[0]["salary"]))
+    return kept
+
+def run_model_with_candidate(base_doctors_df, candidate_dict, shifts, unavail_day, unavail_shift, instance=None,
+                             hint=None, weights=None, profile=None, dump_dir=None, formulation="classic",
+                             history=None, early_stop=None):
     doctors_extended = pd.concat([base_doctors_df, pd.DataFrame([candidate_dict])], ignore_index=True)
-    doctors_extended["skill_list"] = doctors_extended["skills"].apply(lambda x: x.split(";") if isinstance(x, str) else [])
 
     (
         status,
@@ -650,26 +958,78 @@ def run_model_with_candidate(base_doctors_df, candidate_dict, shifts, unavail_da
         _,
         slacks,
         solver,
+        _,
         _
-    ) = run_model_and_get_results(doctors_df=doctors_extended)
+    ) = run_model_and_get_results(doctors_df=doctors_extended, instance=instance, hint=hint,
+                                  weights=weights, profile=profile, dump_dir=dump_dir,
+                                  formulation=formulation, history=history, early_stop=early_stop)
 
+    # bez rozwiązania nie wiadomo, ile braków zostaje - kandydat nieoceniony
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
     return compute_sum_slack(slacks, solver)
 
+def lp_shortlist(candidates_df, instance, top_k):
+    """
+    Zostawia top_k kandydatów z rankingu relaksacji LP (szacowana poprawa, przy remisie niższa
+    stawka - jak w choose_best_candidate). Zwraca (kandydaci, ranking LP). Gdy relaksacja nie
+    widzi braków (luka całkowitoliczbowa), wartości dualne są zerowe i ranking nic nie mówi -
+    wtedy zwraca wszystkich kandydatów i ranking None. Tak samo, gdy relaksacji nie udało się
+    rozwiązać - ranking jest tylko przyspieszeniem, dokładna ocena obejmie wtedy całą pulę.
+    """
+    try:
+        ranking = rank_candidates_lp(instance, candidates_df)
+    except RuntimeError as e:
+        print(f"Ranking LP pominięty: {e}")
+        return candidates_df, None
+    if ranking["lp_missing"].iloc[0] <= DUAL_EPS:
+        return candidates_df, None
+    top = ranking.head(top_k)
+    return candidates_df[candidates_df["id"].isin(top["id"])], ranking
+
 # === Wybór lekarza z dostępnych ===
+# przy większej puli dokładnie (CP-SAT) sprawdzamy tylko tylu najlepszych kandydatów z rankingu LP
+LP_TOP_K = 5
+
 def choose_best_candidate(candidates_df, slack_sum_before, base_doctors_df,
-                          shifts, unavail_day, unavail_shift):
+                          shifts, unavail_day, unavail_shift, missing=None, instance=None, hint=None,
+                          weights=None, profile=None, dump_dir=None, lp_top_k=LP_TOP_K, formulation="classic",
+                          history=None, early_stop=None):
 
     # wyniki w formie (kandydat,poprawa,koszt)
     results = []
 
-    for _, row in candidates_df.iterrows():
-        candidate = row.to_dict()
-        slack_after = run_model_with_candidate(base_doctors_df, candidate, shifts, unavail_day, unavail_shift)
+    # Ranking LP - przy dużej puli tylko najlepsi kandydaci idą do dokładnego rozwiązania (lp_top_k=None wyłącza)
+    if lp_top_k is not None and instance is not None and len(candidates_df) > lp_top_k:
+        candidates_df, _ = lp_shortlist(candidates_df, instance, lp_top_k)
+
+    # Pre-screening - jeśli znamy braki, odrzucamy zdominowanych i bezużytecznych kandydatów
+    # i sprawdzamy pozostałych od największego ograniczenia poprawy
+    if missing is not None:
+        screened = prescreen_candidates(candidates_df, missing, unavail_day, unavail_shift, instance)
+    else:
+        screened = [(row.to_dict(), None) for _, row in candidates_df.iterrows()]
+
+    best = None
+    for candidate, bound in screened:
+        # Wcześniejsze zakończenie - żaden z pozostałych kandydatów nie może być lepszy
+        # (ograniczenie z przepływu jest górnym ograniczeniem poprawy dla dowolnego grafiku)
+        if best is not None and bound is not None:
+            if bound < best[1] or (bound == best[1] and candidate["salary"] >= best[2]):
+                break
+
+        slack_after = run_model_with_candidate(base_doctors_df, candidate, shifts, unavail_day, unavail_shift,
+                                               instance=instance, hint=hint, weights=weights, profile=profile,
+                                               dump_dir=dump_dir, formulation=formulation, history=history,
+                                               early_stop=early_stop)
+        if slack_after is None:
+            continue
 
         improvement = slack_sum_before - slack_after
 
         if improvement > 0:
             results.append((candidate, improvement, candidate["salary"]))
+            best = min(results, key=lambda x: (-x[1], x[2]))
 
     if not results:
         return None
@@ -685,7 +1045,24 @@ def choose_best_candidate(candidates_df, slack_sum_before, base_doctors_df,
 
 
 # === GŁÓWNA FUNKCJA PO UWZGLĘDNIENIU DODAWANIA LEKARZA W PRZYPADKU BRAKÓW ===
-def run_with_one_extra_doctor():
+# limit czasu (s) dla grafiku "przed", gdy przepływ już udowodnił braki
+SHORT_STAFFED_TIME_LIMIT = 10
+
+def run_with_one_extra_doctor(instance=None, candidates_df=None, weights=None, profile=None, dump_dir=None,
+                              lp_top_k=LP_TOP_K, formulation="classic", history=None, early_stop=None):
+    if instance is None:
+        instance = load_instance()
+    if candidates_df is None:
+        candidates_df = load_candidates()
+
+    # Szybki test przepływowy - jeśli braki są nieuniknione, nie czekamy na pełny dowód optymalności
+    # grafiku "przed" (i tak zostanie zastąpiony), tylko od razu przechodzimy do wyboru kandydata
+    capacity = staffing_lower_bound(instance)
+    base_time_limit = None
+    if capacity["lower_bound"] > 0:
+        print(f"Braki nie do uniknięcia (przepływ): co najmniej {capacity['lower_bound']}")
+        base_time_limit = SHORT_STAFFED_TIME_LIMIT
+
     print("\n=== PIERWSZA ITERACJA (SPRAWDZENIE CZY DA SIĘ UTWORZYĆ HARMONOGRAM BEZ BRAKÓW) ===")
 
     (
@@ -699,31 +1076,53 @@ def run_with_one_extra_doctor():
         unavail_shift,
         slacks,
         solver,
-        shift_idx
-    ) = run_model_and_get_results()
+        shift_idx,
+        assignment_before
+    ) = run_model_and_get_results(
+        instance=instance, time_limit=base_time_limit, hint=construct_greedy(instance)["assignment"],
+        weights=weights, profile=profile, dump_dir=dump_dir, formulation=formulation, history=history,
+        early_stop=early_stop
+    )
+
+    # Bez rozwiązania "przed" nie ma braków do porównania - kandydatów nie oceniamy
+    solved = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
 
     # Obliczneie ile zmian pozostało nieobsadzonych
-    total_missing = sum(solver.Value(sl) for sl in slacks.values())
+    total_missing = sum(solver.Value(sl) for sl in slacks.values()) if solved else None
 
-    # Jeśli da się obsadzić wszystkie zmiany aktualnymi lekarzami - koniec
-    if total_missing == 0:
-        print("Aktualny personel jest wystarczający")
+    # Jeśli da się obsadzić wszystkie zmiany aktualnymi lekarzami (albo nie ma rozwiązania) - koniec
+    if total_missing == 0 or not solved:
+        if solved:
+            print("Aktualny personel jest wystarczający")
         return {
             "added": False,
             "status": status,
             "schedule_before": schedule_before,
             "stats_before": stats_before,
-            "solver_stats_before": solver_stats_before
+            "solver_stats_before": solver_stats_before,
+            "assignment_before": assignment_before
         }
 
     # Jeśli nie da się obsadzić zmian dostępnymi lekarzami, szukamy dodatkowego, najbardziej optymalnego kandydata
 
+    # Diagnoza - które zmiany, lekarze i reguły się wykluczają (jedno krótkie rozwiązanie bez slacków)
+    diagnosis = diagnose_understaffing(instance)
+    print("Konflikt dotyczy zmian:", ", ".join(diagnosis["shifts"]["code"]))
+
     # Wersja z generowaniem lekarza
     # new_doc = generate_best_new_doctor(slacks, shifts, shift_idx, solver, index=0)
     # print("Dodany lekarz:", new_doc)
 
-    candidates_df = pd.read_csv(DATA_DIR / "doctors_to_hire.csv")
     slack_sum_before = compute_sum_slack(slacks, solver)
+
+    # Ranking LP - przy dużej puli do dokładnej oceny idą tylko najlepsi kandydaci
+    if lp_top_k is not None and len(candidates_df) > lp_top_k:
+        candidates_df, lp_ranking = lp_shortlist(candidates_df, instance, lp_top_k)
+        if lp_ranking is not None:
+            top = lp_ranking.head(lp_top_k)
+            print(f"Ranking LP - do dokładnej oceny {len(top)} z {len(lp_ranking)} kandydatów:",
+                  ", ".join(f"{n} ({e:.2f})" for n, e in zip(top["name"], top["estimate"])))
+
     best_candidate = choose_best_candidate(
         candidates_df=candidates_df,
         slack_sum_before=slack_sum_before,
@@ -731,18 +1130,39 @@ def run_with_one_extra_doctor():
         shifts=shifts,
         unavail_day=unavail_day,
         unavail_shift=unavail_shift,
+        missing=compute_missing_per_shift(slacks, solver),
+        instance=instance,
+        hint=assignment_before,
+        weights=weights,
+        profile=profile,
+        dump_dir=dump_dir,
+        # ranking LP już zastosowany wyżej
+        lp_top_k=None,
+        formulation=formulation,
+        history=history,
+        early_stop=early_stop,
     )
     if best_candidate is None:
         print("Brak kandydata spełniającego wszytskie wymagania - dodajemy hipotetycznego lekarza")
-        new_doc = generate_best_new_doctor(slacks, shifts, shift_idx, solver, index=0)
+        new_doc = generate_best_new_doctor(slacks, shifts, shift_idx, solver, index=0, diagnosis=diagnosis)
     else:
         new_doc = best_candidate
         print("Znaleziono najlepszego kandydata: ", best_candidate)
 
+    # brak umiejętności do uzupełnienia - zostaje grafik "przed"
+    if new_doc is None:
+        print("Nie da się określić brakujących umiejętności - grafik bez dodatkowego lekarza")
+        return {
+            "added": False,
+            "status": status,
+            "schedule_before": schedule_before,
+            "stats_before": stats_before,
+            "solver_stats_before": solver_stats_before,
+            "assignment_before": assignment_before,
+            "diagnosis": diagnosis
+        }
+
     doctors_ext = pd.concat([doctors, pd.DataFrame([new_doc])], ignore_index=True)
-    doctors_ext["skill_list"] = doctors_ext["skills"].apply(
-        lambda sk: sk.split(";") if isinstance(sk, str) else []
-    )
 
     (
         status_after,
@@ -750,7 +1170,10 @@ def run_with_one_extra_doctor():
         stats_after,
         solver_stats_after,
         *_,
-    ) = run_model_and_get_results(doctors_df=doctors_ext)
+        assignment_after
+    ) = run_model_and_get_results(doctors_df=doctors_ext, instance=instance, hint=assignment_before,
+                                  weights=weights, profile=profile, dump_dir=dump_dir,
+                                  formulation=formulation, history=history, early_stop=early_stop)
 
     return {
         "added": True,
@@ -761,11 +1184,37 @@ def run_with_one_extra_doctor():
         "stats_before": stats_before,
         "stats_after": stats_after,
         "solver_stats_before": solver_stats_before,
-        "solver_stats_after": solver_stats_after
+        "solver_stats_after": solver_stats_after,
+        "assignment_before": assignment_before,
+        "assignment_after": assignment_after,
+        "diagnosis": diagnosis
     }
 
 
 
 if __name__ == "__main__":
-    status, schedule_df, stats_df, solver_stats_df = run_with_one_extra_doctor()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Harmonogram dyżurów (CP-SAT)")
+    parser.add_argument("--force", action="store_true", help="licz od nowa mimo zapisanego wyniku")
+    parser.add_argument("--week", default=None,
+                        help="poniedziałek tygodnia grafiku (RRRR-MM-DD, domyślnie najbliższy)")
+    args = parser.parse_args()
+
+    instance = load_instance()
+    input_hash = instance.input_hash(load_candidates())
+    period_start, period_end = week_period(args.week or next_monday(), len(instance.days))
+    params = {"mode": "one_extra_doctor", "week": period_start}
+
+    with RunStore() as store:
+        run_id = None if args.force else store.find_run(input_hash, params)
+        if run_id is not None:
+            print(f"Wczytano zapisany wynik (run_id={run_id})")
+            result = store.load_run(run_id)
+        else:
+            result = run_with_one_extra_doctor(instance=instance)
+            run_id = store.save_run(input_hash, result, params, period_start, period_end)
+            print(f"Zapisano wynik (run_id={run_id})")
+
+    schedule_df = result["schedule_after"] if result["added"] else result["schedule_before"]
     schedule_df.to_csv("schedule_output.csv", index=False, encoding="utf-8")
@@ -0,0 +1,453 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+import hashlib
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from model.availability import AvailabilityIndex, day_intervals, hour_intervals
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+DAY_DTYPE = pd.CategoricalDtype(DAYS, ordered=True)
+PREFERENCE_DTYPE = pd.CategoricalDtype(["like", "dislike"])
+
+# Pliki używane domyślnie przez model (katalog data/)
+DEFAULT_FILES = {
+    "doctors": "doctors2.csv",
+    "shifts": "shifts_1.csv",
+    "unavail_day": "unavailabilities_day_3.csv",
+    "unavail_shift": "unavailabilities_shift.csv",
+    "preferences": "preferences.csv",
+}
+
+# Nazwy plików szukane w dowolnym katalogu / paczce z danymi
+TABLE_ALIASES = {
+    "doctors": ["doctors"],
+    "shifts": ["shifts"],
+    "unavail_day": ["unavail_day", "unavailabilities_day"],
+    "unavail_shift": ["unavail_shift", "unavailabilities_shift"],
+    "preferences": ["preferences"],
+    "unavail_hours": ["unavail_hours", "unavailabilities_hours"],
+}
+# tabele, których może nie być (wtedy są puste)
+OPTIONAL_TABLES = {"unavail_hours"}
+SUFFIXES = [".parquet", ".feather", ".arrow", ".csv"]
+
+# === SCHEMA ===
+# kolumna -> typ ("int", "str", "category" albo CategoricalDtype)
+SCHEMA = {
+    "doctors": {
+        "id": "int",
+        "name": "str",
+        "role": "category",
+        "needs_mentor": "int",
+        "max_hours": "int",
+        "opt_out": "int",
+        "skills": "str",
+        "twentyfour_allowed": "int",
+    },
+    "shifts": {
+        "id": "int",
+        "day": DAY_DTYPE,
+        "code": "str",
+        "dept": "category",
+        "start_hour": "int",
+        "end_hour": "int",
+        "hours": "int",
+        "min_staff": "int",
+        "regular_staff": "int",
+        "required_skill": "category",
+    },
+    "unavail_day": {
+        "doctor_id": "int",
+        "day": DAY_DTYPE,
+    },
+    "unavail_shift": {
+        "doctor_id": "int",
+        "code": "str",
+    },
+    "preferences": {
+        "doctor_id": "int",
+        "code": "str",
+        "preference": PREFERENCE_DTYPE,
+    },
+    # nieobecność częściowa: dzień i godziny [start_hour, end_hour), np. poradnia 12-16
+    "unavail_hours": {
+        "doctor_id": "int",
+        "day": DAY_DTYPE,
+        "start_hour": "int",
+        "end_hour": "int",
+    },
+}
+
+# kolumny, które mogą być puste (np. lekarz bez umiejętności)
+NULLABLE = {("doctors", "skills")}
+
+
+class InstanceValidationError(ValueError):
+    """Błąd walidacji danych wejściowych - zawiera listę wszystkich znalezionych problemów"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__(
+            "Niepoprawne dane wejściowe:\n" + "\n".join(f"- {e}" for e in self.errors)
+        )
+
+
+# === READING ===
+def _read_table(path, raw=None):
+    """Czyta pojedynczą tabelę CSV / Parquet / Arrow (opcjonalnie z bajtów z archiwum)"""
+    suffix = Path(path).suffix.lower()
+    source = io.BytesIO(raw) if raw is not None else path
+    if suffix == ".parquet":
+        return pd.read_parquet(source)
+    if suffix in (".feather", ".arrow"):
+        return pd.read_feather(source)
+    return pd.read_csv(source)
+
+
+def _find_table(names, table):
+    """Szuka pliku tabeli wśród podanych nazw (katalog lub zawartość archiwum)"""
+    for alias in TABLE_ALIASES[table]:
+        for suffix in SUFFIXES:
+            candidate = alias + suffix
+            if candidate in names:
+                return candidate
+    return None
+
+
+def read_tables(source=None, files=None):
+    """
+    Wczytuje surowe tabele z katalogu, archiwum .zip albo jawnej mapy plików.
+    Bez katalogu czyta pliki z data/ (DEFAULT_FILES, nadpisane przez files).
+    """
+    if source is None:
+        source, files = DATA_DIR, {**DEFAULT_FILES, **(files or {})}
+
+    files = dict(files or {})
+    tables = {}
+
+    if source is not None and Path(source).suffix.lower() == ".zip":
+        with zipfile.ZipFile(source) as bundle:
+            names = set(bundle.namelist())
+            for table in TABLE_ALIASES:
+                name = files.get(table) or _find_table(names, table)
+                if name is None and table in OPTIONAL_TABLES:
+                    continue
+                if name is None:
+                    raise InstanceValidationError([f"{table}: brak pliku w archiwum {source}"])
+                tables[table] = _read_table(name, bundle.read(name))
+        return tables
+
+    base = Path(source) if source is not None else Path(".")
+    names = {p.name for p in base.iterdir()} if base.is_dir() else set()
+    for table in TABLE_ALIASES:
+        name = files.get(table) or _find_table(names, table)
+        if name is None and table in OPTIONAL_TABLES:
+            continue
+        if name is None:
+            raise InstanceValidationError([f"{table}: brak pliku w {base}"])
+        tables[table] = _read_table(base / name)
+    return tables
+
+
+# === VALIDATION ===
+def empty_table(table):
+    """Pusta tabela z kolumnami ze schematu (dla brakujących tabel opcjonalnych)"""
+    return pd.DataFrame({col: pd.Series(dtype="int64" if dtype == "int" else object)
+                         for col, dtype in SCHEMA[table].items()})
+
+
+def _coerce_table(table, df, errors):
+    """Rzutuje kolumny na typy ze schematu, zbierając błędy zamiast rzucać wyjątek"""
+    df = df.copy()
+    for col, dtype in SCHEMA[table].items():
+        if col not in df.columns:
+            errors.append(f"{table}: brak kolumny '{col}'")
+            continue
+
+        nulls = df[col].isna()
+        if nulls.any() and (table, col) not in NULLABLE:
+            errors.append(f"{table}.{col}: puste wartości w wierszach {list(df.index[nulls])}")
+
+        if isinstance(dtype, pd.CategoricalDtype):
+            stripped = df[col].astype(str).str.strip()
+            bad = ~stripped.isin(dtype.categories) & ~nulls
+            if bad.any():
+                errors.append(
+                    f"{table}.{col}: nieznane wartości {sorted(set(stripped[bad]))} "
+                    f"(dozwolone: {list(dtype.categories)})"
+                )
+            df[col] = stripped.astype(dtype)
+        elif dtype == "int":
+            values = pd.to_numeric(df[col], errors="coerce")
+            bad = values.isna() & ~nulls
+            if bad.any():
+                errors.append(f"{table}.{col}: wartości nieliczbowe {df.loc[bad, col].tolist()}")
+            if not values.isna().any():
+                df[col] = values.astype("int64")
+        elif dtype == "str":
+            df[col] = df[col].where(nulls, df[col].astype(str).str.strip())
+        else:
+            df[col] = df[col].astype(str).str.strip().astype("category")
+    return df
+
+
+def validate_tables(tables):
+    """
+    Sprawdza typy i wszystkie odwołania między tabelami w jednym przebiegu.
+    Zwraca tabele z poprawionymi typami albo rzuca InstanceValidationError.
+    """
+    errors = []
+    typed = {
+        table: _coerce_table(table, tables[table] if table in tables else empty_table(table), errors)
+        for table in SCHEMA
+    }
+    if errors:
+        raise InstanceValidationError(errors)
+
+    doctors = typed["doctors"]
+    shifts = typed["shifts"]
+
+    # Unikalność kluczy
+    for table, col in (("doctors", "id"), ("shifts", "id"), ("shifts", "code")):
+        dup = typed[table][col].duplicated(keep=False)
+        if dup.any():
+            errors.append(f"{table}.{col}: zduplikowane wartości {sorted(set(typed[table].loc[dup, col]))}")
+
+    # Sensowność wartości liczbowych
+    checks = [
+        ("doctors", "max_hours", doctors["max_hours"] < 0),
+        ("shifts", "hours", shifts["hours"] <= 0),
+        ("shifts", "min_staff", shifts["min_staff"] < 0),
+        ("shifts", "regular_staff", shifts["regular_staff"] < 0),
+        ("shifts", "end_hour", shifts["end_hour"] <= shifts["start_hour"]),
+        ("unavail_hours", "start_hour", typed["unavail_hours"]["start_hour"] < 0),
+        ("unavail_hours", "end_hour", (typed["unavail_hours"]["end_hour"] <= typed["unavail_hours"]["start_hour"])
+         | (typed["unavail_hours"]["end_hour"] > 24)),
+    ]
+    for table, col, bad in checks:
+        if bad.any():
+            errors.append(f"{table}.{col}: niepoprawne wartości w wierszach {list(typed[table].index[bad])}")
+
+    # Odwołania do lekarzy i zmian
+    for table in ("unavail_day", "unavail_shift", "preferences", "unavail_hours"):
+        bad = ~typed[table]["doctor_id"].isin(doctors["id"])
+        if bad.any():
+            errors.append(f"{table}.doctor_id: nieznani lekarze {sorted(set(typed[table].loc[bad, 'doctor_id']))}")
+    for table in ("unavail_shift", "preferences"):
+        bad = ~typed[table]["code"].isin(shifts["code"])
+        if bad.any():
+            errors.append(f"{table}.code: nieznane kody zmian {sorted(set(typed[table].loc[bad, 'code']))}")
+
+    if errors:
+        raise InstanceValidationError(errors)
+    return typed
+
+
+# === COMPILED INSTANCE ===
+@dataclass
+class RosterInstance:
+    """Zwalidowane dane wejściowe wraz ze wszystkimi słownikami potrzebnymi do budowy modelu"""
+    doctors: pd.DataFrame
+    shifts: pd.DataFrame
+    unavail_day: pd.DataFrame
+    unavail_shift: pd.DataFrame
+    pref: pd.DataFrame
+    unavail_hours: pd.DataFrame = None
+    days: list = field(default_factory=lambda: list(DAYS))
+
+    def __post_init__(self):
+        if self.unavail_hours is None:
+            self.unavail_hours = _coerce_table("unavail_hours", empty_table("unavail_hours"), [])
+        doctors = self.doctors
+        shifts = self.shifts
+        days = self.days
+
+        doctors["skill_list"] = doctors["skills"].apply(
+            lambda skill: skill.split(";") if isinstance(skill, str) else []
+        )
+
+        self.D = doctors["id"].tolist()
+        self.S = shifts["id"].tolist()
+        self.doctor_idx = {doc_id: idx for idx, doc_id in enumerate(self.D)}
+        self.shift_idx = {shift_id: idx for idx, shift_id in enumerate(self.S)}
+
+        self.id_to_name = dict(zip(doctors["id"], doctors["name"]))
+        self.id_to_role = dict(zip(doctors["id"], doctors["role"].astype(str)))
+        self.max_hours = dict(zip(doctors["id"], doctors["max_hours"]))
+        self.twentyfour_allowed = dict(zip(doctors["id"], doctors["twentyfour_allowed"]))
+
+        self.specialists = doctors[doctors["role"].isin(["specialist", "icu_specialist"])]["id"]
+        self.needs_mentor = doctors[doctors["needs_mentor"] == 1]["id"]
+        self.opt_out_doctors = doctors[doctors["opt_out"] == 1]["id"]
+        self.regular_doctors = doctors[doctors["opt_out"] == 0]["id"]
+
+        self.day_index = {d: i for i, d in enumerate(days)}
+        self.shift_day = dict(zip(shifts["id"], shifts["day"].astype(str)))
+        self.hours = dict(zip(shifts["id"], shifts["hours"]))
+        self.code_to_id = dict(zip(shifts["code"], shifts["id"]))
+
+        # czas liczony jako czas od początku tygodnia
+        day_offset = shifts["day"].cat.codes.astype("int64") * 24
+        self.abs_start = dict(zip(shifts["id"], day_offset + shifts["start_hour"]))
+        self.abs_end = dict(zip(shifts["id"], day_offset + shifts["end_hour"]))
+
+        is_24 = shifts["hours"] == 24
+        is_night = shifts["code"].str.contains("_N_", regex=False) | is_24
+        self.twentyfour_shifts = shifts.loc[is_24, "id"].tolist()
+        self.night_shifts = shifts.loc[is_night, "id"].tolist()
+
+        by_day = shifts.groupby("day", observed=False)
+        self.days_to_shifts = {day: by_day.get_group(day)["id"].tolist() if day in by_day.groups else [] for day in days}
+        self.night_shifts_by_day = {
+            day: [s for s in self.days_to_shifts[day] if s in set(self.night_shifts)] for day in days
+        }
+        self.day_shifts = {day: [s for s in self.days_to_shifts[day] if self.hours[s] < 24] for day in days}
+        self.day_24h = {day: [s for s in self.days_to_shifts[day] if self.hours[s] == 24] for day in days}
+
+        unavail = self.unavail_day
+        self.full_day_unavail = {d: set() for d in self.D}
+        for d, day in zip(unavail["doctor_id"], unavail["day"].astype(str)):
+            if d in self.full_day_unavail:
+                self.full_day_unavail[d].add(day)
+        self.available_days = {d: len(days) - len(self.full_day_unavail[d]) for d in self.D}
+
+        # Limit godzin pracy lekarzy z uwzględnieniem urlopów - dla tygodnia
+        self.adjusted_max_hours = {
+            d: int(self.max_hours[d] * self.available_days[d] / len(days)) if self.available_days[d] > 0 else 0
+            for d in self.D
+        }
+
+    def eligibility_masks(self):
+        """
+        Macierze lekarz x zmiana (numpy bool) dozwolonych par osobno dla każdej reguły:
+        skill (umiejętność), twentyfour_allowed (uprawnienie do 24h),
+        unavailability (niedostępność całodniowa i na konkretną zmianę).
+        """
+        doctors = self.doctors
+        shifts = self.shifts
+
+        has_skill = np.array([
+            [req in skill_list for req in shifts["required_skill"]] for skill_list in doctors["skill_list"]
+        ], dtype=bool).reshape(len(self.D), len(self.S))
+
+        is_24 = (shifts["hours"] == 24).to_numpy()
+        allowed_24 = (doctors["twentyfour_allowed"] == 1).to_numpy()
+
+        # całodniowe - zmiany zaczynające się w dniu nieobecności; częściowe - zmiany nachodzące na przedział
+        starts = np.array([self.abs_start[s] for s in self.S], dtype=np.int64)
+        ends = np.array([self.abs_end[s] for s in self.S], dtype=np.int64)
+        off = self.unavail_day[self.unavail_day["doctor_id"].isin(self.doctor_idx)]
+        available = AvailabilityIndex(self.D, day_intervals(off, self.day_index)).available_matrix(starts, starts + 1)
+        off = self.unavail_hours[self.unavail_hours["doctor_id"].isin(self.doctor_idx)]
+        if len(off):
+            available &= AvailabilityIndex(self.D, hour_intervals(off, self.day_index)).available_matrix(starts, ends)
+
+        off = self.unavail_shift[self.unavail_shift["doctor_id"].isin(self.doctor_idx)]
+        available[
+            off["doctor_id"].map(self.doctor_idx).to_numpy(),
+            off["code"].map(self.code_to_id).map(self.shift_idx).to_numpy(),
+        ] = False
+
+        return {
+            "skill": has_skill,
+            "twentyfour_allowed": allowed_24[:, None] | ~is_24[None, :],
+            "unavailability": available,
+        }
+
+    def availability_calendar(self):
+        """
+        Kalendarz nieobecności (całodniowych i częściowych) do zapytań o przedziały godzin tygodnia.
+        Uwaga: w eligibility_masks nieobecność całodniowa wyklucza zmiany zaczynające się tego dnia
+        (nocka z poprzedniego dnia zostaje dozwolona), a częściowa - zmiany, które na nią nachodzą.
+        """
+        return AvailabilityIndex(self.D, pd.concat([
+            day_intervals(self.unavail_day, self.day_index),
+            hour_intervals(self.unavail_hours, self.day_index),
+        ], ignore_index=True))
+
+    def eligibility(self):
+        """
+        Macierz lekarz x zmiana (numpy bool): czy lekarz w ogóle może objąć zmianę
+        (umiejętność, uprawnienie do 24h, niedostępność całodniowa i na konkretną zmianę).
+        """
+        masks = self.eligibility_masks()
+        return masks["skill"] & masks["twentyfour_allowed"] & masks["unavailability"]
+
+    def input_hash(self, *extra_frames):
+        """Skrót (sha256) wszystkich tabel wejściowych - identyfikuje dane w magazynie wyników"""
+        digest = hashlib.sha256()
+        frames = [
+            self.doctors.drop(columns=["skill_list"]),
+            self.shifts,
+            self.unavail_day,
+            self.unavail_shift,
+            self.pref,
+            *extra_frames,
+        ]
+        # tabela opcjonalna - pusta nie zmienia skrótu (zapisane wyniki pozostają aktualne)
+        if len(self.unavail_hours):
+            frames.append(self.unavail_hours)
+        for frame in frames:
+            digest.update(",".join(map(str, frame.columns)).encode())
+            digest.update(pd.util.hash_pandas_object(frame.astype(str), index=False).values.tobytes())
+        return digest.hexdigest()
+
+    def with_doctors(self, doctors_df):
+        """Zwraca nową instancję z podmienioną listą lekarzy (np. po dodaniu kandydata)"""
+        return self.with_tables(doctors=doctors_df)
+
+    def with_tables(self, doctors=None, shifts=None, unavail_day=None, unavail_shift=None, pref=None,
+                    unavail_hours=None):
+        """Zwraca nową (ponownie zwalidowaną) instancję z podmienionymi tabelami"""
+        doctors = self.doctors if doctors is None else doctors
+        tables = validate_tables({
+            "doctors": doctors.drop(columns=["skill_list"], errors="ignore"),
+            "shifts": self.shifts if shifts is None else shifts,
+            "unavail_day": self.unavail_day if unavail_day is None else unavail_day,
+            "unavail_shift": self.unavail_shift if unavail_shift is None else unavail_shift,
+            "preferences": self.pref if pref is None else pref,
+            "unavail_hours": self.unavail_hours if unavail_hours is None else unavail_hours,
+        })
+        return compile_instance(tables)
+
+
+def compile_instance(tables):
+    """Tworzy RosterInstance z zwalidowanych tabel"""
+    return RosterInstance(
+        doctors=tables["doctors"],
+        shifts=tables["shifts"],
+        unavail_day=tables["unavail_day"],
+        unavail_shift=tables["unavail_shift"],
+        pref=tables["preferences"],
+        unavail_hours=tables["unavail_hours"],
+    )
+
+
+def load_instance(source=None, files=None):
+    """
+    Wczytuje, waliduje i kompiluje instancję problemu.
+    source - katalog z danymi albo archiwum .zip (CSV / Parquet / Arrow),
+    files - opcjonalna mapa {tabela: nazwa pliku}, np. DEFAULT_FILES.
+    """
+    return compile_instance(validate_tables(read_tables(source, files)))
+
+
+def load_candidates(path=None):
+    """Wczytuje i waliduje listę kandydatów do zatrudnienia"""
+    candidates = _read_table(path or DATA_DIR / "doctors_to_hire.csv")
+    errors = []
+    typed = _coerce_table("doctors", candidates, errors)
+    if "salary" not in typed.columns:
+        errors.append("candidates: brak kolumny 'salary'")
+    elif pd.to_numeric(typed["salary"], errors="coerce").isna().any():
+        errors.append("candidates.salary: brakujące lub nieliczbowe wartości")
+    if errors:
+        raise InstanceValidationError(errors)
+    return typed
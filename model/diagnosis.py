@@ -0,0 +1,97 @@
+from ortools.sat.python import cp_model
+import pandas as pd
+
+from model.constraints import add_hard_constraints
+
+
+def _solve_with(model, assumptions, time_limit):
+    model.ClearAssumptions()
+    model.AddAssumptions(assumptions)
+
+    solver = cp_model.CpSolver()
+    # wyznaczanie zbioru założeń działa z jednym wątkiem
+    solver.parameters.num_search_workers = 1
+    solver.parameters.max_time_in_seconds = time_limit
+    status = solver.Solve(model)
+    return solver, status
+
+
+def diagnose_understaffing(instance, minimize=True, time_limit=10.0):
+    """
+    Szuka konfliktu odpowiedzialnego za braki obsady bez zmiennych slack.
+    Minimalna obsada każdej zmiany i każda rodzina ograniczeń twardych (per lekarz)
+    są założeniami (assumptions); przy sprzeczności CP-SAT zwraca zbiór założeń,
+    który sam w sobie jest sprzeczny - czyli które zmiany, lekarze i reguły się wykluczają.
+    minimize=True dodatkowo usuwa z tego zbioru zbędne elementy (krótkie rozwiązania
+    tylko na małym zbiorze założeń).
+    """
+    model = cp_model.CpModel()
+    x = {(d, s): model.NewBoolVar(f"x_{d}_{s}") for d in instance.D for s in instance.S}
+
+    # literał -> opis (rodzaj, id zmiany / rodzina reguły, id lekarza)
+    labels = {}
+    rule_lits = {}
+
+    def gate(family, d):
+        if (family, d) not in rule_lits:
+            lit = model.NewBoolVar(f"rule_{family}_{d}")
+            rule_lits[(family, d)] = lit
+            labels[lit.Index()] = ("rule", family, d)
+        return rule_lits[(family, d)]
+
+    add_hard_constraints(model, x, instance, gate=gate)
+
+    cover_lits = {}
+    for s, min_staff in zip(instance.shifts["id"], instance.shifts["min_staff"]):
+        lit = model.NewBoolVar(f"cover_{s}")
+        cover_lits[s] = lit
+        labels[lit.Index()] = ("cover", s, None)
+        model.Add(sum(x[(d, s)] for d in instance.D) >= min_staff).OnlyEnforceIf(lit)
+
+    by_index = {lit.Index(): lit for lit in list(rule_lits.values()) + list(cover_lits.values())}
+    assumptions = list(by_index.values())
+
+    solver, status = _solve_with(model, assumptions, time_limit)
+    solves = 1
+    wall_time = solver.WallTime()
+
+    result = {
+        "feasible": status in (cp_model.OPTIMAL, cp_model.FEASIBLE),
+        "status": solver.StatusName(status),
+        "shifts": pd.DataFrame(columns=["id", "code", "day", "dept", "required_skill", "hours", "min_staff"]),
+        "rules": pd.DataFrame(columns=["family", "doctor_id", "Doctor"]),
+    }
+
+    if status == cp_model.INFEASIBLE:
+        core = list(solver.SufficientAssumptionsForInfeasibility())
+
+        # Minimalizacja przez usuwanie: jeśli bez danego założenia dalej jest sprzecznie, jest zbędne
+        if minimize:
+            i = 0
+            while i < len(core):
+                candidate = core[:i] + core[i + 1:]
+                sub_solver, sub_status = _solve_with(model, [by_index[idx] for idx in candidate], time_limit)
+                solves += 1
+                wall_time += sub_solver.WallTime()
+                if sub_status == cp_model.INFEASIBLE:
+                    smaller = set(sub_solver.SufficientAssumptionsForInfeasibility())
+                    core = [idx for idx in candidate if idx in smaller]
+                else:
+                    i += 1
+
+        cover_ids = [labels[idx][1] for idx in core if labels[idx][0] == "cover"]
+        shifts = instance.shifts
+        result["shifts"] = shifts[shifts["id"].isin(cover_ids)][
+            ["id", "code", "day", "dept", "required_skill", "hours", "min_staff"]
+        ].reset_index(drop=True)
+
+        rules = [(labels[idx][1], labels[idx][2]) for idx in core if labels[idx][0] == "rule"]
+        result["rules"] = pd.DataFrame({
+            "family": [family for family, _ in rules],
+            "doctor_id": [d for _, d in rules],
+            "Doctor": [instance.id_to_name[d] for _, d in rules],
+        })
+
+    result["solves"] = solves
+    result["wall_time"] = wall_time
+    return result
@@ -0,0 +1,115 @@
+from threading import Event, Thread
+from time import perf_counter
+
+from ortools.sat.python import cp_model
+
+# Reguły wcześniejszego zakończenia (run_model_and_get_results(early_stop={reguła: wartość})):
+# no_improvement - sekundy bez lepszego rozwiązania, gap - luka względna w %,
+# slack_bound - koniec, gdy braki obsady osiągną dolne ograniczenie z przepływu
+EARLY_STOP_RULES = ("no_improvement", "gap", "slack_bound")
+# co ile sekund wątek nadzorujący sprawdza czas od ostatniej poprawy
+POLL_INTERVAL = 0.1
+
+
+class EarlyStopController(cp_model.CpSolverSolutionCallback):
+    """
+    Przerywa szukanie, gdy dalsza poprawa jest mało prawdopodobna. Śledzi wartość celu
+    i ograniczenie dolne w czasie (points) i zatrzymuje solver po pierwszej spełnionej regule:
+    brak poprawy przez no_improvement s (sprawdzane przez wątek nadzorujący, bo callback
+    wywoływany jest tylko przy nowych rozwiązaniach), luka względna poniżej gap %
+    (także przy poprawie samego ograniczenia) albo suma braków równa staffing_lower_bound
+    (slack_bound=True - pozostałe składniki celu to już tylko fairness i preferencje).
+    Powód zatrzymania w reason (None - solver skończył sam).
+    """
+
+    def __init__(self, solver, slacks, staffing_lower_bound=0, no_improvement=None, gap=None, slack_bound=False):
+        super().__init__()
+        self.solver = solver
+        self.slack_sum = cp_model.LinearExpr.Sum(list(slacks.values()))
+        self.staffing_lower_bound = staffing_lower_bound
+        self.no_improvement = no_improvement
+        self.gap = gap
+        self.slack_bound = slack_bound
+
+        self.points = []
+        self.best = None
+        self.bound = None
+        self.last_improvement = None
+        self.reason = None
+
+    @classmethod
+    def from_rules(cls, solver, slacks, staffing_lower_bound, rules):
+        """Kontroler z reguł w postaci słownika (np. z parametrów uruchomienia)"""
+        unknown = set(rules) - set(EARLY_STOP_RULES)
+        if unknown:
+            raise ValueError(
+                f"nieznane reguły zatrzymania: {', '.join(sorted(unknown))} (dostępne: {', '.join(EARLY_STOP_RULES)})"
+            )
+        return cls(solver, slacks, staffing_lower_bound, **rules)
+
+    # === REGUŁY ===
+    def _stop(self, reason):
+        if self.reason is None:
+            self.reason = reason
+            self.solver.StopSearch()
+
+    def _check_gap(self):
+        if self.gap is None or self.best is None or self.bound is None:
+            return
+        # luka względna jak w CP-SAT: |cel - ograniczenie| / max(1, |cel|)
+        if abs(self.best - self.bound) / max(1.0, abs(self.best)) * 100 <= self.gap:
+            self._stop("gap")
+
+    def OnSolutionCallback(self):
+        objective = self.ObjectiveValue()
+        self.bound = self.BestObjectiveBound()
+        self.points.append({"time": self.WallTime(), "objective": objective, "bound": self.bound})
+        if self.best is None or objective < self.best:
+            self.best = objective
+            self.last_improvement = perf_counter()
+
+        self._check_gap()
+        if self.slack_bound and self.Value(self.slack_sum) <= self.staffing_lower_bound:
+            self._stop("slack_bound")
+
+    def on_bound(self, bound):
+        """Poprawa ograniczenia dolnego bez nowego rozwiązania (solver.best_bound_callback)"""
+        self.bound = bound
+        self._check_gap()
+
+    def _watch(self, finished):
+        while not finished.wait(POLL_INTERVAL):
+            if self.last_improvement is not None and perf_counter() - self.last_improvement >= self.no_improvement:
+                self._stop("no_improvement")
+                return
+
+    # === ROZWIĄZANIE ===
+    def solve(self, model):
+        """solver.Solve(model) z nadzorem reguł; zwraca status"""
+        if self.gap is not None:
+            self.solver.best_bound_callback = self.on_bound
+
+        finished = Event()
+        watcher = None
+        if self.no_improvement is not None:
+            watcher = Thread(target=self._watch, args=(finished,), daemon=True)
+            watcher.start()
+        try:
+            return self.solver.Solve(model, self)
+        finally:
+            finished.set()
+            if watcher is not None:
+                watcher.join()
+
+
+def stop_reason(status, controller=None):
+    """Powód zakończenia do solver_stats: dowód optymalności / niedopuszczalności, reguła kontrolera albo limit"""
+    if status == cp_model.OPTIMAL:
+        return "optimal"
+    if status == cp_model.INFEASIBLE:
+        return "infeasible"
+    if status == cp_model.MODEL_INVALID:
+        return "model_invalid"
+    if controller is not None and controller.reason is not None:
+        return controller.reason
+    return "limit"
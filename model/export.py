@@ -0,0 +1,155 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from model.validation import schedule_to_assignment
+
+# Kolumny schedule_df (format używany przez dashboard i magazyn wyników)
+SCHEDULE_COLUMNS = ["Day", "ShiftCode", "Dept", "StartHour", "EndHour", "Hours", "Doctor", "Role", "Missing"]
+
+DEFAULT_CHUNK_SIZE = 50_000
+# formaty export_schedules: CSV per oddział, grafik per lekarz, archiwum Parquet, lista dla kadr/płac
+EXPORT_FORMATS = ("department", "doctor", "parquet", "payroll")
+
+
+# === MACIERZ PRZYDZIAŁÓW ===
+def assignment_matrix(x, solver, D, S):
+    """Macierz przydziałów lekarz x zmiana (0/1) jako DataFrame: indeks = id lekarza, kolumny = id zmiany"""
+    values = solver.BooleanValues([x[(d, s)] for d in D for s in S])
+    matrix = np.asarray(values, dtype=np.int8).reshape(len(D), len(S))
+    return pd.DataFrame(matrix, index=pd.Index(D, name="doctor_id"), columns=pd.Index(S, name="shift_id"))
+
+
+def assignment_long(assignment, instance, missing=None):
+    """
+    Płaska lista przydziałów (jeden wiersz = lekarz na zmianie) zbudowana złączeniami,
+    opcjonalnie z wierszami brakującej obsady (missing: {id zmiany: liczba braków}).
+    """
+    rows, cols = np.nonzero(assignment.to_numpy())
+    pairs = pd.DataFrame({
+        "doctor_id": assignment.index.to_numpy()[rows],
+        "shift_id": assignment.columns.to_numpy()[cols],
+        "Missing": 0,
+    })
+
+    if missing:
+        shift_ids = np.repeat(list(missing.keys()), list(missing.values()))
+        gaps = pd.DataFrame({"doctor_id": pd.NA, "shift_id": shift_ids, "Missing": 1})
+        pairs = pd.concat([pairs, gaps], ignore_index=True)
+
+    shifts = instance.shifts.rename(columns={
+        "id": "shift_id",
+        "day": "Day",
+        "code": "ShiftCode",
+        "dept": "Dept",
+        "start_hour": "StartHour",
+        "end_hour": "EndHour",
+        "hours": "Hours",
+    })
+    shifts = shifts[["shift_id", "Day", "ShiftCode", "Dept", "StartHour", "EndHour", "Hours"]].assign(
+        shift_order=np.arange(len(shifts))
+    )
+    doctors = instance.doctors[["id", "name", "role"]].rename(
+        columns={"id": "doctor_id", "name": "Doctor", "role": "Role"}
+    ).assign(doctor_order=np.arange(len(instance.doctors)))
+    doctors["Role"] = doctors["Role"].astype(str)
+
+    long = pairs.merge(shifts, on="shift_id", how="left").merge(doctors, on="doctor_id", how="left")
+
+    # kolejność jak w harmonogramie: dzień, godzina rozpoczęcia, zmiana, najpierw obsada potem braki
+    long = long.sort_values(
+        ["Day", "StartHour", "shift_order", "Missing", "doctor_order"], kind="stable"
+    ).drop(columns=["shift_order", "doctor_order"])
+    long["Day"] = long["Day"].astype(str)
+    long["Dept"] = long["Dept"].astype(str)
+    return long.reset_index(drop=True)
+
+
+def build_schedule_df(assignment, instance, missing=None):
+    """schedule_df (jak w run_model_and_get_results) zbudowany z macierzy przydziałów"""
+    long = assignment_long(assignment, instance, missing)
+    schedule_df = long[SCHEDULE_COLUMNS].copy()
+    schedule_df["Doctor"] = schedule_df["Doctor"].astype(object).where(schedule_df["Missing"] == 0, None)
+    schedule_df["Role"] = schedule_df["Role"].astype(object).where(schedule_df["Missing"] == 0, None)
+    return schedule_df
+
+
+# === EKSPORT ===
+def schedule_week(week, schedule_df, instance):
+    """Pozycja dla export_schedules z gotowego schedule_df: (tydzień, macierz przydziałów, braki per zmiana)"""
+    assignment, _ = schedule_to_assignment(schedule_df, instance)
+    gaps = schedule_df.loc[schedule_df["Missing"] > 0, "ShiftCode"].map(instance.code_to_id).dropna()
+    missing = {int(s): int(n) for s, n in gaps.value_counts(sort=False).items()}
+    return week, assignment, missing
+
+
+def _append_csv(df, path, written, chunk_size):
+    """Zapisuje DataFrame do CSV porcjami - pierwszy zapis w danym eksporcie nadpisuje plik, kolejne dopisują"""
+    fresh = path not in written
+    df.to_csv(path, mode="w" if fresh else "a", header=fresh, index=False, encoding="utf-8", chunksize=chunk_size)
+    written.add(path)
+
+
+def _safe_name(value):
+    return "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in str(value))
+
+
+def export_schedules(weeks, instance, out_dir, formats=EXPORT_FORMATS, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Eksportuje harmonogramy wielu tygodni, tydzień po tygodniu (pamięć nie rośnie z liczbą tygodni).
+    weeks - iterowalne krotki (etykieta tygodnia, macierz przydziałów[, braki per zmiana]).
+    Formaty: CSV per oddział, grafik per lekarz, archiwum Parquet, płaska lista dla kadr/płac.
+    Zwraca słownik {format: lista zapisanych plików}.
+    """
+    out_dir = Path(out_dir)
+    for sub in ("departments", "doctors"):
+        (out_dir / sub).mkdir(parents=True, exist_ok=True)
+
+    written = {fmt: set() for fmt in formats}
+    parquet_writer = None
+
+    try:
+        for item in weeks:
+            week, assignment = item[0], item[1]
+            missing = item[2] if len(item) > 2 else None
+
+            long = assignment_long(assignment, instance, missing)
+            long.insert(0, "Week", str(week))
+
+            if "department" in formats:
+                for dept, part in long.groupby("Dept", observed=True, sort=False):
+                    path = out_dir / "departments" / f"{_safe_name(dept)}.csv"
+                    _append_csv(part[["Week"] + SCHEDULE_COLUMNS], path, written["department"], chunk_size)
+
+            assigned = long[long["Missing"] == 0]
+
+            if "doctor" in formats:
+                roster_cols = ["Week", "Day", "ShiftCode", "Dept", "StartHour", "EndHour", "Hours"]
+                for (doc_id, name), part in assigned.groupby(["doctor_id", "Doctor"], sort=False):
+                    path = out_dir / "doctors" / f"{int(doc_id)}_{_safe_name(name)}.csv"
+                    _append_csv(part[roster_cols], path, written["doctor"], chunk_size)
+
+            if "payroll" in formats:
+                payroll = assigned[["Week", "doctor_id", "Doctor", "Role", "Day", "ShiftCode", "Dept", "Hours"]]
+                path = out_dir / "payroll.csv"
+                _append_csv(payroll, path, written["payroll"], chunk_size)
+
+            if "parquet" in formats:
+                # pyarrow jest potrzebny tylko dla tego formatu
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(
+                    long.astype({"doctor_id": "Int64"}), preserve_index=False
+                )
+                if parquet_writer is None:
+                    path = out_dir / "schedules.parquet"
+                    parquet_writer = pq.ParquetWriter(path, table.schema)
+                    written["parquet"].add(path)
+                parquet_writer.write_table(table, row_group_size=chunk_size)
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+
+    return {fmt: sorted(paths) for fmt, paths in written.items()}
@@ -0,0 +1,203 @@
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from model.export import build_schedule_df
+
+# ten sam odpoczynek co w ograniczeniach twardych
+MIN_REST = 11
+MAX_WORKING_DAYS = 6
+MAX_NIGHTS_IN_3_DAYS = 2
+
+
+class GreedyState:
+    """Bieżący częściowy grafik + szybkie sprawdzanie reguł twardych dla pojedynczego przydziału"""
+
+    def __init__(self, instance):
+        self.inst = instance
+        self.eligible = instance.eligibility()
+        self.day_of = {s: instance.day_index[instance.shift_day[s]] for s in instance.S}
+        self.night = set(instance.night_shifts)
+        self.mentees = set(instance.needs_mentor)
+        self.mentors = set(instance.specialists)
+        self.limit = dict(instance.adjusted_max_hours)
+        self.regular_staff = dict(zip(instance.shifts["id"], instance.shifts["regular_staff"]))
+
+        self.assigned = {d: set() for d in instance.D}
+        self.staff = {s: set() for s in instance.S}
+        self.hours = {d: 0 for d in instance.D}
+
+    def rest_violation(self, s1, s2):
+        start, end = self.inst.abs_start, self.inst.abs_end
+        if start[s2] <= end[s1]:
+            return False
+        return (start[s2] - end[s1]) < MIN_REST
+
+    def can_assign(self, d, s):
+        inst = self.inst
+        if not self.eligible[inst.doctor_idx[d], inst.shift_idx[s]]:
+            return False
+        if s in self.assigned[d] or len(self.staff[s]) >= self.regular_staff[s]:
+            return False
+        if self.hours[d] + inst.hours[s] > self.limit[d]:
+            return False
+        if d in self.mentees and not (self.staff[s] & self.mentors):
+            return False
+
+        day = self.day_of[s]
+        work_days = {self.day_of[t] for t in self.assigned[d]}
+        if day in work_days:
+            return False
+        if len(work_days) + 1 > MAX_WORKING_DAYS:
+            return False
+
+        for t in self.assigned[d]:
+            if self.rest_violation(t, s) or self.rest_violation(s, t):
+                return False
+
+        # dzień wolny po nocy: noc dzień wcześniej albo jakakolwiek zmiana dzień później
+        nights = {self.day_of[t] for t in self.assigned[d] if t in self.night}
+        if day - 1 in nights:
+            return False
+        if s in self.night:
+            if day + 1 in work_days:
+                return False
+            night_days = nights | {day}
+            for first in range(day - 2, day + 1):
+                if len([n for n in night_days if first <= n <= first + 2]) > MAX_NIGHTS_IN_3_DAYS:
+                    return False
+        return True
+
+    def can_remove(self, d, s):
+        """Nie usuwamy ostatniego opiekuna, jeśli na zmianie jest stażysta"""
+        if d not in self.mentors:
+            return True
+        if not (self.staff[s] & self.mentees):
+            return True
+        return len(self.staff[s] & self.mentors) > 1
+
+    def add(self, d, s):
+        self.assigned[d].add(s)
+        self.staff[s].add(d)
+        self.hours[d] += self.inst.hours[s]
+
+    def remove(self, d, s):
+        self.assigned[d].discard(s)
+        self.staff[s].discard(d)
+        self.hours[d] -= self.inst.hours[s]
+
+
+def _preference_score(instance):
+    score = {}
+    for d, code, preference in zip(instance.pref["doctor_id"], instance.pref["code"], instance.pref["preference"]):
+        score[(d, instance.code_to_id[code])] = -1 if preference == "like" else 1
+    return score
+
+
+def _shift_orders(instance, state, min_staff):
+    """Kolejności obsadzania: od najtrudniejszych zmian oraz chronologicznie (noce a dzień następny)"""
+    eligible_count = state.eligible.sum(axis=0)
+
+    def scarcity(s):
+        return eligible_count[instance.shift_idx[s]] / max(min_staff[s], 1)
+
+    return [
+        sorted(instance.S, key=lambda s: (scarcity(s), -instance.hours[s])),
+        sorted(instance.S, key=lambda s: (state.day_of[s], scarcity(s))),
+    ]
+
+
+def _construct(instance, order, repair_depth, preference, min_staff):
+    state = GreedyState(instance)
+
+    def pick(s, exclude=()):
+        options = [d for d in instance.D if d not in exclude and state.can_assign(d, s)]
+        if not options:
+            return None
+        # stażystów na końcu - najpierw trzeba mieć opiekuna
+        return min(options, key=lambda d: (
+            d in state.mentees,
+            preference.get((d, s), 0),
+            state.hours[d] / max(state.limit[d], 1),
+        ))
+
+    def fill(s):
+        while len(state.staff[s]) < min_staff[s]:
+            d = pick(s)
+            if d is None:
+                return
+            state.add(d, s)
+
+    def relocate(s, depth, banned):
+        """Łańcuch zamian: lekarz oddaje zmianę t, żeby objąć s, a t przejmuje ktoś inny (rekurencyjnie)"""
+        d = pick(s, exclude=banned)
+        if d is not None:
+            state.add(d, s)
+            return True
+        if depth == 0:
+            return False
+        for d in instance.D:
+            if d in banned or d in state.staff[s]:
+                continue
+            for t in list(state.assigned[d]):
+                if not state.can_remove(d, t):
+                    continue
+                state.remove(d, t)
+                if state.can_assign(d, s):
+                    state.add(d, s)
+                    if len(state.staff[t]) >= min_staff[t] or relocate(t, depth - 1, banned | {d}):
+                        return True
+                    state.remove(d, s)
+                state.add(d, t)
+        return False
+
+    for s in order:
+        fill(s)
+
+    # === NAPRAWA ZAMIANAMI ===
+    for s in order:
+        while len(state.staff[s]) < min_staff[s] and relocate(s, repair_depth, frozenset()):
+            pass
+
+    return state
+
+
+def construct_greedy(instance, repair_depth=2):
+    """
+    Szybki grafik heurystyczny spełniający wszystkie reguły twarde modelu.
+    Zmiany są obsadzane od najtrudniejszych (najmniej chętnych na jedno miejsce) albo
+    chronologicznie - zostaje lepszy wynik; lekarze wybierani po preferencjach
+    i najmniejszym wykorzystaniu limitu godzin, a braki naprawiane łańcuchami zamian
+    (lekarz oddaje swoją zmianę innemu, żeby objąć brak).
+    Zwraca słownik: assignment (macierz jak assignment_matrix), missing, schedule_df, wall_time.
+    """
+    started = perf_counter()
+    preference = _preference_score(instance)
+    min_staff = dict(zip(instance.shifts["id"], instance.shifts["min_staff"]))
+
+    state = None
+    best_missing = None
+    for order in _shift_orders(instance, GreedyState(instance), min_staff):
+        candidate = _construct(instance, order, repair_depth, preference, min_staff)
+        total_missing = sum(max(min_staff[s] - len(candidate.staff[s]), 0) for s in instance.S)
+        if best_missing is None or total_missing < best_missing:
+            state, best_missing = candidate, total_missing
+
+    matrix = np.zeros((len(instance.D), len(instance.S)), dtype=np.int8)
+    for d, shifts in state.assigned.items():
+        for s in shifts:
+            matrix[instance.doctor_idx[d], instance.shift_idx[s]] = 1
+    assignment = pd.DataFrame(
+        matrix,
+        index=pd.Index(instance.D, name="doctor_id"),
+        columns=pd.Index(instance.S, name="shift_id"),
+    )
+    missing = {s: min_staff[s] - len(state.staff[s]) for s in instance.S if len(state.staff[s]) < min_staff[s]}
+
+    return {
+        "assignment": assignment,
+        "missing": missing,
+        "schedule_df": build_schedule_df(assignment, instance, missing),
+        "wall_time": perf_counter() - started,
+    }
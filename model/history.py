@@ -0,0 +1,177 @@
+from pathlib import Path
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from model.run_store import BASE_DIR
+
+DEFAULT_HISTORY_DIR = BASE_DIR / "history"
+# pojemność osi lekarzy i zmian ustalana przy zakładaniu historii (rozmiar bloku tygodnia w pliku)
+MAX_DOCTORS = 1024
+MAX_SLOTS = 512
+WEEKEND_DAYS = ("Sat", "Sun")
+
+ASSIGNMENTS_FILE = "assignments.int8"
+CAPACITY_FILE = "capacity.int16"
+INDEX_FILE = "index.json"
+
+AGGREGATE_COLUMNS = ["weeks", "shifts", "nights", "weekends", "twentyfour", "hours", "capacity"]
+
+
+class HistoryStore:
+    """
+    Historia opublikowanych grafików jako tensor tydzień x lekarz x zmiana (int8) w pliku
+    mapowanym do pamięci, dopisywany tylko na końcu (jeden blok na tydzień), plus limit godzin
+    lekarza w każdym tygodniu (int16). Mały indeks JSON mapuje id lekarzy i kody zmian
+    (slot = zmiana tygodniowego szablonu, np. WARD_N_MON) na pozycje w tensorze i trzyma etykiety
+    tygodni (rosnąco, np. data poniedziałku). Okno tygodni to wycinek memmap bez kopiowania,
+    więc agregaty z całego roku nie wymagają wczytywania CSV.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_DIR, max_doctors=MAX_DOCTORS, max_slots=MAX_SLOTS):
+        self.path = Path(path)
+        index_path = self.path / INDEX_FILE
+        if index_path.exists():
+            self.index = json.loads(index_path.read_text(encoding="utf-8"))
+        else:
+            self.index = {"max_doctors": max_doctors, "max_slots": max_slots, "doctors": [], "slots": [],
+                          "weeks": []}
+        self._refresh()
+
+    def _refresh(self):
+        self.doctor_row = {d: i for i, d in enumerate(self.index["doctors"])}
+        self.slot_col = {slot["code"]: j for j, slot in enumerate(self.index["slots"])}
+        self.week_pos = {w: k for k, w in enumerate(self.index["weeks"])}
+
+    @property
+    def weeks(self):
+        return list(self.index["weeks"])
+
+    @property
+    def block_shape(self):
+        return self.index["max_doctors"], self.index["max_slots"]
+
+    # === ZAPIS ===
+    def _register(self, doctors, shifts):
+        """Nowi lekarze i zmiany dostają kolejne wolne wiersze / kolumny tensora"""
+        max_doctors, max_slots = self.block_shape
+        new_doctors = [d for d in doctors if d not in self.doctor_row]
+        new_slots = shifts[~shifts["code"].isin(list(self.slot_col))]
+        if len(self.doctor_row) + len(new_doctors) > max_doctors:
+            raise ValueError(f"historia mieści najwyżej {max_doctors} lekarzy")
+        if len(self.slot_col) + len(new_slots) > max_slots:
+            raise ValueError(f"historia mieści najwyżej {max_slots} zmian tygodnia")
+
+        self.index["doctors"].extend(new_doctors)
+        self.index["slots"].extend({
+            "code": row["code"],
+            "day": row["day"],
+            "hours": int(row["hours"]),
+            "night": bool(row["night"]),
+            "twentyfour": bool(row["twentyfour"]),
+            "weekend": row["day"] in WEEKEND_DAYS,
+        } for row in new_slots.to_dict("records"))
+        self._refresh()
+
+    def _write_block(self, name, block, position):
+        """Blok tygodnia na pozycji position (po bloku z przerwanego zapisu - nadpisuje go)"""
+        path = self.path / name
+        mode = "r+b" if path.exists() else "wb"
+        with open(path, mode) as f:
+            f.seek(position * block.nbytes)
+            f.write(block.tobytes())
+            f.truncate()
+
+    def append_week(self, week, assignment, instance):
+        """
+        Dopisuje opublikowany grafik tygodnia (assignment: macierz lekarz x zmiana z id jak
+        w instancji). Etykiety tygodni muszą rosnąć - historii się nie poprawia.
+        """
+        week = str(week)
+        if self.index["weeks"] and week <= self.index["weeks"][-1]:
+            raise ValueError(f"tydzień {week} nie jest późniejszy niż ostatni w historii ({self.index['weeks'][-1]})")
+
+        shifts = instance.shifts.assign(
+            day=instance.shifts["day"].astype(str),
+            night=instance.shifts["id"].isin(instance.night_shifts),
+            twentyfour=instance.shifts["id"].isin(instance.twentyfour_shifts),
+        )
+        doctors = [int(d) for d in instance.D]
+        self._register(doctors, shifts)
+
+        A = assignment.reindex(index=instance.D, columns=instance.S, fill_value=0).to_numpy()
+        rows = np.array([self.doctor_row[d] for d in doctors], dtype=np.int64)
+        cols = shifts["code"].map(self.slot_col).to_numpy(dtype=np.int64)
+
+        block = np.zeros(self.block_shape, dtype=np.int8)
+        block[np.ix_(rows, cols)] = A > 0
+        limits = np.zeros(self.block_shape[0], dtype=np.int16)
+        limits[rows] = [instance.adjusted_max_hours[d] for d in instance.D]
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        position = len(self.index["weeks"])
+        self._write_block(ASSIGNMENTS_FILE, block, position)
+        self._write_block(CAPACITY_FILE, limits, position)
+
+        # indeks zapisywany na końcu i podmieniany atomowo - bez niego nowy blok jest niewidoczny
+        self.index["weeks"].append(week)
+        tmp = self.path / (INDEX_FILE + ".tmp")
+        tmp.write_text(json.dumps(self.index, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path / INDEX_FILE)
+        self._refresh()
+
+    # === ODCZYT ===
+    def _span(self, start=None, end=None):
+        """Pozycje tygodni [lo, hi) z etykietami w przedziale [start, end] (None - bez ograniczenia)"""
+        weeks = self.index["weeks"]
+        lo = 0 if start is None else int(np.searchsorted(weeks, str(start), side="left"))
+        hi = len(weeks) if end is None else int(np.searchsorted(weeks, str(end), side="right"))
+        return lo, max(lo, hi)
+
+    def window(self, start=None, end=None):
+        """
+        Wycinek tensora (tydzień x lekarz x zmiana) dla tygodni z [start, end] - widok memmap,
+        bez kopiowania. Wiersze i kolumny jak w indeksie (doctors, slots), reszta bloku to zera.
+        """
+        lo, hi = self._span(start, end)
+        n_weeks = len(self.index["weeks"])
+        if not n_weeks:
+            return np.zeros((0, *self.block_shape), dtype=np.int8)
+        data = np.memmap(self.path / ASSIGNMENTS_FILE, dtype=np.int8, mode="r", shape=(n_weeks, *self.block_shape))
+        return data[lo:hi]
+
+    def capacity_window(self, start=None, end=None):
+        """Limity godzin (tydzień x lekarz) dla tygodni z [start, end] - widok memmap"""
+        lo, hi = self._span(start, end)
+        n_weeks = len(self.index["weeks"])
+        if not n_weeks:
+            return np.zeros((0, self.block_shape[0]), dtype=np.int16)
+        data = np.memmap(self.path / CAPACITY_FILE, dtype=np.int16, mode="r", shape=(n_weeks, self.block_shape[0]))
+        return data[lo:hi]
+
+    def aggregates(self, start=None, end=None):
+        """
+        Skumulowane obciążenie lekarzy w tygodniach z [start, end]: weeks (tygodnie w grafiku),
+        shifts, nights (nocne + 24h), weekends, twentyfour, hours i capacity (suma limitów godzin).
+        DataFrame z indeksem doctor_id (AGGREGATE_COLUMNS).
+        """
+        n_doctors, n_slots = len(self.index["doctors"]), len(self.index["slots"])
+        window = self.window(start, end)[:, :n_doctors, :n_slots]
+        limits = self.capacity_window(start, end)[:, :n_doctors]
+
+        slots = pd.DataFrame(self.index["slots"], columns=["code", "day", "hours", "night", "twentyfour", "weekend"])
+        counts = window.sum(axis=0, dtype=np.int64)
+        present = (window.any(axis=2) | (limits > 0)).sum(axis=0)
+
+        result = pd.DataFrame({
+            "weeks": present,
+            "shifts": counts.sum(axis=1),
+            "nights": counts @ slots["night"].to_numpy(dtype=np.int64),
+            "weekends": counts @ slots["weekend"].to_numpy(dtype=np.int64),
+            "twentyfour": counts @ slots["twentyfour"].to_numpy(dtype=np.int64),
+            "hours": counts @ slots["hours"].to_numpy(dtype=np.int64),
+            "capacity": limits.sum(axis=0, dtype=np.int64),
+        }, index=pd.Index(self.index["doctors"], name="doctor_id"))
+        return result[AGGREGATE_COLUMNS]
@@ -0,0 +1,209 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from time import perf_counter
+import os
+import random
+
+from ortools.sat.python import cp_model
+import numpy as np
+import pandas as pd
+
+from model.data_loader import load_instance
+from model.cp_sat_model import build_roster_model
+from model.export import build_schedule_df
+from model.heuristic import construct_greedy
+
+# Rodzaje sąsiedztw: okno kolejnych dni, jeden oddział, grupa lekarzy ze wspólną umiejętnością
+NEIGHBOURHOODS = ("days", "dept", "skills")
+DAY_WINDOW = 2
+# wygładzanie skuteczności rodzajów sąsiedztw i minimalna szansa wyboru każdego z nich
+ADAPT_RATE = 0.2
+MIN_SCORE = 0.05
+
+
+# === SĄSIEDZTWA ===
+def neighbourhood_mask(kind, instance, rng, day_window=DAY_WINDOW):
+    """
+    Macierz lekarz x zmiana (numpy bool) przydziałów zwalnianych w podrozwiązaniu
+    (pozostałe są ustalone na wartości z bieżącego grafiku) oraz opis sąsiedztwa.
+    """
+    shifts = instance.shifts
+    mask = np.zeros((len(instance.D), len(instance.S)), dtype=bool)
+
+    if kind == "days":
+        window = min(day_window, len(instance.days))
+        start = rng.randrange(len(instance.days) - window + 1)
+        day_codes = shifts["day"].cat.codes.to_numpy()
+        mask[:, (day_codes >= start) & (day_codes < start + window)] = True
+        label = "-".join(instance.days[start:start + window])
+    elif kind == "dept":
+        dept = rng.choice(sorted(shifts["dept"].astype(str).unique()))
+        mask[:, (shifts["dept"].astype(str) == dept).to_numpy()] = True
+        label = dept
+    elif kind == "skills":
+        skill = rng.choice(sorted(shifts["required_skill"].unique()))
+        doctors = np.array([skill in skill_list for skill_list in instance.doctors["skill_list"]], dtype=bool)
+        mask[doctors, :] = True
+        label = skill
+    else:
+        raise ValueError(f"nieznany rodzaj sąsiedztwa '{kind}' (dostępne: {', '.join(NEIGHBOURHOODS)})")
+    return mask, label
+
+
+def choose_kind(scores, rng):
+    """Wybór rodzaju sąsiedztwa proporcjonalnie do jego dotychczasowej skuteczności (ruletka)"""
+    kinds = list(scores)
+    return rng.choices(kinds, weights=[scores[k] for k in kinds])[0]
+
+
+def update_score(scores, kind, improved):
+    """Wygładzanie wykładnicze: 1 za poprawę, 0 bez poprawy (z dolnym progiem MIN_SCORE)"""
+    scores[kind] = max(MIN_SCORE, (1 - ADAPT_RATE) * scores[kind] + ADAPT_RATE * float(improved))
+
+
+# === PODROZWIĄZANIA (procesy robocze) ===
+# model budowany raz na proces - kolejne podrozwiązania zmieniają tylko domeny zmiennych x
+_worker = {}
+
+
+def _init_worker(instance, weights, formulation):
+    built = build_roster_model(instance, weights=weights, formulation=formulation)
+    _worker["model"] = built["model"]
+    _worker["vars"] = [built["x"][(d, s)] for d in instance.D for s in instance.S]
+    _worker["shape"] = (len(instance.D), len(instance.S))
+
+
+def _solve_neighbourhood(incumbent, free, time_limit, workers, seed):
+    """
+    Jedno podrozwiązanie: zmienne spoza sąsiedztwa ustalone na bieżący grafik, zwolnione
+    z podpowiedzią. Zwraca pełny grafik (dopuszczalny dla całego modelu) i jego wartość celu.
+    """
+    model = _worker["model"]
+    x_vars = _worker["vars"]
+    values = incumbent.ravel().tolist()
+    free = free.ravel().tolist()
+
+    # najpierw same domeny (bez dodawania niczego do modelu w trakcie pętli)
+    variables = model.Proto().variables
+    for var, value, is_free in zip(x_vars, values, free):
+        domain = variables[var.Index()].domain
+        if is_free:
+            domain[0], domain[1] = 0, 1
+        else:
+            domain[0] = domain[1] = value
+
+    model.ClearHints()
+    for var, value, is_free in zip(x_vars, values, free):
+        if is_free:
+            model.AddHint(var, value)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.num_search_workers = workers
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.random_seed = seed
+    status = solver.Solve(model)
+
+    result = {"status": solver.StatusName(status), "wall_time": solver.WallTime(), "objective": None, "matrix": None}
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        matrix = np.asarray(solver.BooleanValues(x_vars), dtype=np.int8)
+        result.update({"objective": solver.ObjectiveValue(), "matrix": matrix.reshape(_worker["shape"])})
+    return result
+
+
+# === STEROWANIE ===
+def lns(instance=None, initial=None, time_limit=300, sub_time_limit=5, processes=None, workers_per_solve=1,
+        kinds=NEIGHBOURHOODS, day_window=DAY_WINDOW, weights=None, formulation="classic", seed=0):
+    """
+    LNS sterowane z Pythona dla instancji za dużych na jedno rozwiązanie CP-SAT.
+    Start z dowolnego dopuszczalnego grafiku (domyślnie heurystyka zachłanna), potem
+    w kolejnych krokach zwalniane jest jedno sąsiedztwo (okno dni, oddział albo grupa lekarzy
+    ze wspólną umiejętnością), a reszta grafiku jest ustalona. Każde podrozwiązanie trwa
+    najwyżej sub_time_limit s; lepszy grafik jest przyjmowany. Rodzaj sąsiedztwa losowany
+    proporcjonalnie do tego, jak często ostatnio poprawiał wynik. processes sąsiedztw
+    rozwiązywanych jest równolegle (każde z workers_per_solve wątkami).
+    Zwraca słownik: objective, assignment, schedule_df, history (każde podrozwiązanie), scores.
+    """
+    if instance is None:
+        instance = load_instance()
+    if initial is None:
+        initial = construct_greedy(instance)["assignment"]
+    processes = processes or max(1, (os.cpu_count() or 1) // workers_per_solve)
+
+    rng = random.Random(seed)
+    incumbent = initial.reindex(index=instance.D, columns=instance.S, fill_value=0).to_numpy().astype(np.int8)
+    scores = {kind: 1.0 for kind in kinds}
+    history = []
+    started = perf_counter()
+
+    with ProcessPoolExecutor(max_workers=processes, initargs=(instance, weights, formulation),
+                             initializer=_init_worker) as pool:
+        # wartość celu grafiku startowego - wszystkie zmienne ustalone
+        start = pool.submit(_solve_neighbourhood, incumbent, np.zeros_like(incumbent, dtype=bool),
+                            sub_time_limit, workers_per_solve, seed).result()
+        if start["objective"] is None:
+            raise ValueError(f"grafik startowy nie jest dopuszczalny ({start['status']})")
+        best = start["objective"]
+        history.append({"iteration": 0, "kind": "start", "neighbourhood": None, "status": start["status"],
+                        "objective": best, "improved": False, "elapsed": perf_counter() - started})
+
+        running = {}
+        iteration = 0
+        while running or perf_counter() - started < time_limit:
+            # uzupełniamy kolejkę do liczby procesów, dopóki jest czas na kolejne podrozwiązanie
+            while len(running) < processes and perf_counter() - started + sub_time_limit <= time_limit:
+                iteration += 1
+                kind = choose_kind(scores, rng)
+                mask, label = neighbourhood_mask(kind, instance, rng, day_window)
+                future = pool.submit(_solve_neighbourhood, incumbent, mask, sub_time_limit, workers_per_solve,
+                                     rng.randrange(2 ** 31))
+                running[future] = (iteration, kind, label)
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                iteration_done, kind, label = running.pop(future)
+                result = future.result()
+                # każdy wynik to pełny dopuszczalny grafik - przyjmujemy, jeśli lepszy od bieżącego
+                # (także gdy startował od starszej wersji grafiku)
+                improved = result["objective"] is not None and result["objective"] < best
+                if improved:
+                    best = result["objective"]
+                    incumbent = result["matrix"]
+                update_score(scores, kind, improved)
+                history.append({
+                    "iteration": iteration_done,
+                    "kind": kind,
+                    "neighbourhood": label,
+                    "status": result["status"],
+                    "objective": result["objective"],
+                    "improved": improved,
+                    "elapsed": perf_counter() - started,
+                })
+
+    assignment = pd.DataFrame(incumbent, index=pd.Index(instance.D, name="doctor_id"),
+                              columns=pd.Index(instance.S, name="shift_id"))
+    staffed = incumbent.sum(axis=0)
+    min_staff = instance.shifts["min_staff"].to_numpy()
+    missing = {s: int(m) for s, m in zip(instance.S, min_staff - staffed) if m > 0}
+    return {
+        "objective": best,
+        "assignment": assignment,
+        "schedule_df": build_schedule_df(assignment, instance, missing),
+        "history": pd.DataFrame(history),
+        "scores": scores,
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    from model.benchmark import TIERS, benchmark_tiers
+
+    # przykład: python -m model.lns large 120
+    tier = sys.argv[1] if len(sys.argv) > 1 else "large"
+    limit = float(sys.argv[2]) if len(sys.argv) > 2 else 120
+    instance = benchmark_tiers({tier: TIERS[tier]})[tier]
+    result = lns(instance, time_limit=limit)
+    history = result["history"]
+    print(history.groupby("kind").agg(solves=("improved", "size"), improved=("improved", "sum")).to_string())
+    print(f"start={history['objective'].iloc[0]}, koniec={result['objective']}, wagi={result['scores']}")
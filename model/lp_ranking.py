@@ -0,0 +1,124 @@
+from ortools.linear_solver import pywraplp
+import pandas as pd
+
+from model.capacity import MAX_WORKING_DAYS
+
+# wartości dualne poniżej tego progu traktujemy jako zero (szum numeryczny GLOP)
+DUAL_EPS = 1e-6
+
+
+def _add_doctor_rows(lp, xd, instance, d):
+    """
+    Ograniczenia jednego lekarza w relaksacji (xd: {zmiana: zmienna} tylko dla zmian,
+    które może objąć): 1 zmiana na dobę, limit godzin, maks. 6 dni, maks. 2 noce pod rząd
+    i dzień wolny po nocy. Pary odpoczynku 11h są pominięte - to tysiące wierszy na lekarza
+    przy dużych instancjach, a relaksacja bez nich jest tylko słabsza, nie błędna.
+    """
+    def total(shifts):
+        return lp.Sum([xd[s] for s in shifts if s in xd])
+
+    days = instance.days
+    for day in days:
+        lp.Add(total(instance.days_to_shifts[day]) <= 1)
+    lp.Add(lp.Sum([instance.hours[s] * var for s, var in xd.items()]) <= instance.adjusted_max_hours[d])
+    lp.Add(total(xd) <= MAX_WORKING_DAYS)
+    for i in range(len(days) - 2):
+        lp.Add(total([s for day in days[i:i + 3] for s in instance.night_shifts_by_day[day]]) <= 2)
+    for i in range(len(days) - 1):
+        if instance.night_shifts_by_day[days[i]]:
+            lp.Add(total(instance.night_shifts_by_day[days[i]] + instance.days_to_shifts[days[i + 1]]) <= 1)
+
+
+def lp_relaxation(instance):
+    """
+    Relaksacja liniowa (GLOP) modelu obsady: x w [0, 1] tylko dla dopuszczalnych par
+    (umiejętność, 24h, niedostępności), minimalizacja sumy braków.
+    Wartość dualna ograniczenia obsady zmiany to przybliżony spadek braków po dodaniu
+    jednej osoby na tę zmianę (0 - zmiana nie jest wąskim gardłem, 1 - każda osoba pomaga).
+    Zwraca słownik: objective (dolne ograniczenie braków), duals {zmiana: wartość}, slack {zmiana: brak}.
+    """
+    lp = pywraplp.Solver.CreateSolver("GLOP")
+    eligible = instance.eligibility()
+    x = {}
+    for i, d in enumerate(instance.D):
+        xd = {s: lp.NumVar(0, 1, f"x_{d}_{s}") for j, s in enumerate(instance.S) if eligible[i, j]}
+        _add_doctor_rows(lp, xd, instance, d)
+        x.update({(d, s): var for s, var in xd.items()})
+
+    slack = {}
+    cover = {}
+    for s, min_staff in zip(instance.shifts["id"], instance.shifts["min_staff"]):
+        slack[s] = lp.NumVar(0, int(min_staff), f"slack_{s}")
+        staffed = [x[(d, s)] for d in instance.D if (d, s) in x]
+        cover[s] = lp.Add(lp.Sum(staffed) + slack[s] >= int(min_staff))
+
+    # stażysta tylko ze specjalistą na tej samej zmianie
+    for s in instance.S:
+        mentors = lp.Sum([x[(spec, s)] for spec in instance.specialists if (spec, s) in x])
+        for d in instance.needs_mentor:
+            if (d, s) in x:
+                lp.Add(x[(d, s)] <= mentors)
+
+    lp.Minimize(lp.Sum(list(slack.values())))
+    status = lp.Solve()
+    if status != pywraplp.Solver.OPTIMAL:
+        raise RuntimeError(f"relaksacja LP nie została rozwiązana (status {status})")
+
+    return {
+        "objective": lp.Objective().Value(),
+        "duals": {s: max(c.dual_value(), 0.0) for s, c in cover.items()},
+        "slack": {s: var.solution_value() for s, var in slack.items()},
+    }
+
+
+def candidate_lp_value(instance, d, duals, eligible=None):
+    """
+    Szacowany spadek braków po zatrudnieniu lekarza d (musi być w instancji): najlepszy
+    ułamkowy grafik tego lekarza wyceniony wartościami dualnymi zmian (krok wyceny
+    z generowania kolumn). Pomija opiekuna dla stażystów - to dopiero dokładne rozwiązanie.
+    eligible - gotowa macierz instance.eligibility() (przy wycenie wielu kandydatów).
+    """
+    if eligible is None:
+        eligible = instance.eligibility()
+    eligible = eligible[instance.doctor_idx[d]]
+
+    lp = pywraplp.Solver.CreateSolver("GLOP")
+    xd = {
+        s: lp.NumVar(0, 1, f"x_{s}")
+        for j, s in enumerate(instance.S) if eligible[j] and duals.get(s, 0) > DUAL_EPS
+    }
+    if not xd:
+        return 0.0
+    _add_doctor_rows(lp, xd, instance, d)
+    lp.Maximize(lp.Sum([duals[s] * var for s, var in xd.items()]))
+    lp.Solve()
+    return lp.Objective().Value()
+
+
+def rank_candidates_lp(instance, candidates_df):
+    """
+    Ranking kandydatów bez CP-SAT: jedna relaksacja LP obecnego zespołu, potem wycena
+    każdego kandydata wartościami dualnymi. Zwraca DataFrame (id, name, salary, estimate,
+    per_salary, lp_missing) posortowany jak ostateczny wybór kandydata: malejąco po szacowanej
+    poprawie, przy remisie rosnąco po stawce (per_salary tylko informacyjnie).
+    """
+    relaxed = lp_relaxation(instance)
+    extended = instance.with_doctors(pd.concat([instance.doctors, candidates_df], ignore_index=True))
+    eligible = extended.eligibility()
+
+    rows = []
+    for candidate in candidates_df.to_dict("records"):
+        estimate = min(candidate_lp_value(extended, candidate["id"], relaxed["duals"], eligible),
+                       relaxed["objective"])
+        salary = candidate.get("salary", 0) or 0
+        rows.append({
+            "id": candidate["id"],
+            "name": candidate["name"],
+            "salary": salary,
+            "estimate": estimate,
+            "per_salary": estimate / salary if salary > 0 else estimate,
+        })
+
+    ranking = pd.DataFrame(rows, columns=["id", "name", "salary", "estimate", "per_salary"])
+    ranking["lp_missing"] = relaxed["objective"]
+    return ranking.sort_values(["estimate", "salary"], ascending=[False, True], kind="stable", ignore_index=True)
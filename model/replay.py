@@ -0,0 +1,169 @@
+from datetime import datetime
+from pathlib import Path
+import gzip
+import json
+
+from ortools.sat.python import cp_model
+import pandas as pd
+
+MODEL_FILE = "model.pbtxt.gz"
+PARAMS_FILE = "parameters.pbtxt"
+META_FILE = "meta.json"
+
+
+# === ZAPIS ===
+def dump_solve_inputs(dump_dir, model, solver, input_hash, meta=None):
+    """
+    Zapisuje wszystko, co potrzebne do odtworzenia rozwiązania bez danych wejściowych:
+    CpModelProto (razem z podpowiedziami), parametry solvera i skrót danych.
+    Każdy zrzut to osobny katalog <dump_dir>/<czas>_<skrót>/. Zwraca ścieżkę katalogu.
+    """
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    path = Path(dump_dir) / f"{stamp}_{input_hash[:12]}"
+    path.mkdir(parents=True, exist_ok=True)
+
+    proto = model.Proto()
+    with gzip.open(path / MODEL_FILE, "wt", encoding="utf-8") as f:
+        f.write(str(proto))
+    (path / PARAMS_FILE).write_text(str(solver.parameters), encoding="utf-8")
+
+    info = {
+        "input_hash": input_hash,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "variables": len(proto.variables),
+        "constraints": len(proto.constraints),
+        "hint_size": len(proto.solution_hint.vars),
+        **(meta or {}),
+    }
+    (path / META_FILE).write_text(json.dumps(info, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+    return path
+
+
+# === ODCZYT ===
+def load_dump(path):
+    """Zwraca słownik: model (CpModel), parameters (tekst SatParameters), meta"""
+    path = Path(path)
+    model = cp_model.CpModel()
+    with gzip.open(path / MODEL_FILE, "rt", encoding="utf-8") as f:
+        model.Proto().parse_text_format(f.read())
+    return {
+        "model": model,
+        "parameters": (path / PARAMS_FILE).read_text(encoding="utf-8"),
+        "meta": json.loads((path / META_FILE).read_text(encoding="utf-8")),
+        "path": path,
+    }
+
+
+def find_dumps(root):
+    """Wszystkie katalogi zrzutów pod root (korpus do strojenia / testów wydajności)"""
+    return sorted(meta.parent for meta in Path(root).rglob(META_FILE) if (meta.parent / MODEL_FILE).exists())
+
+
+# === ODTWARZANIE ===
+class CurveRecorder(cp_model.CpSolverSolutionCallback):
+    """Krzywa zbieżności: czas, wartość celu i ograniczenie dolne przy każdym rozwiązaniu"""
+
+    def __init__(self):
+        super().__init__()
+        self.points = []
+
+    def OnSolutionCallback(self):
+        self.points.append({
+            "time": self.WallTime(),
+            "objective": self.ObjectiveValue(),
+            "bound": self.BestObjectiveBound(),
+        })
+
+
+def make_solver(parameters_text, overrides=None):
+    """Solver z zapisanymi parametrami, nadpisanymi wybranymi polami (np. z profilu)"""
+    solver = cp_model.CpSolver()
+    solver.parameters.parse_text_format(parameters_text)
+    for name, value in (overrides or {}).items():
+        setattr(solver.parameters, name, value)
+    return solver
+
+
+def replay(dump, variants=None, repeats=1):
+    """
+    Rozwiązuje zrzut ponownie dla każdego wariantu parametrów ({nazwa: nadpisania})
+    - domyślnie z zapisanymi parametrami. Zwraca słownik:
+    runs (wynik każdego przebiegu) i curves (krzywe czas -> cel / ograniczenie).
+    """
+    if not isinstance(dump, dict):
+        dump = load_dump(dump)
+    variants = variants or {"recorded": {}}
+
+    runs = []
+    curves = []
+    for name, overrides in variants.items():
+        for repeat in range(repeats):
+            solver = make_solver(dump["parameters"], overrides)
+            recorder = CurveRecorder()
+            status = solver.Solve(dump["model"], recorder)
+
+            solved = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+            objective = solver.ObjectiveValue() if solved else None
+            # pierwszy moment, w którym osiągnięto końcową wartość celu
+            time_to_best = next(
+                (p["time"] for p in recorder.points if p["objective"] == objective), None
+            )
+            runs.append({
+                "dump": dump["path"].name,
+                "variant": name,
+                "repeat": repeat,
+                "status": solver.StatusName(status),
+                "objective": objective,
+                "bound": solver.BestObjectiveBound() if solved else None,
+                "solutions": len(recorder.points),
+                "time_to_best": time_to_best,
+                "wall_time": solver.WallTime(),
+            })
+            curves += [{"dump": dump["path"].name, "variant": name, "repeat": repeat, **p} for p in recorder.points]
+
+    return {"runs": pd.DataFrame(runs), "curves": pd.DataFrame(curves)}
+
+
+def _parse_value(value):
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return {"true": True, "false": False}.get(value.lower(), value)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from model.cp_sat_model import load_solver_profiles
+
+    parser = argparse.ArgumentParser(description="Odtwarzanie zapisanych modeli CP-SAT")
+    parser.add_argument("dumps", nargs="+", help="katalogi zrzutów albo katalog z wieloma zrzutami")
+    parser.add_argument("--profile", action="append", default=[], help="wariant z profilu solvera")
+    parser.add_argument("--set", action="append", default=[], metavar="PARAM=WARTOŚĆ",
+                        help="wariant 'custom' z nadpisanymi parametrami")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--curves", help="plik CSV na krzywe zbieżności")
+    args = parser.parse_args()
+
+    variants = {"recorded": {}}
+    profiles = load_solver_profiles()
+    for name in args.profile:
+        variants[name] = profiles[name]
+    if args.set:
+        variants["custom"] = {k: _parse_value(v) for k, _, v in (item.partition("=") for item in args.set)}
+
+    paths = []
+    for p in args.dumps:
+        paths += [Path(p)] if (Path(p) / META_FILE).exists() else find_dumps(p)
+
+    all_runs, all_curves = [], []
+    for path in paths:
+        result = replay(path, variants, args.repeats)
+        all_runs.append(result["runs"])
+        all_curves.append(result["curves"])
+
+    print(pd.concat(all_runs, ignore_index=True).to_string(index=False))
+    if args.curves:
+        pd.concat(all_curves, ignore_index=True).to_csv(args.curves, index=False)
@@ -0,0 +1,222 @@
+from ortools.sat.python import cp_model
+import pandas as pd
+
+from model.data_loader import load_instance
+from model.cp_sat_model import build_roster_model, weighted_objective
+from model.capacity import staffing_lower_bound
+from model.export import assignment_matrix, build_schedule_df
+
+
+def _set_bounds(domain, lo=None, hi=None):
+    # pole domain trzeba pobierać z modelu za każdym razem - po dodaniu ograniczeń stara referencja jest nieważna
+    if lo is not None:
+        domain[0] = lo
+    if hi is not None:
+        domain[len(domain) - 1] = hi
+
+
+class RosterModel:
+    """
+    Model CP-SAT budowany raz i zmieniany w miejscu (scenariusze "co jeśli" w dashboardzie).
+    Lekarze są bramkowani literałami active_d - dodanie / usunięcie lekarza to ustalenie
+    literału, niedostępność to ustalenie x = 0, a zmiana obsady lub wag podmienia stałe
+    ograniczeń / funkcję celu. Po każdej zmianie model jest rozwiązywany ponownie
+    z poprzednim rozwiązaniem jako podpowiedzią.
+    pool - dodatkowi lekarze (np. kandydaci), którzy są w modelu od początku, ale nieaktywni.
+    """
+
+    def __init__(self, instance=None, pool=None, weights=None, time_limit=None, workers=8):
+        if instance is None:
+            instance = load_instance()
+        full = instance
+        if pool is not None and len(pool):
+            full = instance.with_doctors(pd.concat([instance.doctors, pool], ignore_index=True))
+
+        self.full = full
+        self.time_limit = time_limit
+        self.workers = workers
+
+        self.built = build_roster_model(full, weights=weights, gate_doctors=True)
+        self.model = self.built["model"]
+        self.x = self.built["x"]
+        self.weights = self.built["weights"]
+
+        # stan danych - z niego liczone jest ograniczenie przepływowe i limity godzin
+        self.active = set(instance.D)
+        self.shifts = full.shifts.copy()
+        self.unavail_day = full.unavail_day.copy()
+        self.unavail_shift = full.unavail_shift.copy()
+        self.fixed_zero = set()
+
+        for d in full.D:
+            self._fix(self.built["active"][d], 1 if d in self.active else 0)
+
+        self.instance = None
+        self.last = None
+        self._sync()
+
+    # === NISKI POZIOM ===
+    def _var_domain(self, var):
+        return self.model.Proto().variables[var.Index()].domain
+
+    def _fix(self, var, value=None, lo=0, hi=1):
+        """Ustala zmienną na value albo przywraca zakres [lo, hi]"""
+        if value is not None:
+            lo = hi = value
+        _set_bounds(self._var_domain(var), lo, hi)
+
+    def _linear(self, constraint):
+        return self.model.Proto().constraints[constraint.Index()].linear
+
+    def _set_linear(self, constraint, terms, lo=cp_model.INT_MIN, hi=cp_model.INT_MAX):
+        """
+        Przepisuje całe ograniczenie liniowe: lo <= suma(współczynnik * zmienna) <= hi.
+        Zmienna ze współczynnikiem 0 przy budowie nie trafia do ograniczenia, więc samej
+        stałej nie da się podmienić - wiersz budowany jest od nowa (wyrazy z zerem są pomijane).
+        """
+        linear = self._linear(constraint)
+        terms = [(var, coeff) for var, coeff in terms if coeff != 0]
+        linear.vars.clear()
+        linear.coeffs.clear()
+        linear.domain.clear()
+        linear.vars.extend(var.Index() for var, _ in terms)
+        linear.coeffs.extend(coeff for _, coeff in terms)
+        linear.domain.extend([lo, hi])
+
+    def _sync(self):
+        """Bieżąca instancja (aktywni lekarze, nowe niedostępności i obsady) -> stałe zależne od danych"""
+        def keep(df):
+            return df[df["doctor_id"].isin(self.active)]
+
+        self.instance = self.full.with_tables(
+            doctors=self.full.doctors[self.full.doctors["id"].isin(self.active)],
+            shifts=self.shifts,
+            unavail_day=keep(self.unavail_day),
+            unavail_shift=keep(self.unavail_shift),
+            pref=keep(self.full.pref),
+            unavail_hours=keep(self.full.unavail_hours),
+        )
+        inst = self.instance
+        constraints = self.built["constraints"]
+
+        # limity godzin proporcjonalne do dostępnych dni
+        for d in inst.D:
+            limit = inst.adjusted_max_hours[d]
+            self._fix(self.built["worked_hours"][d], lo=0, hi=limit)
+            if d in self.built["underwork"]:
+                self._fix(self.built["underwork"][d], lo=0, hi=limit)
+                _set_bounds(self._linear(constraints["underwork_target"][d]).domain, lo=int(0.95 * limit))
+            if d in constraints["ratio_bounds"]:
+                # ratio * limit = worked_hours * 1000 +- 50 (jak w build_roster_model, bez historii)
+                upper, lower = constraints["ratio_bounds"][d]
+                terms = [(self.built["workload_ratio"][d], limit), (self.built["worked_hours"][d], -1000)]
+                self._set_linear(upper, terms, hi=50)
+                self._set_linear(lower, terms, lo=-50)
+
+        # minimalna obsada
+        for s, min_staff in zip(self.shifts["id"], self.shifts["min_staff"]):
+            self._fix(self.built["slacks"][s], lo=0, hi=int(min_staff))
+            _set_bounds(self._linear(constraints["cover"][s]).domain, lo=int(min_staff))
+
+        self.capacity = staffing_lower_bound(inst)
+        _set_bounds(self._linear(constraints["flow_bound"]).domain, lo=max(self.capacity["lower_bound"], 0))
+
+    # === OPERACJE ===
+    def add_doctor(self, doctor_id, solve=True):
+        """Aktywuje lekarza z puli (albo wcześniej usuniętego)"""
+        if doctor_id not in self.full.doctor_idx:
+            raise ValueError(f"lekarz {doctor_id} nie jest w modelu - dodaj go do puli przy budowie")
+        self.active.add(doctor_id)
+        self._fix(self.built["active"][doctor_id], 1)
+        return self._changed(solve)
+
+    def remove_doctor(self, doctor_id, solve=True):
+        if doctor_id not in self.active:
+            raise ValueError(f"lekarz {doctor_id} nie jest aktywny")
+        self.active.discard(doctor_id)
+        self._fix(self.built["active"][doctor_id], 0)
+        return self._changed(solve)
+
+    def add_unavailability(self, doctor_id, day=None, code=None, solve=True):
+        """Niedostępność całodniowa (day) albo na konkretną zmianę (code) - ustala x = 0"""
+        if (day is None) == (code is None):
+            raise ValueError("podaj dokładnie jedno z: day, code")
+        if doctor_id not in self.full.doctor_idx:
+            raise ValueError(f"nieznany lekarz {doctor_id}")
+
+        if day is not None:
+            shifts = self.full.days_to_shifts[day]
+            row = pd.DataFrame({"doctor_id": [doctor_id], "day": [day]})
+            self.unavail_day = pd.concat([self.unavail_day, row.astype(self.unavail_day.dtypes.to_dict())],
+                                         ignore_index=True)
+        else:
+            shifts = [self.full.code_to_id[code]]
+            row = pd.DataFrame({"doctor_id": [doctor_id], "code": [code]})
+            self.unavail_shift = pd.concat([self.unavail_shift, row.astype(self.unavail_shift.dtypes.to_dict())],
+                                           ignore_index=True)
+
+        for s in shifts:
+            self._fix(self.x[(doctor_id, s)], 0)
+            self.fixed_zero.add((doctor_id, s))
+        return self._changed(solve)
+
+    def set_min_staff(self, shift, min_staff, solve=True):
+        """Nowa minimalna obsada zmiany (id albo kod zmiany)"""
+        s = self.full.code_to_id.get(shift, shift)
+        if s not in self.full.shift_idx:
+            raise ValueError(f"nieznana zmiana {shift}")
+        self.shifts = self.shifts.copy()
+        self.shifts.loc[self.shifts["id"] == s, "min_staff"] = int(min_staff)
+        return self._changed(solve)
+
+    def set_weights(self, solve=True, **weights):
+        """Podmienia wybrane wagi funkcji celu (nazwy jak w DEFAULT_WEIGHTS)"""
+        unknown = set(weights) - set(self.weights)
+        if unknown:
+            raise ValueError(f"nieznane wagi: {sorted(unknown)}")
+        self.weights = {**self.weights, **weights}
+        self.model.Minimize(weighted_objective(self.built["objective_parts"], self.weights))
+        return self.solve() if solve else None
+
+    def _changed(self, solve):
+        self._sync()
+        return self.solve() if solve else None
+
+    # === ROZWIĄZANIE ===
+    def solve(self):
+        """Rozwiązuje bieżący model; poprzednie rozwiązanie (jeśli jest) jest podpowiedzią"""
+        self.model.ClearHints()
+        if self.last is not None and self.last["assignment"] is not None:
+            previous = self.last["assignment"]
+            for (d, s), var in self.x.items():
+                if (d, s) in self.fixed_zero:
+                    continue
+                value = previous.at[d, s] if d in previous.index else 0
+                self.model.AddHint(var, int(value))
+
+        solver = cp_model.CpSolver()
+        solver.parameters.num_search_workers = self.workers
+        if self.time_limit is not None:
+            solver.parameters.max_time_in_seconds = self.time_limit
+        status = solver.Solve(self.model)
+
+        result = {
+            "status": solver.StatusName(status),
+            "objective": None,
+            "assignment": None,
+            "schedule_df": None,
+            "missing": None,
+            "wall_time": solver.WallTime(),
+        }
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            full_assignment = assignment_matrix(self.x, solver, self.full.D, self.full.S)
+            assignment = full_assignment.loc[self.instance.D]
+            missing = {s: solver.Value(sl) for s, sl in self.built["slacks"].items() if solver.Value(sl) > 0}
+            result.update({
+                "objective": solver.ObjectiveValue(),
+                "assignment": assignment,
+                "schedule_df": build_schedule_df(assignment, self.instance, missing),
+                "missing": missing,
+            })
+        self.last = result
+        return result
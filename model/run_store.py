@@ -0,0 +1,323 @@
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import io
+import json
+import sqlite3
+
+import pandas as pd
+from ortools.sat.python import cp_model
+
+from model.export import SCHEDULE_COLUMNS
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_DB_PATH = BASE_DIR / "runs.sqlite"
+
+# Fazy wyniku run_with_one_extra_doctor: przed i po dodaniu lekarza
+PHASES = ("before", "after")
+# status zapisywany jako nazwa (OPTIMAL, ...) i odtwarzany jako status CP-SAT
+STATUS_BY_NAME = {status.name: status for status in (
+    cp_model.UNKNOWN, cp_model.MODEL_INVALID, cp_model.FEASIBLE, cp_model.INFEASIBLE, cp_model.OPTIMAL
+)}
+# ramka bez wierszy i bez zapisanych kolumn (uruchomienia sprzed tabeli frames)
+EMPTY_COLUMNS = {"schedules": SCHEDULE_COLUMNS}
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT,
+    objective REAL,
+    added INTEGER NOT NULL DEFAULT 0,
+    period_start TEXT,
+    period_end TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_lookup ON runs (input_hash, params);
+CREATE INDEX IF NOT EXISTS idx_runs_period ON runs (period_start, period_end);
+
+CREATE TABLE IF NOT EXISTS schedules (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    phase TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS doctor_stats (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    phase TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS solver_stats (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    phase TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hires (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    doctor_id INTEGER,
+    name TEXT,
+    role TEXT,
+    skills TEXT,
+    salary REAL,
+    payload TEXT
+);
+CREATE TABLE IF NOT EXISTS diagnoses (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    feasible INTEGER NOT NULL,
+    status TEXT,
+    solves INTEGER,
+    wall_time REAL,
+    shifts TEXT,
+    rules TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_diagnoses_run_id ON diagnoses (run_id);
+CREATE TABLE IF NOT EXISTS frames (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    tbl TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    columns TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_frames_run_id ON frames (run_id);
+"""
+
+# Indeksy na tabelach, których kolumny powstają przy pierwszym zapisie
+LATE_INDEXES = {
+    "schedules": [("run_id", "phase"), ("Doctor",), ("Dept",)],
+    "doctor_stats": [("run_id", "phase"), ("Doctor",)],
+    "solver_stats": [("run_id", "phase")],
+}
+
+
+def canonical_params(params):
+    """Parametry uruchomienia jako stabilny JSON (klucz wyszukiwania w magazynie)"""
+    return json.dumps(params or {}, sort_keys=True, default=str)
+
+
+def week_period(week, days_count=7):
+    """Okres grafiku (period_start, period_end) jako daty ISO - od pierwszego dnia tygodnia przez days_count dni"""
+    start = week if isinstance(week, date) else date.fromisoformat(str(week))
+    return start.isoformat(), (start + timedelta(days=days_count - 1)).isoformat()
+
+
+def next_monday(today=None):
+    """Poniedziałek najbliższego tygodnia - domyślny tydzień planowanego grafiku"""
+    today = today or date.today()
+    return today + timedelta(days=7 - today.weekday())
+
+
+class RunStore:
+    """Lokalny magazyn wyników (SQLite): harmonogramy, statystyki i decyzje o zatrudnieniu"""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript(SCHEMA_SQL)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # === ZAPIS ===
+    def _columns(self, table):
+        return {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+
+    def _append_frame(self, table, df, run_id, phase):
+        """
+        Dopisuje DataFrame do tabeli, dodając brakujące kolumny (schemat rośnie z modelem).
+        Lista kolumn ramki trafia do tabeli frames - także dla ramki bez wierszy (np. grafik
+        bez rozwiązania), więc odczyt odtwarza ją z tymi samymi kolumnami.
+        """
+        if df is None:
+            return
+        self.conn.execute(
+            "INSERT INTO frames (run_id, tbl, phase, columns) VALUES (?, ?, ?, ?)",
+            (run_id, table, phase, json.dumps([str(c) for c in df.columns], ensure_ascii=False)),
+        )
+        if df.empty:
+            return
+        df = df.copy()
+        df.insert(0, "phase", phase)
+        df.insert(0, "run_id", run_id)
+
+        existing = self._columns(table)
+        for col in df.columns:
+            if col not in existing:
+                self.conn.execute(f'ALTER TABLE {table} ADD COLUMN "{col}"')
+
+        df.to_sql(table, self.conn, if_exists="append", index=False)
+
+        columns = self._columns(table)
+        for cols in LATE_INDEXES.get(table, []):
+            if set(cols) <= columns:
+                name = f"idx_{table}_{'_'.join(cols).lower()}"
+                quoted = ", ".join(f'"{c}"' for c in cols)
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({quoted})")
+
+    def save_run(self, input_hash, result, params=None, period_start=None, period_end=None):
+        """
+        Zapisuje wynik run_with_one_extra_doctor (razem z diagnozą braków) i zwraca run_id.
+        period_start / period_end - daty tygodnia grafiku (week_period), po nich filtrują
+        list_runs i historie lekarzy / oddziałów.
+        """
+        final_phase = "after" if result.get("added") else "before"
+        solver_stats = result.get(f"solver_stats_{final_phase}")
+        status_name = getattr(result["status"], "name", str(result["status"]))
+        objective = None
+        if solver_stats is not None and not solver_stats.empty:
+            objective = solver_stats["objective_value"].iloc[0]
+            objective = None if pd.isna(objective) else float(objective)
+
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO runs (created_at, input_hash, params, status, objective, added, period_start, period_end) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    datetime.now().isoformat(timespec="seconds"),
+                    input_hash,
+                    canonical_params(params),
+                    status_name,
+                    objective,
+                    int(bool(result.get("added"))),
+                    str(period_start) if period_start is not None else None,
+                    str(period_end) if period_end is not None else None,
+                ),
+            )
+            run_id = cur.lastrowid
+
+            for phase in PHASES:
+                self._append_frame("schedules", result.get(f"schedule_{phase}"), run_id, phase)
+                self._append_frame("doctor_stats", result.get(f"stats_{phase}"), run_id, phase)
+                self._append_frame("solver_stats", result.get(f"solver_stats_{phase}"), run_id, phase)
+
+            new_doc = result.get("new_doctor")
+            if new_doc:
+                self.conn.execute(
+                    "INSERT INTO hires (run_id, doctor_id, name, role, skills, salary, payload) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        run_id,
+                        int(new_doc["id"]),
+                        new_doc.get("name"),
+                        new_doc.get("role"),
+                        new_doc.get("skills"),
+                        new_doc.get("salary"),
+                        json.dumps(new_doc, default=str),
+                    ),
+                )
+
+            diagnosis = result.get("diagnosis")
+            if diagnosis is not None:
+                self.conn.execute(
+                    "INSERT INTO diagnoses (run_id, feasible, status, solves, wall_time, shifts, rules) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        run_id,
+                        int(bool(diagnosis["feasible"])),
+                        diagnosis.get("status"),
+                        diagnosis.get("solves"),
+                        diagnosis.get("wall_time"),
+                        diagnosis["shifts"].to_json(orient="split", index=False, force_ascii=False),
+                        diagnosis["rules"].to_json(orient="split", index=False, force_ascii=False),
+                    ),
+                )
+        return run_id
+
+    # === ODCZYT ===
+    def find_run(self, input_hash, params=None):
+        """Zwraca run_id najnowszego uruchomienia dla tych samych danych i parametrów (albo None)"""
+        row = self.conn.execute(
+            "SELECT run_id FROM runs WHERE input_hash = ? AND params = ? ORDER BY run_id DESC LIMIT 1",
+            (input_hash, canonical_params(params)),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _read_phase(self, table, run_id, phase):
+        if table not in {r[0] for r in self.conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}:
+            return None
+        df = pd.read_sql_query(
+            f"SELECT * FROM {table} WHERE run_id = ? AND phase = ?", self.conn, params=(run_id, phase)
+        ).drop(columns=["run_id", "phase"])
+
+        # kolumny zapisanej ramki (bez kolumn dodanych do tabeli przez inne uruchomienia)
+        row = self.conn.execute(
+            "SELECT columns FROM frames WHERE run_id = ? AND tbl = ? AND phase = ?", (run_id, table, phase)
+        ).fetchone()
+        if row is not None:
+            return df.reindex(columns=json.loads(row[0]))
+        if df.empty:
+            return pd.DataFrame(columns=EMPTY_COLUMNS.get(table, []))
+        return df
+
+    def _read_diagnosis(self, run_id):
+        row = self.conn.execute(
+            "SELECT feasible, status, solves, wall_time, shifts, rules FROM diagnoses WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        feasible, status, solves, wall_time, shifts, rules = row
+        return {
+            "feasible": bool(feasible),
+            "status": status,
+            "shifts": pd.read_json(io.StringIO(shifts), orient="split"),
+            "rules": pd.read_json(io.StringIO(rules), orient="split"),
+            "solves": solves,
+            "wall_time": wall_time,
+        }
+
+    def load_run(self, run_id):
+        """Odtwarza słownik wyniku w formacie run_with_one_extra_doctor"""
+        row = self.conn.execute("SELECT status, added FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Brak uruchomienia o run_id={run_id}")
+        status, added = row
+
+        result = {"added": bool(added), "status": STATUS_BY_NAME.get(status, status), "run_id": run_id}
+        for phase in PHASES if added else ("before",):
+            result[f"schedule_{phase}"] = self._read_phase("schedules", run_id, phase)
+            result[f"stats_{phase}"] = self._read_phase("doctor_stats", run_id, phase)
+            result[f"solver_stats_{phase}"] = self._read_phase("solver_stats", run_id, phase)
+
+        if added:
+            hire = self.conn.execute("SELECT payload FROM hires WHERE run_id = ?", (run_id,)).fetchone()
+            result["new_doctor"] = json.loads(hire[0]) if hire else None
+
+        diagnosis = self._read_diagnosis(run_id)
+        if diagnosis is not None:
+            result["diagnosis"] = diagnosis
+        return result
+
+    def list_runs(self, start=None, end=None):
+        """Lista uruchomień, opcjonalnie ograniczona do okresu [start, end]"""
+        query = "SELECT * FROM runs WHERE 1 = 1"
+        args = []
+        if start is not None:
+            query += " AND period_end >= ?"
+            args.append(str(start))
+        if end is not None:
+            query += " AND period_start <= ?"
+            args.append(str(end))
+        return pd.read_sql_query(query + " ORDER BY run_id DESC", self.conn, params=args)
+
+    def _history(self, column, value, start=None, end=None):
+        if column not in self._columns("schedules"):
+            return pd.DataFrame()
+        query = (
+            f'SELECT r.period_start, r.period_end, s.* FROM schedules s JOIN runs r USING (run_id) '
+            f'WHERE s."{column}" = ?'
+        )
+        args = [value]
+        if start is not None:
+            query += " AND r.period_end >= ?"
+            args.append(str(start))
+        if end is not None:
+            query += " AND r.period_start <= ?"
+            args.append(str(end))
+        return pd.read_sql_query(query + " ORDER BY s.run_id", self.conn, params=args)
+
+    def doctor_history(self, doctor, start=None, end=None):
+        """Wszystkie zapisane przydziały danego lekarza (po nazwisku, jak w schedule_df)"""
+        return self._history("Doctor", doctor, start, end)
+
+    def department_history(self, dept, start=None, end=None):
+        """Wszystkie zapisane przydziały na danym oddziale (WARD / ICU / CLINIC)"""
+        return self._history("Dept", dept, start, end)
@@ -0,0 +1,322 @@
+import pandas as pd
+
+from model.capacity import MAX_WORKING_DAYS
+from model.constraints import rest_conflicts
+from model.validation import schedule_to_assignment
+
+SWAP_COLUMNS = ["doctor_a", "shift_a", "code_a", "doctor_b", "shift_b", "code_b", "delta"]
+
+
+def _extremes(values, k=3):
+    """k największych i k najmniejszych par (wartość, lekarz) - max / min bez dwóch lekarzy w O(1)"""
+    ordered = sorted((v, d) for d, v in values.items())
+    return ordered[::-1][:k], ordered[:k]
+
+
+def _first_other(ordered, skip):
+    return next((v for v, d in ordered if d not in skip), None)
+
+
+class SwapEngine:
+    """
+    Zamiany zmian po publikacji grafiku bez solvera. Z rozwiązanego grafiku liczony jest raz
+    stan każdego lekarza (zajęte zmiany jako maska bitowa, zmiany i noce w każdym dniu, suma
+    godzin) oraz dane zmian (maski konfliktów odpoczynku 11h, liczba specjalistów i stażystów
+    na zmianie), więc sprawdzenie zamiany to kilka operacji na bitach i krótkich listach
+    dla dwóch lekarzy i dwóch zmian - te same reguły co validate_assignment.
+    Zamiana: lekarz A oddaje shift_a lekarzowi B, a B oddaje A shift_b (shift_b=None - samo
+    przekazanie zmiany). Obsada zmian się nie zmienia, więc zmiana celu to tylko preferencje,
+    rozrzut nocy, rozrzut proporcji godzin (w promilach, zaokrąglona jak w "tight")
+    i niedopracowanie - z wagami jak w modelu.
+    """
+
+    def __init__(self, instance, assignment, weights=None):
+        from model.cp_sat_model import DEFAULT_WEIGHTS
+
+        self.instance = instance
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.D = list(instance.D)
+        self.S = list(instance.S)
+        self.shift_col = {s: j for j, s in enumerate(self.S)}
+        self.codes = instance.shifts["code"].tolist()
+
+        shifts = instance.shifts
+        self.day = shifts["day"].cat.codes.tolist()
+        self.night = shifts["id"].isin(instance.night_shifts).tolist()
+        self.hours = shifts["hours"].tolist()
+        self.n_days = len(instance.days)
+
+        # maski bitowe zmian: konflikty odpoczynku (w obie strony) i dozwolone zmiany lekarza per reguła
+        self.conflict = [0] * len(self.S)
+        for s1, s2 in rest_conflicts(instance):
+            j1, j2 = self.shift_col[s1], self.shift_col[s2]
+            self.conflict[j1] |= 1 << j2
+            self.conflict[j2] |= 1 << j1
+        self.allowed = {
+            rule: {d: sum(1 << j for j in range(len(self.S)) if mask[i, j]) for i, d in enumerate(self.D)}
+            for rule, mask in instance.eligibility_masks().items()
+        }
+
+        self.max_hours = {d: instance.adjusted_max_hours[d] for d in self.D}
+        self.specialists = set(instance.specialists)
+        self.trainees = set(instance.needs_mentor)
+        self.opt_out = set(instance.opt_out_doctors)
+        self.regular = set(instance.regular_doctors)
+        self.pref = {
+            (d, instance.code_to_id[code]): (-1 if preference == "like" else 1)
+            for d, code, preference in zip(instance.pref["doctor_id"], instance.pref["code"],
+                                           instance.pref["preference"])
+            if preference in ("like", "dislike")
+        }
+
+        A = assignment.reindex(index=self.D, columns=self.S, fill_value=0).to_numpy()
+        self.occupancy = {}
+        self.per_day = {}
+        self.nights_day = {}
+        self.worked = {}
+        for i, d in enumerate(self.D):
+            self._set_doctor(d, [j for j in range(len(self.S)) if A[i, j] > 0])
+        self.spec_count = [int(sum(A[i, j] > 0 for i, d in enumerate(self.D) if d in self.specialists))
+                           for j in range(len(self.S))]
+        self.trainee_count = [int(sum(A[i, j] > 0 for i, d in enumerate(self.D) if d in self.trainees))
+                              for j in range(len(self.S))]
+        self._refresh_fairness()
+
+    @classmethod
+    def from_schedule(cls, schedule_df, instance, weights=None):
+        """Silnik z opublikowanego schedule_df (np. wczytanego z schedule.csv)"""
+        assignment, _ = schedule_to_assignment(schedule_df, instance)
+        return cls(instance, assignment, weights)
+
+    # === STAN ===
+    def _set_doctor(self, d, cols):
+        per_day = [0] * self.n_days
+        nights_day = [0] * self.n_days
+        for j in cols:
+            per_day[self.day[j]] += 1
+            nights_day[self.day[j]] += self.night[j]
+        self.occupancy[d] = sum(1 << j for j in cols)
+        self.per_day[d] = per_day
+        self.nights_day[d] = nights_day
+        self.worked[d] = sum(self.hours[j] for j in cols)
+
+    def _ratio(self, d, worked):
+        limit = self.instance.adjusted_max_hours[d]
+        return round(1000 * worked / limit)
+
+    def _underwork(self, d, worked):
+        return max(0, int(0.95 * self.instance.adjusted_max_hours[d]) - worked)
+
+    def _refresh_fairness(self):
+        self.night_count = {d: sum(self.nights_day[d]) for d in self.D}
+        self.ratio = {
+            d: self._ratio(d, self.worked[d])
+            for d in self.D if d in self.opt_out and self.instance.adjusted_max_hours[d] > 0
+        }
+        self.night_top, self.night_bottom = _extremes(self.night_count)
+        self.ratio_top, self.ratio_bottom = _extremes(self.ratio)
+
+    # === REGUŁY ===
+    def _doctor_violations(self, d, remove, add, found):
+        """Reguły jednego lekarza po oddaniu zmiany remove i objęciu add (kolumny)"""
+        bit = 1 << add
+        for rule, allowed in self.allowed.items():
+            if not allowed[d] & bit:
+                found.append(rule)
+
+        occupancy = self.occupancy[d] & ~(1 << remove) if remove is not None else self.occupancy[d]
+        per_day = list(self.per_day[d])
+        nights_day = list(self.nights_day[d])
+        worked = self.worked[d] + self.hours[add]
+        if remove is not None:
+            per_day[self.day[remove]] -= 1
+            nights_day[self.day[remove]] -= self.night[remove]
+            worked -= self.hours[remove]
+        day = self.day[add]
+        per_day[day] += 1
+        nights_day[day] += self.night[add]
+
+        if per_day[day] > 1:
+            found.append("one_shift_per_day")
+        if self.conflict[add] & occupancy:
+            found.append("rest_11h")
+        if worked > self.max_hours[d]:
+            found.append("weekly_hours")
+        # okna 3 dni z nowym dniem
+        if any(sum(nights_day[k:k + 3]) > 2 for k in range(max(0, day - 2), min(day, self.n_days - 3) + 1)):
+            found.append("max_2_nights")
+        # pary (noc, następny dzień) z nowym dniem
+        if any(nights_day[k] > 0 and nights_day[k] + per_day[k + 1] > 1
+               for k in (day - 1, day) if 0 <= k < self.n_days - 1):
+            found.append("day_off_after_night")
+        if sum(n > 0 for n in per_day) > MAX_WORKING_DAYS:
+            found.append("weekly_rest_35h")
+        return worked
+
+    def _mentor_violation(self, j, leaving, joining):
+        """Stażysta bez specjalisty na zmianie j po zamianie leaving -> joining"""
+        specialists = self.spec_count[j] - (leaving in self.specialists) + (joining in self.specialists)
+        trainees = self.trainee_count[j] - (leaving in self.trainees) + (joining in self.trainees)
+        return trainees > 0 and specialists < 1
+
+    def _cols(self, doctor_a, shift_a, doctor_b, shift_b):
+        if doctor_a == doctor_b:
+            raise ValueError("zamiana wymaga dwóch różnych lekarzy")
+        if shift_a == shift_b:
+            raise ValueError("zamiana tej samej zmiany nic nie zmienia")
+        a = self.shift_col[shift_a]
+        if not self.occupancy[doctor_a] >> a & 1:
+            raise ValueError(f"lekarz {doctor_a} nie ma zmiany {self.codes[a]}")
+        if self.occupancy[doctor_b] >> a & 1:
+            raise ValueError(f"lekarz {doctor_b} ma już zmianę {self.codes[a]}")
+        b = None
+        if shift_b is not None:
+            b = self.shift_col[shift_b]
+            if not self.occupancy[doctor_b] >> b & 1:
+                raise ValueError(f"lekarz {doctor_b} nie ma zmiany {self.codes[b]}")
+            if self.occupancy[doctor_a] >> b & 1:
+                raise ValueError(f"lekarz {doctor_a} ma już zmianę {self.codes[b]}")
+        return a, b
+
+    # === ZAPYTANIA ===
+    def check(self, doctor_a, shift_a, doctor_b, shift_b=None):
+        """
+        Czy zamiana jest zgodna ze wszystkimi regułami twardymi. Zwraca słownik: legal,
+        violations (nazwy reguł z HARD_CONSTRAINT_FAMILIES) i delta (zmiana funkcji celu).
+        """
+        a, b = self._cols(doctor_a, shift_a, doctor_b, shift_b)
+        found = []
+        worked_b = self._doctor_violations(doctor_b, b, a, found)
+        worked_a = self.worked[doctor_a] - self.hours[a]
+        if b is not None:
+            worked_a = self._doctor_violations(doctor_a, a, b, found)
+        if self._mentor_violation(a, doctor_a, doctor_b) or (
+                b is not None and self._mentor_violation(b, doctor_b, doctor_a)):
+            found.append("mentor")
+
+        return {
+            "legal": not found,
+            "violations": list(dict.fromkeys(found)),
+            "delta": self._delta(doctor_a, a, worked_a, doctor_b, b, worked_b),
+        }
+
+    def _delta(self, doctor_a, a, worked_a, doctor_b, b, worked_b):
+        w = self.weights
+        skip = (doctor_a, doctor_b)
+
+        # preferencje: A traci a i zyskuje b, B odwrotnie
+        pref = (self.pref.get((doctor_b, self.S[a]), 0) - self.pref.get((doctor_a, self.S[a]), 0))
+        if b is not None:
+            pref += self.pref.get((doctor_a, self.S[b]), 0) - self.pref.get((doctor_b, self.S[b]), 0)
+
+        # rozrzut nocy
+        nights_a = self.night_count[doctor_a] - self.night[a] + (self.night[b] if b is not None else 0)
+        nights_b = self.night_count[doctor_b] + self.night[a] - (self.night[b] if b is not None else 0)
+        changed = [nights_a, nights_b]
+        top = max([v for v in (_first_other(self.night_top, skip),) if v is not None] + changed)
+        bottom = min([v for v in (_first_other(self.night_bottom, skip),) if v is not None] + changed)
+        night = (top - bottom) - (self.night_top[0][0] - self.night_bottom[0][0])
+
+        # rozrzut proporcji godzin
+        ratio = 0
+        if self.ratio:
+            changed = [self._ratio(d, h) for d, h in ((doctor_a, worked_a), (doctor_b, worked_b)) if d in self.ratio]
+            others = [v for v in (_first_other(self.ratio_top, skip), _first_other(self.ratio_bottom, skip))
+                      if v is not None]
+            values = changed + others
+            ratio = (max(values) - min(values)) - (self.ratio_top[0][0] - self.ratio_bottom[0][0])
+
+        underwork = sum(
+            self._underwork(d, h) - self._underwork(d, self.worked[d])
+            for d, h in ((doctor_a, worked_a), (doctor_b, worked_b)) if d in self.regular
+        )
+        return w["pref"] * pref + w["night"] * night + w["ratio"] * ratio + w["underwork"] * underwork
+
+    def options(self, doctor, shift=None, legal_only=True):
+        """
+        Z kim lekarz może zamienić swoje zmiany (albo tylko shift): wszystkie zamiany na zmiany
+        innych lekarzy i samo przekazanie zmiany (shift_b=None) - bez par, w których któryś
+        lekarz ma już zmianę drugiego. DataFrame SWAP_COLUMNS posortowany po zmianie celu
+        (najpierw zamiany poprawiające grafik).
+        """
+        mine = [self.S[j] for j in range(len(self.S)) if self.occupancy[doctor] >> j & 1]
+        if shift is not None:
+            mine = [shift]
+
+        rows = []
+        for shift_a in mine:
+            a = self.shift_col[shift_a]
+            for other in self.D:
+                if other == doctor or self.occupancy[other] >> a & 1:
+                    continue
+                theirs = [None] + [self.S[j] for j in range(len(self.S))
+                                   if self.occupancy[other] >> j & 1 and not self.occupancy[doctor] >> j & 1]
+                for shift_b in theirs:
+                    result = self.check(doctor, shift_a, other, shift_b)
+                    if legal_only and not result["legal"]:
+                        continue
+                    rows.append({
+                        "doctor_a": doctor,
+                        "shift_a": shift_a,
+                        "code_a": self.codes[self.shift_col[shift_a]],
+                        "doctor_b": other,
+                        "shift_b": shift_b,
+                        "code_b": self.codes[self.shift_col[shift_b]] if shift_b is not None else None,
+                        "delta": result["delta"],
+                    })
+        swaps = pd.DataFrame(rows, columns=SWAP_COLUMNS).astype({"shift_b": "Int64"})
+        return swaps.sort_values("delta", kind="stable", ignore_index=True)
+
+    def apply(self, doctor_a, shift_a, doctor_b, shift_b=None):
+        """Zatwierdza zamianę (tylko zgodną z regułami) i aktualizuje stan; zwraca wynik check"""
+        result = self.check(doctor_a, shift_a, doctor_b, shift_b)
+        if not result["legal"]:
+            raise ValueError(f"zamiana narusza reguły: {', '.join(result['violations'])}")
+        a, b = self._cols(doctor_a, shift_a, doctor_b, shift_b)
+
+        cols_a = [j for j in range(len(self.S)) if self.occupancy[doctor_a] >> j & 1 and j != a]
+        cols_b = [j for j in range(len(self.S)) if self.occupancy[doctor_b] >> j & 1 and j != b] + [a]
+        if b is not None:
+            cols_a.append(b)
+        self._set_doctor(doctor_a, cols_a)
+        self._set_doctor(doctor_b, cols_b)
+        for j, leaving, joining in ((a, doctor_a, doctor_b), (b, doctor_b, doctor_a)):
+            if j is None:
+                continue
+            self.spec_count[j] += (joining in self.specialists) - (leaving in self.specialists)
+            self.trainee_count[j] += (joining in self.trainees) - (leaving in self.trainees)
+        self._refresh_fairness()
+        return result
+
+    def assignment(self):
+        """Bieżąca macierz przydziałów (po zatwierdzonych zamianach)"""
+        matrix = [[self.occupancy[d] >> j & 1 for j in range(len(self.S))] for d in self.D]
+        return pd.DataFrame(matrix, index=pd.Index(self.D, name="doctor_id"), columns=pd.Index(self.S, name="shift_id"))
+
+
+if __name__ == "__main__":
+    import random
+    from time import perf_counter
+
+    from model.data_loader import load_instance
+    from model.heuristic import construct_greedy
+
+    # przykład: python -m model.swaps - przepustowość zapytań na grafiku z heurystyki
+    instance = load_instance()
+    engine = SwapEngine(instance, construct_greedy(instance)["assignment"])
+    rng = random.Random(0)
+    owned = [(d, s) for d in engine.D for s in engine.S if engine.occupancy[d] >> engine.shift_col[s] & 1]
+
+    queries = []
+    for _ in range(10000):
+        doctor_a, shift_a = rng.choice(owned)
+        doctor_b, shift_b = rng.choice(owned)
+        if doctor_b != doctor_a and not engine.occupancy[doctor_b] >> engine.shift_col[shift_a] & 1 \
+                and not engine.occupancy[doctor_a] >> engine.shift_col[shift_b] & 1:
+            queries.append((doctor_a, shift_a, doctor_b, shift_b))
+
+    started = perf_counter()
+    legal = sum(engine.check(*q)["legal"] for q in queries)
+    elapsed = perf_counter() - started
+    print(f"{len(queries)} zapytań w {elapsed:.3f} s ({len(queries) / elapsed:,.0f}/s), zgodnych: {legal}")
+    print(engine.options(owned[0][0]).head(10).to_string(index=False))
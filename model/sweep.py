@@ -0,0 +1,146 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+import os
+
+from ortools.sat.python import cp_model
+import numpy as np
+import pandas as pd
+
+from model.data_loader import load_instance
+from model.cp_sat_model import DEFAULT_WEIGHTS, build_roster_model
+from model.export import assignment_matrix
+
+# Kryteria frontu Pareto (wszystkie minimalizowane)
+PARETO_CRITERIA = ["pref_score", "night_spread", "ratio_spread"]
+
+# Domyślna siatka - wagi kryteriów frontu, pozostałe jak w DEFAULT_WEIGHTS
+DEFAULT_GRID = {
+    "pref": (0, 1, 2, 5),
+    "night": (0, 1, 5),
+    "ratio": (0, 2, 10),
+}
+
+
+def weight_grid(grid=None):
+    """Lista słowników wag - iloczyn kartezjański wartości z grid ({nazwa wagi: wartości})"""
+    grid = grid or DEFAULT_GRID
+    names = list(grid)
+    return [{**DEFAULT_WEIGHTS, **dict(zip(names, values))} for values in product(*(grid[n] for n in names))]
+
+
+def _weight_distance(w1, w2):
+    """Odległość wektorów wag w skali logarytmicznej (waga 0 traktowana jak bardzo mała)"""
+    return sum(abs(np.log1p(w1[k]) - np.log1p(w2[k])) for k in DEFAULT_WEIGHTS)
+
+
+def solve_point(instance, weights, hint=None, time_limit=None, workers=1):
+    """Jedno rozwiązanie dla wektora wag - wynik bez obiektów solvera (musi się dać przesłać między procesami)"""
+    built = build_roster_model(instance, hint=hint, weights=weights)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.num_search_workers = workers
+    if time_limit is not None:
+        solver.parameters.max_time_in_seconds = time_limit
+    status = solver.Solve(built["model"])
+
+    result = {"weights": weights, "status": solver.StatusName(status), "wall_time": solver.WallTime()}
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return result
+
+    result.update({
+        "objective": solver.ObjectiveValue(),
+        "slack": sum(solver.Value(sl) for sl in built["slacks"].values()),
+        "pref_score": solver.Value(built["pref_score"]),
+        "night_spread": solver.Value(built["spread"]),
+        "ratio_spread": solver.Value(built["ratio_spread"]),
+        "assignment": assignment_matrix(built["x"], solver, instance.D, instance.S),
+    })
+    return result
+
+
+def pareto_front(points, criteria=None):
+    """
+    Niezdominowane punkty (wszystkie kryteria minimalizowane).
+    Braki obsady mają pierwszeństwo - porównujemy tylko rozwiązania z najmniejszym slackiem.
+    Punkty o identycznych wartościach kryteriów są zwijane do pierwszego.
+    """
+    criteria = criteria or PARETO_CRITERIA
+    solved = points.dropna(subset=criteria)
+    if solved.empty:
+        return solved
+    solved = solved[solved["slack"] == solved["slack"].min()]
+    solved = solved.drop_duplicates(subset=criteria)
+
+    values = solved[criteria].to_numpy()
+    # punkt j dominuje i: nie gorszy we wszystkich kryteriach i lepszy w co najmniej jednym
+    no_worse = (values[None, :, :] <= values[:, None, :]).all(axis=2)
+    better = (values[None, :, :] < values[:, None, :]).any(axis=2)
+    dominated = (no_worse & better).any(axis=1)
+    return solved[~dominated].sort_values(criteria)
+
+
+def weight_sweep(instance=None, grid=None, processes=None, time_limit=30, workers_per_solve=None):
+    """
+    Rozwiązuje model dla siatki wag w puli procesów i zwraca front Pareto.
+    Najpierw liczony jest punkt domyślnych wag; każdy kolejny dostaje podpowiedź
+    z najbliższego (w przestrzeni wag) już rozwiązanego punktu.
+    Rdzenie dzielone są między procesy: workers_per_solve = rdzenie / processes.
+    Zwraca słownik: points (wszystkie punkty), front, assignments {nr punktu: macierz przydziałów}.
+    """
+    if instance is None:
+        instance = load_instance()
+
+    points = weight_grid(grid)
+    cores = os.cpu_count() or 1
+    processes = processes or min(cores, len(points))
+    workers_per_solve = workers_per_solve or max(1, cores // processes)
+
+    # punkt startowy - domyślne wagi (albo najbliższy im punkt siatki)
+    start = min(range(len(points)), key=lambda i: _weight_distance(points[i], DEFAULT_WEIGHTS))
+    pending = [i for i in range(len(points)) if i != start]
+    results = {}
+
+    def nearest_hint(i):
+        solved = [j for j, r in results.items() if "assignment" in r]
+        if not solved:
+            return None
+        j = min(solved, key=lambda j: _weight_distance(points[i], points[j]))
+        return results[j]["assignment"]
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        results[start] = pool.submit(
+            solve_point, instance, points[start], None, time_limit, cores
+        ).result()
+
+        running = {}
+        while pending or running:
+            while pending and len(running) < processes:
+                i = pending.pop(0)
+                future = pool.submit(solve_point, instance, points[i], nearest_hint(i), time_limit, workers_per_solve)
+                running[future] = i
+            done = next(as_completed(running))
+            results[running.pop(done)] = done.result()
+
+    rows = []
+    assignments = {}
+    for i in sorted(results):
+        r = results[i]
+        if "assignment" in r:
+            assignments[i] = r["assignment"]
+        row = {"point": i, **{f"w_{k}": v for k, v in r["weights"].items()}}
+        row.update({k: r.get(k) for k in ("status", "objective", "slack", *PARETO_CRITERIA, "wall_time")})
+        rows.append(row)
+    points_df = pd.DataFrame(rows)
+
+    return {
+        "points": points_df,
+        "front": pareto_front(points_df),
+        "assignments": assignments,
+    }
+
+
+if __name__ == "__main__":
+    sweep = weight_sweep()
+    print(sweep["points"].to_string(index=False))
+    print("\n=== FRONT PARETO ===")
+    print(sweep["front"].to_string(index=False))
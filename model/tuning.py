@@ -0,0 +1,140 @@
+from pathlib import Path
+from time import perf_counter
+import sys
+
+import pandas as pd
+
+from model.cp_sat_model import build_roster_model, save_solver_profile
+from model.replay import find_dumps, load_dump, replay
+
+# Zestawy parametrów do porównania: wariant bazowy + zmiany pojedynczych ustawień + kilka połączeń
+BASE_PARAMS = {"num_search_workers": 8}
+PORTFOLIO = {
+    "base": {},
+    "workers_4": {"num_search_workers": 4},
+    "workers_16": {"num_search_workers": 16},
+    "linearization_0": {"linearization_level": 0},
+    "linearization_2": {"linearization_level": 2},
+    "symmetry_0": {"symmetry_level": 0},
+    "symmetry_4": {"symmetry_level": 4},
+    "no_presolve": {"cp_model_presolve": False},
+    "presolve_long": {"max_presolve_iterations": 10},
+    "no_lns": {"use_lns": False},
+    "lns_only": {"use_lns_only": True},
+    "objective_lb": {"use_objective_lb_search": True},
+    "lin2_objective_lb": {"linearization_level": 2, "use_objective_lb_search": True},
+    "lin2_symmetry_4": {"linearization_level": 2, "symmetry_level": 4},
+}
+
+
+def corpus_from_instances(instances):
+    """Korpus z instancji ({nazwa: instancja}, np. poziomy benchmarku) w formacie zrzutów"""
+    corpus = []
+    for name, instance in instances.items():
+        corpus.append({
+            "model": build_roster_model(instance)["model"],
+            "parameters": "",
+            "meta": {"doctors": len(instance.D), "shifts": len(instance.S)},
+            "path": Path(name),
+        })
+    return corpus
+
+
+def corpus_from_dumps(root):
+    return [load_dump(path) for path in find_dumps(root)]
+
+
+def time_to_target(curves, target):
+    """Pierwszy moment, w którym krzywa osiągnęła cel (minimalizacja); None jeśli nigdy"""
+    reached = curves[curves["objective"] <= target]
+    return reached["time"].min() if len(reached) else None
+
+
+def tune(corpus, portfolio=None, run_time=30, budget=None, gap=0.0):
+    """
+    Uruchamia każdy zestaw parametrów na każdej instancji korpusu (limit run_time na przebieg,
+    łącznie najwyżej budget sekund). Instancje idą po kolei, każda ze wszystkimi zestawami -
+    przy wyczerpanym budżecie kolejna instancja nie jest zaczynana, więc wszystkie zestawy
+    są oceniane na tych samych instancjach. Celem instancji jest najlepsza wartość znaleziona
+    przez dowolny zestaw (z tolerancją gap, np. 0.01 = 1%). Ranking: średni czas do celu,
+    przebiegi bez osiągnięcia celu liczone jako 2 * run_time (PAR2).
+    Zwraca słownik: ranking (DataFrame) i runs (wszystkie przebiegi).
+    """
+    portfolio = portfolio or PORTFOLIO
+    round_time = len(portfolio) * run_time
+    if not corpus:
+        raise ValueError("pusty korpus")
+    if budget is not None and budget < round_time:
+        raise ValueError(
+            f"budżet {budget:g} s nie wystarcza na jedną instancję (zestawy: {len(portfolio)} x {run_time:g} s)"
+        )
+    started = perf_counter()
+
+    runs = []
+    curves = []
+    for dump in corpus:
+        if budget is not None and runs and perf_counter() - started + round_time > budget:
+            break
+        for name, overrides in portfolio.items():
+            params = {**BASE_PARAMS, **overrides, "max_time_in_seconds": run_time}
+            result = replay(dump, {name: params})
+            runs.append(result["runs"])
+            curves.append(result["curves"])
+
+    runs = pd.concat(runs, ignore_index=True)
+    curves = pd.concat(curves, ignore_index=True) if curves else pd.DataFrame(
+        columns=["dump", "variant", "repeat", "time", "objective", "bound"]
+    )
+
+    # cel per instancja: najlepszy wynik spośród wszystkich zestawów
+    best = runs.groupby("dump")["objective"].min()
+    runs["target"] = runs["dump"].map(best + best.abs() * gap)
+    runs["time_to_target"] = [
+        time_to_target(curves[(curves["dump"] == row.dump) & (curves["variant"] == row.variant)], row.target)
+        for row in runs.itertuples()
+    ]
+    runs["score"] = runs["time_to_target"].fillna(2 * run_time)
+
+    ranking = runs.groupby("variant").agg(
+        instances=("dump", "nunique"),
+        reached=("time_to_target", "count"),
+        mean_time_to_target=("score", "mean"),
+        optimal=("status", lambda s: int((s == "OPTIMAL").sum())),
+    ).sort_values(["mean_time_to_target", "reached"], ascending=[True, False]).reset_index()
+    ranking["params"] = ranking["variant"].map(lambda v: {**BASE_PARAMS, **portfolio[v]})
+
+    return {"ranking": ranking, "runs": runs}
+
+
+def write_best_profile(ranking, name="tuned", path=None):
+    """Zapisuje najlepszy zestaw jako profil solvera (do użycia: profile=name)"""
+    params = ranking.iloc[0]["params"]
+    return save_solver_profile(name, params, path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from model.benchmark import TIERS, benchmark_tiers
+
+    parser = argparse.ArgumentParser(description="Strojenie parametrów CP-SAT na korpusie instancji")
+    parser.add_argument("--dumps", help="katalog ze zrzutami modeli (model/replay.py)")
+    parser.add_argument("--tiers", nargs="*", default=["small", "medium"], choices=sorted(TIERS),
+                        help="poziomy benchmarku (gdy brak --dumps)")
+    parser.add_argument("--run-time", type=float, default=30, help="limit czasu jednego przebiegu (s)")
+    parser.add_argument("--budget", type=float, help="łączny limit czasu strojenia (s)")
+    parser.add_argument("--gap", type=float, default=0.0, help="tolerancja celu względem najlepszego wyniku")
+    parser.add_argument("--profile-name", default="tuned", help="nazwa zapisywanego profilu")
+    args = parser.parse_args()
+
+    if args.dumps:
+        corpus = corpus_from_dumps(args.dumps)
+    else:
+        corpus = corpus_from_instances(benchmark_tiers({t: TIERS[t] for t in args.tiers}))
+    try:
+        result = tune(corpus, run_time=args.run_time, budget=args.budget, gap=args.gap)
+    except ValueError as e:
+        sys.exit(str(e))
+    print(result["ranking"].drop(columns=["params"]).to_string(index=False))
+    path = write_best_profile(result["ranking"], args.profile_name)
+    print(f"Zapisano profil '{args.profile_name}' w {path}")
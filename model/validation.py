@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+from model.capacity import MAX_WORKING_DAYS
+from model.constraints import HARD_CONSTRAINT_FAMILIES, rest_conflicts
+
+VIOLATION_COLUMNS = ["rule", "doctor_id", "Doctor", "day", "shifts", "value", "limit"]
+
+
+def schedule_to_assignment(schedule_df, instance):
+    """
+    Macierz przydziałów (lekarz x zmiana, liczba wpisów) z schedule_df - wiersze z brakami są
+    pomijane. Zwraca (macierz DataFrame, wiersze z nieznanym lekarzem lub zmianą).
+    Zdublowany wpis daje w macierzy 2 (wykrywane jako naruszenie 1 zmiany na dobę).
+    """
+    rows = schedule_df
+    if "Missing" in rows.columns:
+        rows = rows[rows["Missing"] == 0]
+
+    name_to_id = {name: d for d, name in instance.id_to_name.items()}
+    doc = rows["Doctor"].map(name_to_id)
+    shift = rows["ShiftCode"].map(instance.code_to_id)
+    known = doc.notna() & shift.notna()
+
+    matrix = np.zeros((len(instance.D), len(instance.S)), dtype=np.int64)
+    np.add.at(
+        matrix,
+        (doc[known].map(instance.doctor_idx).to_numpy(dtype=np.int64),
+         shift[known].map(instance.shift_idx).to_numpy(dtype=np.int64)),
+        1,
+    )
+    assignment = pd.DataFrame(
+        matrix, index=pd.Index(instance.D, name="doctor_id"), columns=pd.Index(instance.S, name="shift_id")
+    )
+    return assignment, rows[~known]
+
+
+def validate_assignment(assignment, instance):
+    """
+    Sprawdza wszystkie reguły twarde (te same co add_hard_constraints) na macierzy przydziałów
+    operacjami na tablicach, bez solvera. Zwraca DataFrame naruszeń (VIOLATION_COLUMNS):
+    rule - rodzina z HARD_CONSTRAINT_FAMILIES, shifts - kody zmian, value / limit - wartość i limit.
+    """
+    A = assignment.reindex(index=instance.D, columns=instance.S, fill_value=0).to_numpy().astype(np.int64)
+    D = np.asarray(instance.D, dtype=object)
+    codes = instance.shifts["code"].to_numpy(dtype=object)
+    days = list(instance.days)
+    day_codes = instance.shifts["day"].cat.codes.to_numpy()
+    hours = instance.shifts["hours"].to_numpy()
+    is_night = instance.shifts["id"].isin(instance.night_shifts).to_numpy()
+
+    # zmiany -> dni (macierz zmiana x dzień); liczba zmian i nocy każdego lekarza w każdym dniu
+    day_onehot = np.zeros((len(instance.S), len(days)), dtype=np.int64)
+    day_onehot[np.arange(len(instance.S)), day_codes] = 1
+    per_day = A @ day_onehot
+    nights_per_day = A @ (day_onehot * is_night[:, None])
+
+    found = []
+
+    def add(rule, doc_rows, day=None, shift_cols=None, value=None, limit=None):
+        doc_rows = np.asarray(doc_rows)
+        if not len(doc_rows):
+            return
+        part = pd.DataFrame({"rule": rule, "doctor_id": D[doc_rows]})
+        part["day"] = None if day is None else np.asarray(days, dtype=object)[day]
+        part["shifts"] = None if shift_cols is None else [
+            ";".join(codes[c]) for c in shift_cols
+        ]
+        part["value"] = value
+        part["limit"] = limit
+        found.append(part)
+
+    # 1, 9, 10. Umiejętności, uprawnienie do 24h i niedostępności - pary lekarz x zmiana poza dozwolonymi
+    for rule, allowed in instance.eligibility_masks().items():
+        rows, cols = np.nonzero((A > 0) & ~allowed)
+        add(rule, rows, day_codes[cols], [[c] for c in cols])
+
+    # 2. Maksymalnie 1 zmiana w ciągu doby
+    rows, cols = np.nonzero(per_day > 1)
+    add("one_shift_per_day", rows, cols,
+        [np.flatnonzero(A[r] * (day_codes == c)) for r, c in zip(rows, cols)], per_day[rows, cols], 1)
+
+    # 3. 11 godzin odpoczynku - pary zmian z konfliktem obsadzone przez tego samego lekarza
+    conflicts = rest_conflicts(instance)
+    if conflicts:
+        first = np.array([instance.shift_idx[s] for s, _ in conflicts])
+        second = np.array([instance.shift_idx[s] for _, s in conflicts])
+        rows, pairs = np.nonzero((A[:, first] > 0) & (A[:, second] > 0))
+        add("rest_11h", rows, day_codes[first[pairs]], [[first[p], second[p]] for p in pairs])
+
+    # 4. Tygodniowy limit godzin (jak w modelu - pomniejszony o urlopy)
+    worked = A @ hours
+    max_hours = np.array([instance.adjusted_max_hours[d] for d in instance.D])
+    rows = np.flatnonzero(worked > max_hours)
+    add("weekly_hours", rows, value=worked[rows], limit=max_hours[rows])
+
+    # 5. Opiekun - stażysta tylko na zmianie z co najmniej jednym specjalistą
+    spec_rows = np.array([instance.doctor_idx[d] for d in instance.specialists], dtype=np.int64)
+    mentor_rows = np.array([instance.doctor_idx[d] for d in instance.needs_mentor], dtype=np.int64)
+    if len(mentor_rows):
+        mentors_on_shift = A[spec_rows].sum(axis=0)
+        rows, cols = np.nonzero(A[mentor_rows] > mentors_on_shift)
+        add("mentor", mentor_rows[rows], day_codes[cols], [[c] for c in cols])
+
+    # 6. Maksymalnie 2 noce w każdym oknie 3 dni
+    if len(days) >= 3:
+        windows = sum(nights_per_day[:, i:len(days) - 2 + i] for i in range(3))
+        rows, starts = np.nonzero(windows > 2)
+        add("max_2_nights", rows, starts, value=windows[rows, starts], limit=2)
+
+    # 7. Dzień wolny po nocy
+    after_night = nights_per_day[:, :-1] + per_day[:, 1:]
+    rows, cols = np.nonzero((nights_per_day[:, :-1] > 0) & (after_night > 1))
+    add("day_off_after_night", rows, cols + 1, value=after_night[rows, cols], limit=1)
+
+    # 8. 35h odpoczynku w tygodniu - najwyżej 6 dni pracy
+    worked_days = (per_day > 0).sum(axis=1)
+    rows = np.flatnonzero(worked_days > MAX_WORKING_DAYS)
+    add("weekly_rest_35h", rows, value=worked_days[rows], limit=MAX_WORKING_DAYS)
+
+    if not found:
+        return pd.DataFrame(columns=VIOLATION_COLUMNS)
+    violations = pd.concat(found, ignore_index=True)
+    violations["Doctor"] = violations["doctor_id"].map(instance.id_to_name)
+    return violations[VIOLATION_COLUMNS]
+
+
+def validate_schedule(schedule_df, instance):
+    """
+    Sprawdza schedule_df (np. ręcznie poprawiony grafik) względem danych wejściowych.
+    Wpisy z nieznanym lekarzem lub kodem zmiany są zgłaszane jako reguła "unknown_entry".
+    """
+    assignment, unknown = schedule_to_assignment(schedule_df, instance)
+    violations = validate_assignment(assignment, instance)
+    if len(unknown):
+        extra = pd.DataFrame({
+            "rule": "unknown_entry",
+            "doctor_id": None,
+            "Doctor": unknown["Doctor"].to_numpy(),
+            "day": unknown["Day"].to_numpy() if "Day" in unknown.columns else None,
+            "shifts": unknown["ShiftCode"].to_numpy(),
+            "value": None,
+            "limit": None,
+        })
+        violations = pd.concat([violations, extra], ignore_index=True) if len(violations) else extra
+    return violations
+
+
+def violation_summary(violations):
+    """Liczba naruszeń każdej rodziny reguł (wszystkie rodziny, także z zerem)"""
+    rules = HARD_CONSTRAINT_FAMILIES + ["unknown_entry"]
+    return violations["rule"].value_counts().reindex(rules, fill_value=0)
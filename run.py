@@ -0,0 +1,268 @@
+"""
+Uruchomienie wsadowe (bez Streamlit), np. z crona:
+
+    python run.py --data data/ --mode hire --out wyniki/ --weight night=5
+
+Na stdout trafiają zdarzenia NDJSON (jeden obiekt JSON na linię), wydruki modelu na stderr.
+Kod wyjścia: 0 optymalny, 1 wykonalny (bez dowodu optymalności), 2 braki obsady,
+3 brak rozwiązania, 4 błędne dane wejściowe, 5 błąd w trakcie rozwiązania lub zapisu wyników.
+"""
+from contextlib import redirect_stdout
+from pathlib import Path
+from time import perf_counter, time
+import argparse
+import json
+import sys
+import traceback
+
+import pandas as pd
+
+from ortools.sat.python import cp_model
+
+from model.backends import BACKENDS, solve_roster
+from model.cp_sat_model import (
+    DEFAULT_WEIGHTS,
+    FORMULATIONS,
+    load_solver_profiles,
+    run_model_and_get_results,
+    run_with_one_extra_doctor,
+)
+from model.data_loader import InstanceValidationError, load_candidates, load_instance
+from model.export import EXPORT_FORMATS, export_schedules, schedule_week
+from model.history import HistoryStore
+from model.run_store import next_monday
+from model.validation import schedule_to_assignment, validate_schedule, violation_summary
+
+EXIT_OPTIMAL = 0
+EXIT_FEASIBLE = 1
+EXIT_UNDERSTAFFED = 2
+EXIT_INFEASIBLE = 3
+EXIT_INVALID_INPUT = 4
+EXIT_SOLVER_ERROR = 5
+
+# tabele, których pliki można podać osobno (nazwy jak w data_loader)
+TABLE_ARGS = ("doctors", "shifts", "unavail_day", "unavail_shift", "preferences", "unavail_hours")
+
+
+class EventLog:
+    """Zdarzenia postępu jako NDJSON"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.started = perf_counter()
+
+    def __call__(self, event, **fields):
+        record = {"event": event, "ts": round(time(), 3), "elapsed": round(perf_counter() - self.started, 3)}
+        record.update(fields)
+        self.stream.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self.stream.flush()
+
+
+def parse_weights(items):
+    weights = {}
+    for item in items or []:
+        name, _, value = item.partition("=")
+        if name not in DEFAULT_WEIGHTS or not value:
+            raise argparse.ArgumentTypeError(f"niepoprawna waga '{item}' (dostępne: {', '.join(DEFAULT_WEIGHTS)})")
+        weights[name] = int(value)
+    return weights
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Harmonogram dyżurów - uruchomienie wsadowe")
+    parser.add_argument("--data", help="katalog z danymi albo archiwum .zip (domyślnie data/)")
+    for arg in TABLE_ARGS:
+        parser.add_argument(f"--{arg.replace('_', '-')}", dest=arg, help=f"plik tabeli {arg}")
+    parser.add_argument("--candidates", help="plik kandydatów do zatrudnienia (tryb hire)")
+    parser.add_argument("--mode", choices=["single", "hire"], default="hire",
+                        help="single - jeden grafik, hire - z doborem dodatkowego lekarza przy brakach")
+    parser.add_argument("--profile", choices=sorted(load_solver_profiles()), default="default",
+                        help="profil solvera (wbudowany albo z solver_profiles.json)")
+    parser.add_argument("--time-limit", type=float, help="limit czasu jednego rozwiązania (s)")
+    parser.add_argument("--stop-no-improvement", type=float, metavar="S",
+                        help="zakończ po S sekundach bez lepszego rozwiązania (model/early_stop.py)")
+    parser.add_argument("--stop-gap", type=float, metavar="PROCENT", help="zakończ przy luce względnej poniżej PROCENT")
+    parser.add_argument("--stop-at-slack-bound", action="store_true",
+                        help="zakończ, gdy braki obsady osiągną dolne ograniczenie z przepływu")
+    parser.add_argument("--formulation", choices=FORMULATIONS, default="classic",
+                        help="sformułowanie fairness i proporcji godzin (model/cp_sat_model.py)")
+    parser.add_argument("--backend", choices=BACKENDS, default="cp_sat",
+                        help="solver dla trybu single: cp_sat albo MIP (scip, cbc) z opisu model/backends.py")
+    parser.add_argument("--weight", action="append", metavar="NAZWA=WARTOŚĆ", help="waga funkcji celu")
+    parser.add_argument("--out", default="output", help="katalog na pliki wynikowe")
+    parser.add_argument("--export", action="append", choices=EXPORT_FORMATS, metavar="FORMAT",
+                        help=f"dodatkowy eksport grafiku do OUT/export ({', '.join(EXPORT_FORMATS)}); "
+                             "można podać kilka razy")
+    parser.add_argument("--history", help="katalog historii grafików (model/history.py) - noce i godziny "
+                                          "z poprzednich tygodni wchodzą do fairness")
+    parser.add_argument("--publish", metavar="TYDZIEŃ",
+                        help="dopisz gotowy grafik do historii pod tą etykietą tygodnia (np. 2026-10-19)")
+    parser.add_argument("--dump", help="katalog na zrzuty modeli CP-SAT (do odtworzenia: python -m model.replay)")
+    return parser.parse_args(argv)
+
+
+def write_outputs(out_dir, frames):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for name, df in frames.items():
+        if df is None:
+            continue
+        path = out_dir / f"{name}.csv"
+        df.to_csv(path, index=False, encoding="utf-8")
+        written.append(str(path))
+    return written
+
+
+def early_stop_rules(args):
+    rules = {"no_improvement": args.stop_no_improvement, "gap": args.stop_gap,
+             "slack_bound": args.stop_at_slack_bound or None}
+    return {rule: value for rule, value in rules.items() if value is not None} or None
+
+
+def exit_code(status, missing):
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return EXIT_INFEASIBLE
+    if missing > 0:
+        return EXIT_UNDERSTAFFED
+    return EXIT_OPTIMAL if status == cp_model.OPTIMAL else EXIT_FEASIBLE
+
+
+def solve_and_publish(args, log, instance, candidates, weights, profile, early_stop, history_store, history):
+    """Rozwiązanie, kontrola, publikacja w historii i zapis wyników; zwraca kod wyjścia"""
+    # wydruki modelu (harmonogram, raport) na stderr - stdout zostaje czysty dla NDJSON
+    with redirect_stdout(sys.stderr):
+        if args.mode == "single" and args.backend != "cp_sat":
+            solved = solve_roster(instance, args.backend, time_limit=profile.get("max_time_in_seconds", 60),
+                                  workers=profile.get("num_search_workers", 8), weights=weights)
+            status = solved["status"]
+            schedule_df = solved["schedule_df"]
+            frames = {"schedule": schedule_df, "stats": solved["stats_df"], "solver_stats": solved["solver_stats_df"]}
+            final_schedule = schedule_df
+            added = False
+        elif args.mode == "single":
+            status, schedule_df, stats_df, solver_stats_df, *_ = run_model_and_get_results(
+                instance=instance, weights=weights, profile=profile, dump_dir=args.dump,
+                formulation=args.formulation, history=history, early_stop=early_stop
+            )
+            frames = {"schedule": schedule_df, "stats": stats_df, "solver_stats": solver_stats_df}
+            final_schedule = schedule_df
+            added = False
+        else:
+            result = run_with_one_extra_doctor(
+                instance=instance, candidates_df=candidates, weights=weights, profile=profile,
+                dump_dir=args.dump, formulation=args.formulation, history=history, early_stop=early_stop
+            )
+            status = result["status"]
+            added = result["added"]
+            frames = {
+                "schedule": result["schedule_after"] if added else result["schedule_before"],
+                "stats": result["stats_after"] if added else result["stats_before"],
+                "solver_stats": result["solver_stats_after"] if added else result["solver_stats_before"],
+            }
+            if added:
+                frames.update({
+                    "schedule_before": result["schedule_before"],
+                    "stats_before": result["stats_before"],
+                    "solver_stats_before": result["solver_stats_before"],
+                })
+            final_schedule = frames["schedule"]
+
+    missing = int(final_schedule["Missing"].sum()) if len(final_schedule) else 0
+    solved = frames["solver_stats"].iloc[0]
+    log(
+        "solved",
+        status=solved["status"],
+        objective=solved["objective_value"],
+        missing=missing,
+        wall_time=solved["wall_time"],
+        stop_reason=solved["stop_reason"],
+        hired=(result["new_doctor"]["name"] if added else None),
+    )
+
+    # kontrola po rozwiązaniu - grafik sprawdzony regułami twardymi niezależnie od modelu
+    checked = instance
+    if added:
+        checked = instance.with_doctors(pd.concat([instance.doctors, pd.DataFrame([result["new_doctor"]])],
+                                                  ignore_index=True))
+    summary = violation_summary(validate_schedule(final_schedule, checked))
+    log("validated", violations={rule: int(n) for rule, n in summary.items() if n})
+
+    if args.publish and status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        log("error", message="brak rozwiązania - grafik nie trafia do historii")
+    elif args.publish:
+        assignment, _ = schedule_to_assignment(final_schedule, checked)
+        history_store.append_week(args.publish, assignment, checked)
+        log("published", week=args.publish, history=str(history_store.path))
+
+    written = write_outputs(Path(args.out), frames)
+    log("written", files=written)
+
+    # eksport dla oddziałów, lekarzy i kadr - tydzień jak przy publikacji (domyślnie najbliższy)
+    if args.export and status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        log("error", message="brak rozwiązania - grafik nie jest eksportowany")
+    elif args.export:
+        week = args.publish or next_monday().isoformat()
+        exported = export_schedules([schedule_week(week, final_schedule, checked)], checked,
+                                    Path(args.out) / "export", formats=tuple(dict.fromkeys(args.export)))
+        log("exported", week=week, files={fmt: [str(p) for p in paths] for fmt, paths in exported.items()})
+
+    return exit_code(status, missing)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    log = EventLog(sys.stdout)
+
+    try:
+        weights = parse_weights(args.weight)
+    except argparse.ArgumentTypeError as e:
+        log("error", message=str(e))
+        return EXIT_INVALID_INPUT
+
+    profile = dict(load_solver_profiles()[args.profile])
+    if args.time_limit is not None:
+        profile["max_time_in_seconds"] = args.time_limit
+
+    early_stop = early_stop_rules(args)
+    if args.backend != "cp_sat" and (args.mode != "single" or early_stop or args.history):
+        log("error", message="backend MIP tylko w trybie single, bez --history i reguł zatrzymania")
+        return EXIT_INVALID_INPUT
+    log("start", mode=args.mode, profile=args.profile, weights=weights, early_stop=early_stop)
+
+    files = {table: getattr(args, table) for table in TABLE_ARGS if getattr(args, table)}
+    try:
+        instance = load_instance(args.data, files or None)
+        candidates = load_candidates(args.candidates) if args.mode == "hire" else None
+    except InstanceValidationError as e:
+        log("error", message="błędne dane wejściowe", errors=e.errors)
+        return EXIT_INVALID_INPUT
+    except FileNotFoundError as e:
+        log("error", message=str(e))
+        return EXIT_INVALID_INPUT
+
+    log("loaded", doctors=len(instance.D), shifts=len(instance.S))
+
+    if args.publish and not args.history:
+        log("error", message="--publish wymaga --history")
+        return EXIT_INVALID_INPUT
+    history_store = HistoryStore(args.history) if args.history else None
+    history = None
+    if history_store is not None and history_store.weeks:
+        history = history_store.aggregates()
+        log("history", weeks=len(history_store.weeks), first=history_store.weeks[0], last=history_store.weeks[-1])
+
+    try:
+        code = solve_and_publish(args, log, instance, candidates, weights, profile, early_stop,
+                                 history_store, history)
+    except Exception as e:
+        # błąd solvera, rankingu LP, reguł zatrzymania albo zapisu historii - zdarzenie zamiast
+        # gołego śladu wyjątku (kod 1 oznaczałby rozwiązanie wykonalne)
+        traceback.print_exc(file=sys.stderr)
+        log("error", message=str(e), error=type(e).__name__)
+        return EXIT_SOLVER_ERROR
+    log("done", exit_code=code)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
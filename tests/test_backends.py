@@ -0,0 +1,32 @@
+from model.backends import describe_roster, solve_roster, solve_spec
+from model.data_loader import load_instance
+from model.export import SCHEDULE_COLUMNS
+
+
+def test_reported_spreads_come_from_the_solution():
+    instance = load_instance()
+    # bez kary za rozrzut maksima / minima są w opisie luźne - raport liczony z rozwiązania
+    result = solve_roster(instance, backend="cp_sat", time_limit=10, weights={"night": 0})
+    stats = result["solver_stats_df"].iloc[0]
+    nights = result["stats_df"]["NightShifts"]
+
+    assert stats["max_nights"] == nights.max()
+    assert stats["min_nights"] == nights.min()
+    assert stats["spread"] == nights.max() - nights.min()
+
+
+def test_no_solution_returns_empty_frames():
+    result = solve_roster(load_instance(), backend="cp_sat", time_limit=0.001)
+
+    assert result["assignment"] is None
+    assert list(result["schedule_df"].columns) == SCHEDULE_COLUMNS
+    assert result["schedule_df"].empty
+    assert result["stats_df"].empty
+
+
+def test_mip_engines_respect_the_time_limit():
+    spec = describe_roster(load_instance())
+    for backend in ("scip", "cbc"):
+        _, solved = solve_spec(spec, backend, time_limit=3, workers=2)
+        # zapas na budowę modelu i zamknięcie procesu potomnego CBC
+        assert solved.wall_time < 3 + 4, backend
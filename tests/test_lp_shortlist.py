@@ -0,0 +1,30 @@
+from model.cp_sat_model import lp_shortlist
+from model.data_loader import load_candidates, load_instance
+
+
+def test_shortlist_uses_final_selection_order():
+    instance = load_instance()
+    candidates = load_candidates()
+
+    shortlist, ranking = lp_shortlist(candidates, instance, top_k=2)
+
+    # ten sam klucz co choose_best_candidate: poprawa malejąco, potem stawka rosnąco
+    keys = list(zip(-ranking["estimate"], ranking["salary"]))
+    assert keys == sorted(keys)
+    assert set(shortlist["id"]) == set(ranking["id"].head(2))
+    assert len(ranking) == len(candidates)
+
+
+def test_shortlist_keeps_all_candidates_when_lp_fails(monkeypatch):
+    import model.cp_sat_model as cp_sat_model
+
+    def failing(*args, **kwargs):
+        raise RuntimeError("relaksacja LP nie została rozwiązana (status 2)")
+
+    monkeypatch.setattr(cp_sat_model, "rank_candidates_lp", failing)
+    candidates = load_candidates()
+
+    shortlist, ranking = lp_shortlist(candidates, load_instance(), top_k=2)
+
+    assert ranking is None
+    assert shortlist is candidates
@@ -0,0 +1,38 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def run_cli(*args):
+    return subprocess.run([sys.executable, str(ROOT / "run.py"), *args], cwd=ROOT, capture_output=True, text=True)
+
+
+def test_no_solution_exits_with_infeasible_code(tmp_path):
+    # limit czasu za krótki na jakiekolwiek rozwiązanie - kod 3 zamiast wyjątku
+    proc = run_cli("--mode", "single", "--time-limit", "0.001", "--out", str(tmp_path))
+
+    assert proc.returncode == 3, proc.stderr
+    events = [json.loads(line) for line in proc.stdout.splitlines()]
+    solved = next(e for e in events if e["event"] == "solved")
+    assert solved["status"] in ("UNKNOWN", "INFEASIBLE")
+    assert solved["objective"] is None
+    assert events[-1] == {**events[-1], "event": "done", "exit_code": 3}
+    assert (tmp_path / "solver_stats.csv").exists()
+
+
+def test_solver_error_is_logged_with_its_own_exit_code(monkeypatch, capsys):
+    import run
+
+    def failing(**kwargs):
+        raise RuntimeError("relaksacja LP nie została rozwiązana (status 2)")
+
+    monkeypatch.setattr(run, "run_model_and_get_results", failing)
+    code = run.main(["--mode", "single"])
+
+    assert code == run.EXIT_SOLVER_ERROR
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert events[-1]["event"] == "error"
+    assert events[-1]["error"] == "RuntimeError"
@@ -0,0 +1,73 @@
+import pandas as pd
+
+from model.run_store import RunStore, week_period
+
+
+def make_result():
+    diagnosis = {
+        "feasible": False,
+        "status": "INFEASIBLE",
+        "shifts": pd.DataFrame({"id": [20], "code": ["ICU_24_FRI"], "day": ["Fri"], "dept": ["ICU"],
+                                "required_skill": ["icu"], "hours": [24], "min_staff": [1]}),
+        "rules": pd.DataFrame({"family": ["unavailability"], "doctor_id": [1], "Doctor": ["Kowalski"]}),
+        "solves": 3,
+        "wall_time": 0.5,
+    }
+    return {
+        "added": False,
+        "status": 0,
+        "schedule_before": pd.DataFrame({"Doctor": ["Kowalski"], "Dept": ["ICU"], "Missing": [0]}),
+        "stats_before": pd.DataFrame({"Doctor": ["Kowalski"], "Hours": [24]}),
+        # bez rozwiązania kolumny wyniku są puste, ale nadal należą do wyniku
+        "solver_stats_before": pd.DataFrame({"status": ["UNKNOWN"], "objective_value": [None],
+                                             "stop_reason": [None]}),
+        "diagnosis": diagnosis,
+    }
+
+
+def test_round_trip_keeps_empty_columns_and_diagnosis(tmp_path):
+    with RunStore(tmp_path / "runs.sqlite") as store:
+        run_id = store.save_run("hash", make_result(), {"mode": "single"}, *week_period("2026-10-19"))
+        loaded = store.load_run(run_id)
+
+    assert list(loaded["solver_stats_before"].columns) == ["status", "objective_value", "stop_reason"]
+    assert loaded["diagnosis"]["feasible"] is False
+    assert loaded["diagnosis"]["solves"] == 3
+    assert loaded["diagnosis"]["shifts"]["code"].tolist() == ["ICU_24_FRI"]
+    assert loaded["diagnosis"]["rules"]["Doctor"].tolist() == ["Kowalski"]
+
+
+def test_period_filters(tmp_path):
+    with RunStore(tmp_path / "runs.sqlite") as store:
+        first = store.save_run("hash", make_result(), {"week": 1}, *week_period("2026-10-19"))
+        second = store.save_run("hash", make_result(), {"week": 2}, *week_period("2026-10-26"))
+
+        assert store.list_runs(start="2026-10-26")["run_id"].tolist() == [second]
+        assert store.list_runs(end="2026-10-25")["run_id"].tolist() == [first]
+        history = store.doctor_history("Kowalski", start="2026-10-20", end="2026-10-21")
+        assert history["run_id"].tolist() == [first]
+        assert history["period_end"].tolist() == ["2026-10-25"]
+
+
+def test_no_solution_round_trip_keeps_empty_frames_and_status(tmp_path):
+    from ortools.sat.python import cp_model
+
+    from model.export import SCHEDULE_COLUMNS
+
+    result = {
+        "added": False,
+        "status": cp_model.UNKNOWN,
+        "schedule_before": pd.DataFrame(columns=SCHEDULE_COLUMNS),
+        "stats_before": pd.DataFrame(),
+        "solver_stats_before": pd.DataFrame({"status": ["UNKNOWN"], "objective_value": [None]}),
+    }
+    with RunStore(tmp_path / "runs.sqlite") as store:
+        store.save_run("hash", make_result(), {"run": 1})
+        loaded = store.load_run(store.save_run("hash", result, {"run": 2}))
+
+    assert loaded["status"] == cp_model.UNKNOWN
+    assert list(loaded["schedule_before"].columns) == SCHEDULE_COLUMNS
+    assert loaded["schedule_before"].empty
+    assert loaded["stats_before"].empty
+    # kolumny dodane do tabeli przez inne uruchomienie nie wracają w tym wyniku
+    assert list(loaded["solver_stats_before"].columns) == ["status", "objective_value"]
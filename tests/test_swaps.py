@@ -0,0 +1,84 @@
+import random
+
+import pandas as pd
+import pytest
+
+from model.data_loader import load_instance
+from model.heuristic import construct_greedy
+from model.swaps import SwapEngine
+from model.validation import validate_assignment
+
+
+@pytest.fixture(scope="module")
+def start():
+    instance = load_instance()
+    assignment = construct_greedy(instance)["assignment"]
+    assert validate_assignment(assignment, instance).empty
+    return instance, assignment
+
+
+def owned_shifts(engine):
+    return [(d, s) for d in engine.D for s in engine.S if engine.occupancy[d] >> engine.shift_col[s] & 1]
+
+
+def swapped(assignment, doctor_a, shift_a, doctor_b, shift_b):
+    result = assignment.copy()
+    result.at[doctor_a, shift_a] = 0
+    result.at[doctor_b, shift_a] = 1
+    if shift_b is not None:
+        result.at[doctor_b, shift_b] = 0
+        result.at[doctor_a, shift_b] = 1
+    return result
+
+
+def test_check_matches_validator_on_applied_swaps(start):
+    instance, assignment = start
+    engine = SwapEngine(instance, assignment)
+    owned = owned_shifts(engine)
+    rng = random.Random(0)
+
+    checked = legal = 0
+    for k in range(400):
+        (doctor_a, shift_a), (doctor_b, shift_b) = rng.choice(owned), rng.choice(owned)
+        if doctor_a == doctor_b or assignment.at[doctor_b, shift_a] or assignment.at[doctor_a, shift_b]:
+            continue
+        if k % 4 == 0:
+            shift_b = None
+        result = engine.check(doctor_a, shift_a, doctor_b, shift_b)
+        violations = validate_assignment(swapped(assignment, doctor_a, shift_a, doctor_b, shift_b), instance)
+        assert set(result["violations"]) == set(violations["rule"]), (doctor_a, shift_a, doctor_b, shift_b)
+        checked += 1
+        legal += result["legal"]
+    assert checked > 100 and legal > 0
+
+
+def test_apply_keeps_the_state_of_a_rebuilt_engine(start):
+    instance, assignment = start
+    engine = SwapEngine(instance, assignment)
+    swap = next(engine.options(d).iloc[0] for d in engine.D if len(engine.options(d)))
+    shift_b = None if pd.isna(swap["shift_b"]) else int(swap["shift_b"])
+
+    engine.apply(swap["doctor_a"], swap["shift_a"], swap["doctor_b"], shift_b)
+
+    expected = swapped(assignment, swap["doctor_a"], swap["shift_a"], swap["doctor_b"], shift_b)
+    assert (engine.assignment() == expected).all().all()
+    assert validate_assignment(engine.assignment(), instance).empty
+    rebuilt = SwapEngine(instance, engine.assignment())
+    assert rebuilt.per_day == engine.per_day
+    assert rebuilt.spec_count == engine.spec_count
+    assert rebuilt.night_top == engine.night_top
+
+
+def test_swap_onto_a_shift_the_doctor_already_works_is_rejected(start):
+    instance, assignment = start
+    engine = SwapEngine(instance, assignment)
+    # zmiana obsadzona przez dwóch lekarzy
+    shift = next(s for s in engine.S if assignment[s].sum() > 1)
+    doctor_a, doctor_b = assignment.index[assignment[shift] > 0][:2]
+
+    with pytest.raises(ValueError, match="ma już zmianę"):
+        engine.check(doctor_a, shift, doctor_b)
+    options = engine.options(doctor_a, shift, legal_only=False)
+    assert doctor_b not in set(options["doctor_b"])
+    mine = {s for d, s in owned_shifts(engine) if d == doctor_a}
+    assert not set(engine.options(doctor_a, legal_only=False)["shift_b"].dropna()) & mine
@@ -0,0 +1,51 @@
+import random
+
+import pandas as pd
+from ortools.sat.python import cp_model
+
+from model.constraints import add_hard_constraints
+from model.data_loader import load_instance
+from model.export import build_schedule_df
+from model.heuristic import construct_greedy
+from model.validation import validate_assignment, validate_schedule, violation_summary
+
+
+def cp_sat_feasible(assignment, instance):
+    """Ten sam grafik przez ograniczenia twarde modelu - wszystkie zmienne ustalone"""
+    model = cp_model.CpModel()
+    x = {(d, s): model.NewBoolVar(f"x_{d}_{s}") for d in instance.D for s in instance.S}
+    add_hard_constraints(model, x, instance)
+    for (d, s), var in x.items():
+        model.Add(var == int(assignment.at[d, s]))
+    return cp_model.CpSolver().Solve(model) in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+
+
+def test_validator_agrees_with_the_model_constraints():
+    instance = load_instance()
+    assignment = construct_greedy(instance)["assignment"]
+    assert validate_assignment(assignment, instance).empty
+    rng = random.Random(0)
+
+    violated = 0
+    for _ in range(100):
+        changed = assignment.copy()
+        for _ in range(rng.randint(1, 3)):
+            d, s = rng.choice(instance.D), rng.choice(instance.S)
+            changed.at[d, s] = 1 - changed.at[d, s]
+        violations = validate_assignment(changed, instance)
+        assert violations.empty == cp_sat_feasible(changed, instance)
+        violated += not violations.empty
+    assert violated > 0
+
+
+def test_schedule_reports_duplicates_and_unknown_entries():
+    instance = load_instance()
+    schedule = build_schedule_df(construct_greedy(instance)["assignment"], instance, {})
+    unknown = pd.DataFrame([{"Day": "Mon", "ShiftCode": "XX", "Doctor": "Nobody", "Missing": 0}])
+
+    summary = violation_summary(validate_schedule(pd.concat([schedule, schedule.iloc[[0]], unknown],
+                                                           ignore_index=True), instance))
+
+    assert summary["one_shift_per_day"] == 1
+    assert summary["unknown_entry"] == 1
+    assert summary.drop(["one_shift_per_day", "unknown_entry"]).eq(0).all()